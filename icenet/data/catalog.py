@@ -0,0 +1,455 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import netCDF4
+import pandas as pd
+"""
+A catalogue of the files written by the pipeline, so that stages can find
+out what exists without walking the data tree or opening files.
+
+The catalogue is a SQLite database at the root of the data tree holding the
+files, e.g. ./data/catalog.db for ./data/<producer>/<hemisphere>/..., or
+wherever the ICENET_CATALOG environment variable points. It uses SQLite's
+default rollback journal, as WAL needs shared memory that network
+filesystems don't reliably provide, unless ICENET_CATALOG_JOURNAL says
+otherwise. The catalogue is an optimisation: failing to use it is logged,
+but never fails the write being recorded.
+"""
+
+CATALOG_ENV = "ICENET_CATALOG"
+CATALOG_JOURNAL_ENV = "ICENET_CATALOG_JOURNAL"
+CATALOG_NAME = "catalog.db"
+DEFAULT_CATALOG = os.path.join(".", "data", CATALOG_NAME)
+DEFAULT_JOURNAL = "DELETE"
+
+HEMISPHERES = ("north", "south")
+
+# Files describing a Zarr store (v2 and v3), which change whenever it's
+# written to, unlike the chunks which only change where data is written
+ZARR_METADATA = (".zarray", ".zattrs", ".zgroup", ".zmetadata", "zarr.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    variable TEXT,
+    hemisphere TEXT,
+    producer TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    dates TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    checksum TEXT,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_variable ON files (variable, hemisphere);
+CREATE INDEX IF NOT EXISTS files_producer ON files (producer);
+CREATE TABLE IF NOT EXISTS listings (
+    root TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    directories TEXT NOT NULL
+);
+"""
+
+
+def netcdf_dates(path: str) -> object:
+    """Reads the time coordinate of a netCDF file, and nothing else
+
+    :param path:
+    :return: DatetimeIndex of the time steps in the file
+    """
+    with netCDF4.Dataset(path, "r") as nc:
+        if "time" not in nc.variables:
+            return pd.DatetimeIndex([])
+
+        time_var = nc.variables["time"]
+
+        if not len(time_var):
+            return pd.DatetimeIndex([])
+
+        return pd.DatetimeIndex(
+            netCDF4.num2date(time_var[:],
+                             time_var.units,
+                             calendar=getattr(time_var, "calendar",
+                                              "standard"),
+                             only_use_cftime_datetimes=False,
+                             only_use_python_datetimes=True))
+
+
+def zarr_dates(path: str) -> object:
+    """Reads the time coordinate of a Zarr store, and nothing else
+
+    :param path:
+    :return: DatetimeIndex of the time steps in the store
+    """
+    import xarray as xr
+
+    with xr.open_zarr(path) as ds:
+        if "time" not in ds.variables:
+            return pd.DatetimeIndex([])
+        return pd.DatetimeIndex(ds.time.values)
+
+
+def store_files(path: str) -> list:
+    """The files holding the metadata of a Zarr store, or a file itself
+
+    :param path:
+    :return: sorted list of file paths
+    """
+    if not os.path.isdir(path):
+        return [path]
+
+    return sorted(
+        os.path.join(directory, name)
+        for directory in [path] + sorted(
+            entry.path for entry in os.scandir(path) if entry.is_dir())
+        for name in ZARR_METADATA
+        if os.path.exists(os.path.join(directory, name)))
+
+
+def describe_path(path: str) -> tuple:
+    """Infers the producer, hemisphere and variable of a file from its path
+
+    Files are stored as <producer>/<hemisphere>/<variable>/..., e.g.
+    data/osisaf/north/siconca/2020.nc
+
+    :param path:
+    :return: tuple of (producer, hemisphere, variable), each None if unknown
+    """
+    comps = os.path.normpath(os.path.abspath(path)).split(os.sep)[:-1]
+    hemisphere_idx = [i for i, comp in enumerate(comps) if comp in HEMISPHERES]
+
+    if not len(hemisphere_idx):
+        return None, None, None
+
+    idx = hemisphere_idx[-1]
+    return comps[idx - 1] if idx > 0 else None, \
+        comps[idx], \
+        comps[idx + 1] if idx + 1 < len(comps) else None
+
+
+def data_root(path: str) -> object:
+    """The root of the data tree holding a path
+
+    Data is stored as <root>/<producer>/<hemisphere>/..., e.g. ./data for
+    data/osisaf/north/siconca/2020.nc
+
+    :param path: a file or directory within the tree
+    :return: the root directory, or None if the path isn't in a data tree
+    """
+    comps = os.path.normpath(os.path.abspath(path)).split(os.sep)
+    hemisphere_idx = [i for i, comp in enumerate(comps) if comp in HEMISPHERES]
+
+    if not len(hemisphere_idx) or hemisphere_idx[-1] < 2:
+        return None
+    return os.sep.join(comps[:hemisphere_idx[-1] - 1]) or os.sep
+
+
+class DataCatalog:
+    """Persisted record of the files written, and the dates they hold
+
+    Each file is recorded with its producer, hemisphere, variable, date
+    range and dates, alongside its size and modification time when
+    recorded. Entries for files that have since changed are treated as
+    missing. Checksums are computed on request rather than on every write,
+    and kept until the file changes.
+
+    :param path: the SQLite database, defaults to ICENET_CATALOG or
+        ./data/catalog.db
+    :param journal_mode: SQLite journal mode, defaults to
+        ICENET_CATALOG_JOURNAL or DELETE
+    """
+
+    _instances = dict()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str = None, journal_mode: str = None):
+        self._path = path if path is not None else \
+            os.environ.get(CATALOG_ENV, DEFAULT_CATALOG)
+        self._journal_mode = (journal_mode if journal_mode is not None else
+                              os.environ.get(CATALOG_JOURNAL_ENV,
+                                             DEFAULT_JOURNAL)).upper()
+        self._local = threading.local()
+
+    @classmethod
+    def default(cls, path: str = None, root: str = None) -> object:
+        """The catalog for a path in the data tree
+
+        ICENET_CATALOG takes precedence, otherwise the catalog is at the
+        root of the data tree, so it doesn't depend on the working
+        directory.
+
+        :param path: a file or directory within the data tree
+        :param root: the root of the data tree, instead of a path within it
+        :return: shared DataCatalog for the resolved database
+        """
+        catalog_path = os.environ.get(CATALOG_ENV)
+
+        if not catalog_path:
+            if root is None and path is not None:
+                root = data_root(path)
+
+            if root is None:
+                logging.debug("{} is not in a data tree, using {}".format(
+                    path, DEFAULT_CATALOG))
+                catalog_path = DEFAULT_CATALOG
+            else:
+                catalog_path = os.path.join(root, CATALOG_NAME)
+
+        catalog_path = os.path.abspath(catalog_path)
+
+        with cls._instances_lock:
+            if catalog_path not in cls._instances:
+                cls._instances[catalog_path] = cls(catalog_path)
+            return cls._instances[catalog_path]
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _connection(self) -> object:
+        # Connections can't be shared between threads, or survive a fork
+        if getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self._path))
+            os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self._path,
+                                   timeout=60.,
+                                   isolation_level=None)
+            mode = conn.execute("PRAGMA journal_mode={}".format(
+                self._journal_mode)).fetchone()[0].upper()
+
+            if mode != self._journal_mode:
+                logging.warning("Catalog {} can't use {} journaling, using "
+                                "{}".format(self._path, self._journal_mode,
+                                            DEFAULT_JOURNAL))
+                conn.execute("PRAGMA journal_mode={}".format(DEFAULT_JOURNAL))
+
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def _execute(self, sql: str, params: object = (),
+                 many: bool = False) -> object:
+        """Runs a statement, warning rather than raising if the catalog fails
+
+        :param sql:
+        :param params:
+        :param many: execute for each of a sequence of params
+        :return: the cursor, or None if the catalog is unavailable
+        """
+        try:
+            conn = self._connection()
+            return conn.executemany(sql, params) if many else \
+                conn.execute(sql, params)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning("Catalog {} unavailable: {}".format(
+                self._path, e))
+            return None
+
+    @staticmethod
+    def _signature(path: str) -> tuple:
+        # Zarr stores are directories, so are signed by their metadata
+        stats = [os.stat(filename) for filename in store_files(path)]
+        return sum(stat.st_size for stat in stats), \
+            max([stat.st_mtime_ns for stat in stats], default=0)
+
+    def record(self,
+               path: str,
+               dates: object = None,
+               producer: str = None,
+               hemisphere: str = None,
+               variable: str = None) -> object:
+        """Records a file or Zarr store, after it has been written
+
+        :param path:
+        :param dates: the dates in the file, read from it if not provided
+        :param producer: inferred from the path if not provided
+        :param hemisphere: inferred from the path if not provided
+        :param variable: inferred from the path if not provided
+        :return: DatetimeIndex of the time steps in the file
+        """
+        if dates is None:
+            dates = zarr_dates(path) if os.path.isdir(path) \
+                else netcdf_dates(path)
+        dates = pd.DatetimeIndex(dates)
+        dates = dates.sort_values()
+        size, mtime_ns = self._signature(path)
+
+        inferred = describe_path(path)
+        producer = producer if producer is not None else inferred[0]
+        hemisphere = hemisphere if hemisphere is not None else inferred[1]
+        variable = variable if variable is not None else inferred[2]
+
+        self._execute(
+            "INSERT OR REPLACE INTO files VALUES "
+            "(?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+            (os.path.abspath(path), variable, hemisphere, producer,
+             str(dates[0]) if len(dates) else None,
+             str(dates[-1]) if len(dates) else None,
+             json.dumps([str(date) for date in dates]), size, mtime_ns,
+             time.time()))
+        return dates
+
+    def _entry(self, path: str) -> object:
+        """
+
+        :param path:
+        :return: row for the file, or None if unrecorded or since changed
+        """
+        cursor = self._execute(
+            "SELECT dates, size, mtime_ns, checksum FROM files "
+            "WHERE path = ?", (os.path.abspath(path),))
+        row = cursor.fetchone() if cursor is not None else None
+
+        if row is None or \
+                not os.path.exists(path) or \
+                tuple(row[1:3]) != self._signature(path):
+            return None
+        return row
+
+    def dates(self, path: str, read: bool = True) -> object:
+        """The dates held in a file
+
+        :param path:
+        :param read: read and record the dates if they're not recorded
+        :return: DatetimeIndex of the time steps in the file, or None if
+            not recorded and read is False
+        """
+        entry = self._entry(path)
+
+        if entry is not None:
+            return pd.DatetimeIndex(json.loads(entry[0]))
+        return self.record(path) if read else None
+
+    def checksum(self, path: str) -> str:
+        """SHA-256 checksum of a file, computed once per version of the file
+
+        Zarr stores are checksummed across all of their files, in path order.
+
+        :param path:
+        :return: hex digest
+        """
+        entry = self._entry(path)
+
+        if entry is not None and entry[3] is not None:
+            return entry[3]
+
+        if entry is None:
+            self.record(path)
+
+        digest = hashlib.sha256()
+        filenames = [path] if not os.path.isdir(path) else sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(path)
+            for name in names)
+
+        for filename in filenames:
+            with open(filename, "rb") as fh:
+                for block in iter(lambda: fh.read(2**20), b""):
+                    digest.update(block)
+
+        checksum = digest.hexdigest()
+        self._execute(
+            "UPDATE files SET checksum = ? WHERE path = ?",
+            (checksum, os.path.abspath(path)))
+        return checksum
+
+    def files(self,
+              producer: str = None,
+              hemisphere: str = None,
+              variable: str = None,
+              start: object = None,
+              end: object = None,
+              under: str = None) -> list:
+        """Recorded files matching the given criteria
+
+        This is answered from the catalog alone, so files changed or removed
+        without being recorded will still be listed.
+
+        :param producer:
+        :param hemisphere:
+        :param variable:
+        :param start: only files holding dates on or after this
+        :param end: only files holding dates on or before this
+        :param under: only files within this directory
+        :return: sorted list of paths
+        """
+        clauses, params = list(), list()
+
+        for column, value in (("producer", producer),
+                              ("hemisphere", hemisphere),
+                              ("variable", variable)):
+            if value is not None:
+                clauses.append("{} = ?".format(column))
+                params.append(value)
+
+        if start is not None:
+            clauses.append("end_date >= ?")
+            params.append(str(pd.Timestamp(start)))
+
+        if end is not None:
+            clauses.append("start_date <= ?")
+            params.append(str(pd.Timestamp(end)))
+
+        if under is not None:
+            clauses.append("path LIKE ? ESCAPE '\\'")
+            params.append("{}%".format(
+                os.path.join(os.path.abspath(under), "").replace(
+                    "\\", "\\\\").replace("%", "\\%").replace("_", "\\_")))
+
+        rows = self._connection().execute(
+            "SELECT path FROM files{} ORDER BY path".format(
+                " WHERE {}".format(" AND ".join(clauses)) if clauses else ""),
+            params).fetchall()
+        return [row[0] for row in rows]
+
+    def remove(self, paths: object):
+        """
+
+        :param paths:
+        """
+        self._execute("DELETE FROM files WHERE path = ?",
+                      [(os.path.abspath(path),) for path in paths],
+                      many=True)
+
+    def get_listings(self, root: str, version: int) -> dict:
+        """Directory listings persisted for a tree, see SourceCatalogue
+
+        :param root:
+        :param version: listings of any other version are ignored
+        :return: dict of listings by relative directory
+        """
+        cursor = self._execute(
+            "SELECT version, directories FROM listings WHERE root = ?",
+            (os.path.abspath(root),))
+        row = cursor.fetchone() if cursor is not None else None
+
+        if row is None or row[0] != version:
+            return dict()
+
+        try:
+            return json.loads(row[1])
+        except ValueError:
+            logging.warning("Unreadable listings for {}, rebuilding".format(
+                root))
+            return dict()
+
+    def set_listings(self, root: str, version: int, directories: dict):
+        """
+
+        :param root:
+        :param version:
+        :param directories:
+        """
+        self._execute(
+            "INSERT OR REPLACE INTO listings VALUES (?, ?, ?)",
+            (os.path.abspath(root), version, json.dumps(directories)))
@@ -92,6 +92,7 @@ def download_args(choices: object = None,
                   dates_optional: bool = False,
                   var_specs: bool = True,
                   workers: bool = False,
+                  regrid: bool = False,
                   extra_args: object = ()) -> object:
     """
 
@@ -100,6 +101,7 @@ def download_args(choices: object = None,
     :param dates_optional:
     :param var_specs:
     :param workers:
+    :param regrid:
     :param extra_args:
     :return:
     """
@@ -119,6 +121,25 @@ def download_args(choices: object = None,
     if workers:
         ap.add_argument("-w", "--workers", default=8, type=int)
 
+    if regrid:
+        ap.add_argument("-rp",
+                        "--regrid-processes",
+                        default=0,
+                        type=int,
+                        help="Regrid in this many processes rather than "
+                        "threads")
+        ap.add_argument("-rb",
+                        "--regrid-batch-size",
+                        default=None,
+                        type=int,
+                        help="Number of files handled per regrid task")
+        ap.add_argument("-sr",
+                        "--sparse-regrid",
+                        default=False,
+                        action="store_true",
+                        help="Regrid with cached sparse weights, rather than "
+                        "iris, where possible")
+
     ap.add_argument("-po",
                     "--parallel-opens",
                     default=False,
@@ -205,6 +226,34 @@ def process_args(dates: bool = True,
                         default=None,
                         type=str)
     ap.add_argument("-v", "--verbose", action="store_true", default=False)
+    ap.add_argument("-a",
+                    "--append",
+                    help="Only process dates missing from the processed "
+                    "files, reusing the stored climatology and normalisation",
+                    action="store_true",
+                    default=False)
+    ap.add_argument("-c",
+                    "--compression",
+                    help="Compression level for processed outputs, 0 to "
+                    "disable",
+                    default=1,
+                    type=int)
+    ap.add_argument("-of",
+                    "--output-format",
+                    help="Format of processed outputs",
+                    choices=("netcdf", "zarr"),
+                    default="netcdf")
+    ap.add_argument("-w",
+                    "--workers",
+                    help="Number of variables to process concurrently",
+                    default=1,
+                    type=int)
+    ap.add_argument("-wm",
+                    "--workers-memory",
+                    help="Memory budget (GB) for variables being processed "
+                    "concurrently, defaults to half of physical memory",
+                    default=None,
+                    type=float)
 
     ap.add_argument(
         "-u",
@@ -9,6 +9,7 @@ import pandas as pd
 
 from icenet.data.datasets.utils import SplittingMixin
 from icenet.data.loader import IceNetDataLoaderFactory
+from icenet.data.process import expand_dates
 from icenet.data.producers import DataCollection
 from icenet.utils import (
     setup_module_logging,
@@ -362,7 +363,8 @@ if pytorch_available:
                 raise ValueError("mode must be either 'train', 'val', 'test'")
             self._mode = mode
 
-            self._dates = self._dl._config["sources"]["osisaf"]["dates"][self._mode]
+            self._dates = expand_dates(
+                self._dl._config["sources"]["osisaf"]["dates"][self._mode])
 
         def __len__(self):
             return self._counts[self._mode]
@@ -372,7 +374,7 @@ if pytorch_available:
             """
             with dask.config.set(scheduler="synchronous"):
                 sample = self._dl.generate_sample(
-                    date=pd.Timestamp(self._dates[idx].replace('_', '-')),
+                    date=pd.Timestamp(self._dates[idx]),
                     parallel=False,
                 )
             return sample
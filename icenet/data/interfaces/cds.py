@@ -1,9 +1,13 @@
-import datetime as dt
+import calendar
+import collections
+import concurrent
 import logging
 import os
 import requests
 import requests.adapters
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pformat
 
 import cdsapi as cds
@@ -13,6 +17,7 @@ import xarray as xr
 
 from icenet.data.cli import download_args
 from icenet.data.interfaces.downloader import ClimateDownloader
+from icenet.data.interfaces.utils import stream_daily_mean
 """
 Module to download hourly ERA5 reanalysis latitude-longitude maps,
 compute daily averages, regrid them to the same EASE grid as the OSI-SAF sea
@@ -25,6 +30,9 @@ class ERA5Downloader(ClimateDownloader):
 
     :param identifier: how to identify this dataset
     :param cdi_map: override the default ERA5Downloader.CDI_MAP variable map
+    :param max_request_fields: maximum fields (dates x hours) per CDS request
+    :param max_requests: maximum CDS requests in flight at once, across all
+        download threads
     :param show_progress: whether to show download progress
     """
 
@@ -45,6 +53,8 @@ class ERA5Downloader(ClimateDownloader):
                  *args,
                  identifier: str = "era5",
                  cdi_map: object = CDI_MAP,
+                 max_request_fields: int = 120000,
+                 max_requests: int = 4,
                  show_progress: bool = False,
                  **kwargs):
         super().__init__(*args,
@@ -53,6 +63,8 @@ class ERA5Downloader(ClimateDownloader):
                          **kwargs)
         self.client = cds.Client(progress=show_progress)
         self._cdi_map = cdi_map
+        self._max_request_fields = max_request_fields
+        self._request_slots = threading.BoundedSemaphore(max_requests)
 
         self.download_method = self._single_api_download
 
@@ -77,20 +89,11 @@ class ERA5Downloader(ClimateDownloader):
         logging.debug("Processing {} dates".format(len(req_dates)))
         var_prefix = var[0:-(len(str(level)))] if level else var
 
-        # TODO: Do we need to download whole month by default here?
-        #       Change request to download month just up to dates required?
         retrieve_dict = {
             "product_type":
                 "reanalysis",
             "variable":
                 self._cdi_map[var_prefix],
-            "year":
-                req_dates[0].year,
-            "month":
-                list(
-                    set(["{:02d}".format(rd.month) for rd in sorted(req_dates)])
-                ),
-            "day": ["{:02d}".format(d) for d in range(1, 32)],
             "time": ["{:02d}:00".format(h) for h in range(0, 24)],
             "format":
                 "netcdf",
@@ -104,15 +107,46 @@ class ERA5Downloader(ClimateDownloader):
             retrieve_dict["pressure_level"] = level
 
         _, date_end = get_era5_available_date_range(dataset)
-        # TODO: This updates to dates available for download, prevents
-        #       redundant downloads but, requires work to prevent
-        #       postprocess method from running if no downloaded file.
-        req_dates = [date for date in req_dates if date <= date_end]
+        # This restricts requests to dates available for download, the
+        # downloader skips postprocessing if no file results
+        req_dates = [date for date in req_dates
+                     if pd.Timestamp(date) <= date_end]
+
+        if not len(req_dates):
+            logging.warning("No dates available to download for {}".format(
+                var))
+            return
+
+        plan = plan_era5_requests(req_dates,
+                                  hours=len(retrieve_dict["time"]),
+                                  max_fields=self._max_request_fields)
+        logging.info("Downloading {} dates for {} in {} request(s)".format(
+            len(req_dates), var, len(plan)))
 
         try:
-            logging.info("Downloading data for {}...".format(var))
+            if len(plan) == 1:
+                self._retrieve(dataset, dict(retrieve_dict, **plan[0]),
+                               download_path)
+            else:
+                part_paths = ["{}.part{}".format(download_path, idx)
+                              for idx in range(len(plan))]
+
+                with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+                    futures = [
+                        executor.submit(self._retrieve, dataset,
+                                        dict(retrieve_dict, **request),
+                                        part_path)
+                        for request, part_path in zip(plan, part_paths)
+                    ]
+
+                    for future in concurrent.futures.as_completed(futures):
+                        future.result()
+
+                combine_era5_parts(part_paths, download_path)
+
+                for part_path in part_paths:
+                    os.unlink(part_path)
 
-            self.client.retrieve(dataset, retrieve_dict, download_path)
             logging.info("Download completed: {}".format(download_path))
 
         except Exception as e:
@@ -120,6 +154,21 @@ class ERA5Downloader(ClimateDownloader):
                               "problem".format(download_path))
             raise RuntimeError(e)
 
+    def _retrieve(self, dataset: str, request: dict, download_path: str):
+        """Retrieves a single CDS request, once a request slot is free
+
+        The CDS queues requests server side, so the slots bound how many we
+        have outstanding regardless of how many download threads are used.
+
+        :param dataset:
+        :param request:
+        :param download_path:
+        """
+        with self._request_slots:
+            logging.debug("CDS request for {}: \n{}".format(
+                download_path, pformat(request)))
+            self.client.retrieve(dataset, request, download_path)
+
     def postprocess(self, var: str, download_path: object):
         """Processing of CDS downloaded files
 
@@ -166,32 +215,6 @@ class ERA5Downloader(ClimateDownloader):
             attributes = [attr for attr in attributes if attr not in omit_attrs]
             da.attrs["coordinates"] = " ".join(attributes)
 
-        doy_counts = da.time.groupby("time.dayofyear").count()
-
-        # There are situations where the API will spit out unordered and
-        # partial data, so we ensure here means come from full days and don't
-        # leave gaps. If we can avoid expver with this, might as well, so
-        # that's second
-        # FIXME: This will cause issues for already processed latlon data
-        if len(doy_counts[doy_counts < 24]) > 0:
-            # Edge case, where if first day of the month is the only day available, and
-            # partially so.
-            # e.g. 2025-01-01, with 00:00, 01:00 and 02:00 available, so, only 3 hours
-            # available, not 24 hours to create a daily average.
-            # This will only occur if trying to donwload on the 6th of a month due to 5 day
-            # lag in ERA5 data availability (available data = present day - 5).
-            if len(doy_counts) == 1:
-                # In this case, nothing to download/postprocess.
-                return
-            strip_dates_before = min([
-                dt.datetime.strptime(
-                    "{}-{}".format(d,
-                                   pd.to_datetime(da.time.values[0]).year),
-                    "%j-%Y")
-                for d in doy_counts[doy_counts < 24].dayofyear.values
-            ])
-            da = da.where(da.time < pd.Timestamp(strip_dates_before), drop=True)
-
         # Bryn Note:
         # expver = 1: ERA5
         # expver = 5: ERA5T
@@ -205,8 +228,15 @@ class ERA5Downloader(ClimateDownloader):
             ## Ref: https://confluence.ecmwf.int/pages/viewpage.action?pageId=173385064
             #da = da.sel(expver=1).combine_first(da.sel(expver=5))
 
-        da = da.sortby("time").resample(time='1D').mean()
-        da.to_netcdf(download_path)
+        # There are situations where the API will spit out unordered and
+        # partial data, so we ensure here means come from full days and don't
+        # leave gaps: hours are streamed in time order, stopping at the first
+        # day without all 24. If only a partial first day is available (e.g.
+        # downloading on the 6th of a month, given the 5 day ERA5 lag) there
+        # is nothing to postprocess, so nothing is written
+        # FIXME: This will cause issues for already processed latlon data
+        stream_daily_mean(da, download_path, min_samples=24)
+        ds.close()
 
     def additional_regrid_processing(self, datafile: str, cube_ease: object):
         """
@@ -229,6 +259,76 @@ class ERA5Downloader(ClimateDownloader):
             logging.debug("ERA5 additional regrid: {}".format(var_name))
             cube_ease.data /= 9.80665
 
+
+def plan_era5_requests(dates: object,
+                       hours: int = 24,
+                       max_fields: int = 120000) -> list:
+    """Coalesces dates into the fewest CDS requests that cover only them
+
+    CDS requests are the product of their year, month and day lists, so
+    months sharing the same requested days are combined, as are years
+    sharing the same months and days. Complete months are requested as days
+    1-31, which the CDS trims per month, so they all combine. Requests
+    exceeding max_fields are split by month.
+
+    :param dates: the dates required
+    :param hours: the number of hours requested per day
+    :param max_fields: maximum number of fields in a single request
+    :return: list of partial requests, with year, month and day lists
+    """
+    month_days = collections.defaultdict(set)
+
+    for date in dates:
+        date = pd.Timestamp(date)
+        month_days[(date.year, date.month)].add(date.day)
+
+    month_groups = collections.defaultdict(list)
+
+    for (year, month), days in sorted(month_days.items()):
+        if len(days) == calendar.monthrange(year, month)[1]:
+            days = range(1, 32)
+        month_groups[(year, tuple(sorted(days)))].append(month)
+
+    year_groups = collections.defaultdict(list)
+
+    for (year, days), months in month_groups.items():
+        year_groups[(tuple(months), days)].append(year)
+
+    plan = list()
+
+    for (months, days), years in year_groups.items():
+        month_fields = len(years) * len(days) * hours
+        months_per_request = max(1, max_fields // month_fields)
+
+        for idx in range(0, len(months), months_per_request):
+            plan.append({
+                "year": ["{:04d}".format(year) for year in years],
+                "month": ["{:02d}".format(month)
+                          for month in months[idx:idx + months_per_request]],
+                "day": ["{:02d}".format(day) for day in days],
+            })
+
+    return plan
+
+
+def combine_era5_parts(part_paths: object, download_path: str):
+    """Combines the files from a planned set of requests into one
+
+    :param part_paths: downloaded files, from plan_era5_requests requests
+    :param download_path: the combined file
+    """
+    with xr.open_dataset(part_paths[0]) as ds:
+        time_dim = "valid_time" if "valid_time" in ds.dims else "time"
+
+    with xr.open_mfdataset(part_paths,
+                           combine="nested",
+                           concat_dim=time_dim,
+                           data_vars="minimal",
+                           coords="minimal",
+                           compat="override") as ds:
+        ds.sortby(time_dim).to_netcdf(download_path)
+
+
 def get_era5_available_date_range(dataset: str="reanalysis-era5-single-levels"):
     """Returns the time range for which ERA5(T) data is available.
 
@@ -253,6 +353,7 @@ def get_era5_available_date_range(dataset: str="reanalysis-era5-single-levels"):
 def main():
     args = download_args(choices=["cdsapi"],
                          workers=True,
+                         regrid=True,
                          extra_args=((("-n", "--do-not-download"),
                                       dict(dest="download",
                                            action="store_false",
@@ -260,7 +361,9 @@ def main():
                                      (("-p", "--do-not-postprocess"),
                                       dict(dest="postprocess",
                                            action="store_false",
-                                           default=True))))
+                                           default=True)),
+                                     (("-mr", "--max-requests"),
+                                      dict(default=4, type=int))))
 
     logging.info("ERA5 Data Downloading")
     era5 = ERA5Downloader(
@@ -272,8 +375,12 @@ def main():
         delete_tempfiles=args.delete,
         download=args.download,
         levels=args.levels,
+        max_requests=args.max_requests,
         max_threads=args.workers,
         postprocess=args.postprocess,
+        regrid_batch_size=args.regrid_batch_size,
+        regrid_processes=args.regrid_processes,
+        sparse_regrid=args.sparse_regrid,
         north=args.hemisphere == "north",
         south=args.hemisphere == "south")
     era5.download()
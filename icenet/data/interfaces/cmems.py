@@ -1,14 +1,23 @@
+import concurrent
 import configparser
 import logging
 import os
+import random
+import shutil
+import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 import xarray as xr
 
 from icenet.data.cli import download_args
 from icenet.data.interfaces.downloader import ClimateDownloader
+from icenet.data.interfaces.utils import RequestJournal, \
+    batch_requested_dates, \
+    stream_daily_mean
 from icenet.utils import run_command
 from icenet.exceptions import CredentialsNotFoundError
 """
@@ -24,7 +33,17 @@ class ORAS5Downloader(ClimateDownloader):
 
     These aren't available for CMIP training at daily frequencies
 
+    Each request is split into monthly sub-ranges, subset concurrently and
+    recorded in a journal as they complete, so that restarts skip them.
+
+    :param backoff: base delay in seconds between attempts, doubling with
+        each failure and jittered
     :param identifier: how to identify this dataset
+    :param max_requests: maximum subset commands running at once, across
+        all download threads
+    :param request_timeout: seconds after which a subset command is killed
+    :param subset_command: template for the subset command, see
+        ORAS5Downloader.SUBSET_COMMAND for the fields available
     :param var_map: override the default ERA5Downloader.CDI_MAP variable map
     """
     VAR_MAP = {
@@ -37,12 +56,24 @@ class ORAS5Downloader(ClimateDownloader):
             "mlotst_oras",  # ocean_mixed_layer_thickness_defined_by_sigma_theta
     }
 
+    SUBSET_COMMAND = \
+        "copernicusmarine subset -i {dataset} -x -180 -X 179.75 " \
+        "-y {lat_min} -Y {lat_max} -z 0.5056 -Z 0.5059 " \
+        "-t '{start}T00:00:00' -T '{end}T00:00:00' -v {variable} " \
+        "-o {output_dir} -f {output_name} " \
+        "--username {username} --password '{password}' " \
+        "--no-metadata-cache --force-download"
+
     def __init__(self,
                  *args,
+                 backoff: float = 30.,
                  cred_file: str = os.path.expandvars("$HOME/.cmems.creds"),
                  dataset: str = "cmems_mod_glo_phy-all_my_0.25deg_P1D-m",
                  identifier: str = "oras5",
                  max_failures: int = 3,
+                 max_requests: int = 4,
+                 request_timeout: int = None,
+                 subset_command: str = SUBSET_COMMAND,
                  var_map: object = None,
                  **kwargs):
         super().__init__(*args,
@@ -74,8 +105,14 @@ class ORAS5Downloader(ClimateDownloader):
                                      )
             raise CredentialsNotFoundError(" ".join(error_message.split()))
 
+        self._backoff = backoff
         self._dataset = dataset
+        self._journal = RequestJournal(
+            os.path.join(self.base_path, "request_journal.json"))
         self._max_failures = max_failures
+        self._request_slots = threading.BoundedSemaphore(max_requests)
+        self._request_timeout = request_timeout
+        self._subset_command = subset_command
         self._var_map = var_map if var_map else ORAS5Downloader.VAR_MAP
 
         assert self._max_threads <= 8, "Too many request threads for ORAS5 " \
@@ -105,78 +142,130 @@ class ORAS5Downloader(ClimateDownloader):
         ds = xr.open_dataset(temp_path)
 
         da = getattr(ds, self._var_map[var]).rename(var)
-        if "depth" in list(ds.coords):
-            da = da.mean("depth").compute()
-        da.to_netcdf(download_path)
+        depth_mean = (lambda block: block.mean("depth")) \
+            if "depth" in list(ds.coords) else None
+
+        # Daily data, so this is a blockwise copy reducing depth as it goes
+        stream_daily_mean(da, download_path, preprocess=depth_mean)
+        ds.close()
 
     def _single_motu_download(self, var: str, level: object, req_dates: int,
                               download_path: object):
-        """Implements a single download from ... server
+        """Implements a single download from the Copernicus Marine service
+
         :param var:
         :param level:
         :param req_dates:
         :param download_path:
-        :return:
-
+        :return: whether all of the requested dates were downloaded
         """
-        attempts = 1
-        success = False
-
-        cmd = \
-            """copernicusmarine subset \
-                    -i {} \
-                    -x -180 \
-                    -X 179.75 \
-                    -y {} \
-                    -Y {} \
-                    -z 0.5056 \
-                    -Z 0.5059 \
-                    -t '{}T00:00:00' \
-                    -T '{}T00:00:00' \
-                    -v {} \
-                    -o {} \
-                    -f {} \
-                    --username {} \
-                    --password '{}' \
-                    --no-metadata-cache \
-                    --force-download \
-            """.format(self._dataset,
-                       self.hemisphere_loc[2],
-                       self.hemisphere_loc[0],
-                       req_dates[0].strftime("%Y-%m-%d"),
-                       req_dates[-1].strftime("%Y-%m-%d"),
-                       self._var_map[var],
-                       os.path.split(download_path)[0],
-                       os.path.split(download_path)[1],
-                       self._creds['username'],
-                       self._creds['password']
-                      )
-
-        cmd = " ".join(cmd.split())
+        ranges = [(batch[0], batch[-1]) for batch in
+                  batch_requested_dates(req_dates, attribute="month")]
+        outputs = [None] * len(ranges)
 
         tic = time.time()
-        while not success:
-            logging.debug("Attempt {}".format(attempts))
-
-            ret = run_command(cmd)
-            if ret.returncode != 0 or not os.path.exists(download_path + ".nc"):
-                attempts += 1
-                if attempts > self._max_failures:
-                    logging.error(
-                        "Couldn't download {} between {} and {}".format(
-                            var, req_dates[0], req_dates[-1]))
-                    break
-                time.sleep(30)
-            else:
-                success = True
-
-        if success:
-            # Copernicus Marine toolbox outputs with ".nc" extension
-            os.rename(download_path + ".nc", download_path)
-            dur = time.time() - tic
-            logging.debug("Done in {}m:{:.0f}s. ".format(
-                np.floor(dur / 60), dur % 60))
-        return success
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = {
+                executor.submit(self._download_range, var, start, end): idx
+                for idx, (start, end) in enumerate(ranges)
+            }
+
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    outputs[futures[future]] = future.result()
+                except Exception as e:
+                    logging.exception("Range failure: {}".format(e))
+
+        if None in outputs:
+            logging.error("{} of {} ranges for {} failed, completed ranges "
+                          "are journaled for the next attempt".format(
+                              outputs.count(None), len(ranges), var))
+            return False
+
+        if len(outputs) == 1:
+            shutil.move(outputs[0], download_path)
+        else:
+            with xr.open_mfdataset(outputs,
+                                   combine="nested",
+                                   concat_dim="time",
+                                   data_vars="minimal",
+                                   coords="minimal",
+                                   compat="override") as ds:
+                ds.sortby("time").to_netcdf(download_path)
+
+        self._journal.remove([self._range_key(var, start, end)
+                              for start, end in ranges])
+
+        if self.delete:
+            for output in outputs:
+                if os.path.exists(output):
+                    os.unlink(output)
+
+        dur = time.time() - tic
+        logging.debug("Done in {}m:{:.0f}s. ".format(
+            np.floor(dur / 60), dur % 60))
+        return True
+
+    def _download_range(self, var: str, start: object, end: object):
+        """Subsets a single date range, retrying with backoff
+
+        :param var:
+        :param start: first date of the range
+        :param end: last date of the range
+        :return: the downloaded file, or None on failure
+        """
+        key = self._range_key(var, start, end)
+        output = self._journal.completed(key)
+
+        if output is not None:
+            logging.info("Already downloaded {} between {} and {}".format(
+                var, start, end))
+            return output
+
+        output_dir = self.get_data_var_folder(var, append=[".requests"])
+        output_name = "{}_{}_{}".format(var, start.strftime("%Y%m%d"),
+                                        end.strftime("%Y%m%d"))
+        # Copernicus Marine toolbox outputs with ".nc" extension
+        output = os.path.join(output_dir, "{}.nc".format(output_name))
+
+        cmd = self._subset_command.format(
+            dataset=self._dataset,
+            lat_min=self.hemisphere_loc[2],
+            lat_max=self.hemisphere_loc[0],
+            start=start.strftime("%Y-%m-%d"),
+            end=end.strftime("%Y-%m-%d"),
+            variable=self._var_map[var],
+            output_dir=output_dir,
+            output_name=output_name,
+            username=self._creds['username'],
+            password=self._creds['password'])
+
+        for attempt in range(1, self._max_failures + 1):
+            logging.debug("Attempt {} for {} between {} and {}".format(
+                attempt, var, start, end))
+
+            with self._request_slots:
+                ret = run_command(cmd, timeout=self._request_timeout)
+
+            if ret.returncode == 0 and os.path.exists(output):
+                self._journal.record(key, output)
+                return output
+
+            if attempt < self._max_failures:
+                delay = self._backoff * 2 ** (attempt - 1) * \
+                    (0.5 + random.random())
+                logging.warning("Retrying {} between {} and {} in "
+                                "{:.0f}s".format(var, start, end, delay))
+                time.sleep(delay)
+
+        logging.error("Couldn't download {} between {} and {}".format(
+            var, start, end))
+        return None
+
+    def _range_key(self, var: str, start: object, end: object) -> str:
+        return ":".join([self._dataset, self.hemisphere_str[0], var,
+                         start.strftime("%Y%m%d"), end.strftime("%Y%m%d")])
 
     def additional_regrid_processing(self, datafile: object,
                                      cube_ease: object) -> object:
@@ -192,6 +281,7 @@ class ORAS5Downloader(ClimateDownloader):
 
 def main():
     args = download_args(workers=True,
+                         regrid=True,
                          extra_args=((("-n", "--do-not-download"),
                                       dict(dest="download",
                                            action="store_false",
@@ -199,7 +289,11 @@ def main():
                                      (("-p", "--do-not-postprocess"),
                                       dict(dest="postprocess",
                                            action="store_false",
-                                           default=True))))
+                                           default=True)),
+                                     (("-mr", "--max-requests"),
+                                      dict(default=4, type=int)),
+                                     (("-rt", "--request-timeout"),
+                                      dict(default=None, type=int))))
 
     logging.info("ORAS5 Data Downloading")
     oras5 = ORAS5Downloader(
@@ -212,8 +306,13 @@ def main():
         delete_tempfiles=args.delete,
         download=args.delete,
         levels=[None for _ in args.vars],
+        max_requests=args.max_requests,
         max_threads=args.workers,
         postprocess=args.postprocess,
+        regrid_batch_size=args.regrid_batch_size,
+        regrid_processes=args.regrid_processes,
+        request_timeout=args.request_timeout,
+        sparse_regrid=args.sparse_regrid,
         north=args.hemisphere == "north",
         south=args.hemisphere == "south",
     )
@@ -1,21 +1,28 @@
 import concurrent
+import hashlib
 import logging
+import multiprocessing
 import os
 import re
 import shutil
 import tempfile
+import time
 
 from abc import abstractmethod
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from itertools import product
 
 from icenet.data.sic.mask import Masks
 from icenet.data.sic.utils import SIC_HEMI_STR
+from icenet.data.catalog import DataCatalog
 from icenet.data.producers import Downloader
 from icenet.data.utils import assign_lat_lon_coord_system, \
     gridcell_angles_from_dim_coords, \
+    append_netcdf_time, \
     invert_gridcell_angles, \
-    rotate_grid_vectors
+    linear_regrid_weights, \
+    rotate_grid_vectors, \
+    rotate_vector_arrays
 from icenet.data.interfaces.utils import batch_requested_dates
 from icenet.utils import run_command
 
@@ -26,6 +33,8 @@ import iris.exceptions
 import numpy as np
 import pandas as pd
 import xarray as xr
+
+from scipy import sparse
 """
 
 """
@@ -46,33 +55,36 @@ def filter_dates_on_data(latlon_path: str,
     intermediate file OR the target regridded file, we'll not bother
     downloading again. This can be overridden via the method arguments.
 
+    The dates held are taken from the DataCatalog, so the files are only
+    opened when they've changed since last recorded.
+
     :param latlon_path:
     :param regridded_name:
     :param req_dates:
     :param check_latlon:
     :param check_regridded:
-    :param drop_vars:
+    :param drop_vars: unused, as only the time coordinate is read
     :return: req_dates(list)
     """
 
     latlon_dates = list()
     regridded_dates = list()
-    drop_vars = list() if drop_vars is None else drop_vars
 
     # Latlon files should in theory be aggregated and singular arrays
     # meaning we can naively open and interrogate the dates
     if check_latlon and os.path.exists(latlon_path):
         try:
-            latlon_dates = xr.open_dataset(latlon_path,
-                                           drop_variables=drop_vars).time.values
+            latlon_dates = \
+                DataCatalog.default(latlon_path).dates(latlon_path).values
             logging.debug("{} latlon dates already available in {}".format(
                 len(latlon_dates), latlon_path))
-        except ValueError:
-            logging.warning("Latlon {} dates not readable, ignoring file")
+        except (KeyError, OSError, ValueError):
+            logging.warning("Latlon {} dates not readable, ignoring file".
+                            format(latlon_path))
 
     if check_regridded and os.path.exists(regridded_name):
-        regridded_dates = xr.open_dataset(regridded_name,
-                                          drop_variables=drop_vars).time.values
+        regridded_dates = \
+            DataCatalog.default(regridded_name).dates(regridded_name).values
         logging.debug("{} regridded dates already available in {}".format(
             len(regridded_dates), regridded_name))
 
@@ -89,7 +101,12 @@ def filter_dates_on_data(latlon_path: str,
 def merge_files(new_datafile: str,
                 other_datafile: str,
                 drop_variables: object = None):
-    """
+    """Merges newly regridded data into previously regridded data
+
+    The new time steps are appended to the previous file, taking precedence
+    over any they duplicate, which then replaces the new file. Only the new
+    data is written, provided the previous file has an unlimited time
+    dimension.
 
     :param new_datafile:
     :param other_datafile:
@@ -98,24 +115,46 @@ def merge_files(new_datafile: str,
     drop_variables = list() if drop_variables is None else drop_variables
 
     if other_datafile is not None:
-        (datafile_path, new_filename) = os.path.split(new_datafile)
-        moved_new_datafile = \
-            os.path.join(datafile_path, "new.{}".format(new_filename))
-        os.rename(new_datafile, moved_new_datafile)
-        d1 = xr.open_dataarray(moved_new_datafile,
-                               drop_variables=drop_variables)
+        with xr.open_dataarray(new_datafile,
+                               drop_variables=drop_variables) as da:
+            da = da.load()
 
         logging.info(
-            "Concatenating with previous data {}".format(other_datafile))
-        d2 = xr.open_dataarray(other_datafile, drop_variables=drop_variables)
-        new_ds = xr.concat([d1, d2], dim="time").\
-            sortby("time").\
-            drop_duplicates("time", keep="first")
+            "Appending to previous data {}".format(other_datafile))
+        written = append_netcdf_time(other_datafile, da, overwrite=True)
+
+        logging.info("Saving merged data ({} new time steps) to {}... ".format(
+            written, new_datafile))
+        os.replace(other_datafile, new_datafile)
+
+        catalog = DataCatalog.default(new_datafile)
+        catalog.remove([other_datafile])
+        catalog.record(new_datafile)
+
 
-        logging.info("Saving merged data to {}... ".format(new_datafile))
-        new_ds.to_netcdf(new_datafile)
-        os.unlink(other_datafile)
-        os.unlink(moved_new_datafile)
+# Downloader instance shared with forked regrid workers, set by
+# _init_regrid_worker so that the (often unpicklable) API clients held by
+# implementations never need to cross the process boundary
+_REGRID_DOWNLOADER = None
+
+
+def _init_regrid_worker(downloader: object):
+    """
+
+    :param downloader:
+    """
+    global _REGRID_DOWNLOADER
+    _REGRID_DOWNLOADER = downloader
+
+
+def _regrid_worker(method: str, items: object) -> list:
+    """
+
+    :param method: name of the downloader regrid method to call
+    :param items: files or wind file pairs to hand to the method
+    :return:
+    """
+    return getattr(_REGRID_DOWNLOADER, method)(items)
 
 
 class ClimateDownloader(Downloader):
@@ -129,6 +168,12 @@ class ClimateDownloader(Downloader):
     :param postprocess:
     :param pregrid_prefix:
     :param levels:
+    :param regrid_batch_size: files per regrid task, defaults to 1000 for
+        threaded and 1 for process based regridding
+    :param regrid_processes: regrid in this many forked processes, rather
+        than max_threads threads, when greater than zero
+    :param sparse_regrid: regrid with cached sparse interpolation weights
+        rather than iris, where the source grid allows it
     :param var_name_idx:
     :param var_names:
     """
@@ -144,6 +189,9 @@ class ClimateDownloader(Downloader):
                  max_threads: int = 1,
                  postprocess: bool = True,
                  pregrid_prefix: str = "latlon_",
+                 regrid_batch_size: int = None,
+                 regrid_processes: int = 0,
+                 sparse_regrid: bool = False,
                  var_name_idx: int = -1,
                  var_names: object = (),
                  **kwargs):
@@ -160,10 +208,15 @@ class ClimateDownloader(Downloader):
         self._max_threads = max_threads
         self._postprocess = postprocess
         self._pregrid_prefix = pregrid_prefix
+        self._regrid_batch_size = regrid_batch_size
+        self._regrid_processes = regrid_processes
+        self._regrid_weights = dict()
         self._rotatable_files = []
         self._sic_ease_cubes = dict()
+        self._sparse_regrid = sparse_regrid
         self._var_name_idx = var_name_idx
         self._var_names = list(var_names)
+        self._wind_angles = None
 
         assert len(self._var_names), "No variables requested"
         assert len(self._levels) == len(self._var_names), \
@@ -267,29 +320,21 @@ class ClimateDownloader(Downloader):
 
                     self.download_method(var, level, req_dates, tmp_latlon_path)
 
-                    if os.path.exists(latlon_path):
-                        (ll_path, ll_file) = os.path.split(latlon_path)
-                        rename_latlon_path = os.path.join(
-                            ll_path,
-                            "{}_old{}".format(*os.path.splitext(ll_file)))
-                        os.rename(latlon_path, rename_latlon_path)
-                        old_da = xr.open_dataarray(
-                            rename_latlon_path, drop_variables=self._drop_vars)
-                        tmp_da = xr.open_dataarray(
-                            tmp_latlon_path, drop_variables=self._drop_vars)
-
-                        logging.debug("Input (old): \n{}".format(old_da))
-                        logging.debug("Input (dl): \n{}".format(tmp_da))
-
-                        da = xr.concat([old_da, tmp_da], dim="time")
-                        logging.debug("Output: \n{}".format(da))
-
-                        da.to_netcdf(latlon_path)
-                        old_da.close()
-                        tmp_da.close()
-                        os.unlink(rename_latlon_path)
+                    if not os.path.exists(tmp_latlon_path):
+                        logging.warning("Nothing downloaded for {}".format(
+                            latlon_path))
+                    elif os.path.exists(latlon_path):
+                        with xr.open_dataarray(
+                                tmp_latlon_path,
+                                drop_variables=self._drop_vars) as tmp_da:
+                            logging.debug("Input (dl): \n{}".format(tmp_da))
+                            written = append_netcdf_time(latlon_path,
+                                                         tmp_da.load())
+                        logging.debug("Appended {} time steps to {}".format(
+                            written, latlon_path))
                     else:
                         shutil.move(tmp_latlon_path, latlon_path)
+                        DataCatalog.default(latlon_path).record(latlon_path)
 
                 logging.info("Downloaded to {}".format(latlon_path))
             else:
@@ -328,7 +373,8 @@ class ClimateDownloader(Downloader):
 
             logging.info("Retrieving and saving {}".format(latlon_path))
             dt_da.compute()
-            dt_da.to_netcdf(latlon_path)
+            dt_da.to_netcdf(latlon_path, unlimited_dims=["time"])
+            DataCatalog.default(latlon_path).record(latlon_path)
 
             if not os.path.exists(regridded_name):
                 self._files_downloaded.append(latlon_path)
@@ -370,24 +416,82 @@ class ClimateDownloader(Downloader):
     def regrid(self, files: object = None, rotate_wind: bool = True):
         """
 
+        Wind component files are regridded in pairs, being rotated onto the
+        EASE grid before they're saved, rather than rotated afterwards.
+
         :param files:
+        :param rotate_wind:
         """
         filelist = self._files_downloaded if not files else files
-        batches = [filelist[b:b + 1000] for b in range(0, len(filelist), 1000)]
+        wind_pairs = list()
 
-        max_workers = min(len(batches), self._max_threads)
+        if rotate_wind:
+            wind_pairs, filelist = self._pair_wind_files(filelist)
+
+        use_processes = self._regrid_processes > 0
+        batch_size = self._regrid_batch_size \
+            if self._regrid_batch_size else (1 if use_processes else 1000)
+
+        if use_processes and \
+                "fork" not in multiprocessing.get_all_start_methods():
+            logging.warning("Process based regridding relies on fork, which "
+                            "is unavailable here, using threads instead")
+            use_processes = False
+
+        tasks = [("_batch_regrid", filelist[b:b + batch_size], 1)
+                 for b in range(0, len(filelist), batch_size)] + \
+                [("_regrid_wind_pairs", wind_pairs[b:b + batch_size], 2)
+                 for b in range(0, len(wind_pairs), batch_size)]
+        num_files = len(filelist) + 2 * len(wind_pairs)
+
+        workers = self._regrid_processes \
+            if use_processes else self._max_threads
+        max_workers = min(len(tasks), workers)
         regrid_results = list()
 
         if max_workers > 0:
-            with ThreadPoolExecutor(max_workers=max_workers) \
-                    as executor:
-                futures = []
+            logging.info("Regridding {} files in {} tasks with {} {}".format(
+                num_files, len(tasks), max_workers,
+                "processes" if use_processes else "threads"))
+
+            if use_processes:
+                # Resolve the target grid and wind angles before forking, so
+                # workers inherit them rather than each deriving them
+                _ = self.sic_ease_cube
+
+                if len(wind_pairs):
+                    _ = self.wind_angles
+
+                if self._sparse_regrid:
+                    # Likewise the weights for the first source grid, which
+                    # usually serves every file, so workers don't all race
+                    # to calculate them
+                    self._init_regrid_weights(
+                        filelist[0] if len(filelist) else wind_pairs[0][0])
+
+                executor = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context("fork"),
+                    initializer=_init_regrid_worker,
+                    initargs=(self,))
+            else:
+                executor = ThreadPoolExecutor(max_workers=max_workers)
+
+            with executor:
+                futures = dict()
 
-                for files in batches:
-                    future = executor.submit(self._batch_regrid, files)
-                    futures.append(future)
+                for method, items, files_per_item in tasks:
+                    future = executor.submit(_regrid_worker, method, items) \
+                        if use_processes else \
+                        executor.submit(getattr(self, method), items)
+                    futures[future] = len(items) * files_per_item
+
+                num_done = 0
+                start = time.time()
 
                 for future in concurrent.futures.as_completed(futures):
+                    num_done += futures[future]
+
                     try:
                         fut_results = future.result()
 
@@ -397,16 +501,93 @@ class ClimateDownloader(Downloader):
                                     res))
                             regrid_results.append(res)
                     except Exception as e:
-                        logging.exception("Thread failure: {}".format(e))
+                        logging.exception("Regrid failure: {}".format(e))
+
+                    elapsed = time.time() - start
+                    logging.info("Regridded {}/{} files in {:.1f}s "
+                                 "({:.2f} files/s)".format(
+                                     num_done, num_files, elapsed,
+                                     num_done / elapsed if elapsed else 0.))
         else:
             logging.info("No regrid batches to processing, moving on...")
 
-        if rotate_wind:
-            logging.info("Rotating wind data prior to merging")
-            self.rotate_wind_data()
+        self._merge_regridded(regrid_results, use_processes)
+
+    def _pair_wind_files(self,
+                         files: object,
+                         apply_to: object = ("uas", "vas")) -> tuple:
+        """Pairs up wind component files covering the same period
 
-        for new_datafile, moved_datafile in regrid_results:
-            merge_files(new_datafile, moved_datafile, self._drop_vars)
+        :param files: the files to be regridded
+        :param apply_to: the x and y wind component variable names
+        :return: list of (x, y) file pairs, list of the remaining files
+        """
+        wind_files = {var: dict() for var in apply_to}
+        others = list()
+
+        for datafile in files:
+            var = os.path.dirname(datafile).split(os.sep)[self._var_name_idx]
+
+            if var in wind_files:
+                key = re.sub(r'^{}_'.format(var), '',
+                             os.path.basename(datafile))
+                wind_files[var][key] = datafile
+            else:
+                others.append(datafile)
+
+        keys = sorted(set(wind_files[apply_to[0]]).intersection(
+            wind_files[apply_to[1]]))
+        pairs = [(wind_files[apply_to[0]][key], wind_files[apply_to[1]][key])
+                 for key in keys]
+
+        for var in apply_to:
+            for key in sorted(set(wind_files[var]).difference(keys)):
+                logging.warning("{} has no matching wind component, it will "
+                                "not be rotated".format(wind_files[var][key]))
+                others.append(wind_files[var][key])
+
+        logging.info("{} wind file pairs to regrid and rotate".format(
+            len(pairs)))
+        return pairs, others
+
+    def _merge_regridded(self, regrid_results: object, use_processes: bool):
+        """Merges regridded files with any previously regridded data
+
+        Each result refers to a distinct output file, so the merges are
+        independent and are run concurrently.
+
+        :param regrid_results: list of (new_datafile, moved_datafile) tuples
+        :param use_processes: merge in processes rather than threads
+        """
+        to_merge = [res for res in regrid_results if res[1] is not None]
+
+        if not len(to_merge):
+            return
+
+        workers = self._regrid_processes \
+            if use_processes else self._max_threads
+        max_workers = max(1, min(len(to_merge), workers))
+
+        logging.info("Merging {} regridded files with previous data".format(
+            len(to_merge)))
+
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("fork")) \
+            if use_processes else ThreadPoolExecutor(max_workers=max_workers)
+
+        with executor:
+            futures = [
+                executor.submit(merge_files, new_datafile, moved_datafile,
+                                self._drop_vars)
+                for new_datafile, moved_datafile in to_merge
+            ]
+
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.exception("Merge failure: {}".format(e))
 
     def _batch_regrid(self, files: object):
         """
@@ -416,52 +597,258 @@ class ClimateDownloader(Downloader):
         results = list()
 
         for datafile in files:
-            (datafile_path, datafile_name) = os.path.split(datafile)
+            regridded = self._regrid_file(datafile)
 
-            new_filename = re.sub(r'^{}'.format(self.pregrid_prefix), '',
-                                  datafile_name)
-            new_datafile = os.path.join(datafile_path, new_filename)
+            if regridded is None:
+                continue
 
-            moved_datafile = None
+            new_datafile, moved_datafile, cube_ease = regridded
+            self._save_regridded(datafile, new_datafile, cube_ease)
+            results.append((new_datafile, moved_datafile))
 
-            if os.path.exists(new_datafile):
-                moved_filename = "moved.{}".format(new_filename)
-                moved_datafile = os.path.join(datafile_path, moved_filename)
-                os.rename(new_datafile, moved_datafile)
+        return results
 
-                logging.info("{} already existed, moved to {}".format(
-                    new_filename, moved_filename))
+    def _regrid_wind_pairs(self, pairs: object):
+        """Regrids wind component file pairs, rotating them before saving
 
-            logging.debug("Regridding {}".format(datafile))
+        :param pairs: list of (x, y) component file pairs
+        """
+        results = list()
 
-            try:
-                cube = iris.load_cube(datafile)
-                cube = self.convert_cube(cube)
+        for pair in pairs:
+            regridded = [self._regrid_file(datafile) for datafile in pair]
 
-                cube_ease = cube.regrid(self.sic_ease_cube,
-                                        iris.analysis.Linear())
+            if None in regridded:
+                logging.error("Unable to regrid both of {}, cannot rotate "
+                              "so not saving either".format(" and ".join(pair)))
 
-            except iris.exceptions.CoordinateNotFoundError:
-                logging.warning(
-                    "{} has no coordinates...".format(datafile_name))
-                if self.delete:
-                    logging.debug(
-                        "Deleting failed file {}...".format(datafile_name))
-                    os.unlink(datafile)
+                for res in regridded:
+                    if res is not None and res[1] is not None:
+                        os.rename(res[1], res[0])
                 continue
 
-            self.additional_regrid_processing(datafile, cube_ease)
+            logging.info("Rotating {} and {}".format(*pair))
+            (u_file, u_new, u_moved, u_cube), \
+                (v_file, v_new, v_moved, v_cube) = \
+                [(datafile,) + res for datafile, res in zip(pair, regridded)]
 
-            logging.info("Saving regridded data to {}... ".format(new_datafile))
-            iris.save(cube_ease, new_datafile, fill_value=np.nan)
-            results.append((new_datafile, moved_datafile))
+            u_cube.data, v_cube.data = rotate_vector_arrays(
+                u_cube.data, v_cube.data, self.wind_angles)
 
-            if self.delete:
-                logging.info("Removing {}".format(datafile))
-                os.remove(datafile)
+            self._save_regridded(u_file, u_new, u_cube)
+            self._save_regridded(v_file, v_new, v_cube)
+            results += [(u_new, u_moved), (v_new, v_moved)]
 
         return results
 
+    def _regrid_file(self, datafile: str):
+        """
+
+        :param datafile:
+        :return: new and moved filenames and the regridded cube, or None
+        """
+        (datafile_path, datafile_name) = os.path.split(datafile)
+
+        new_filename = re.sub(r'^{}'.format(self.pregrid_prefix), '',
+                              datafile_name)
+        new_datafile = os.path.join(datafile_path, new_filename)
+
+        moved_datafile = None
+
+        if os.path.exists(new_datafile):
+            moved_filename = "moved.{}".format(new_filename)
+            moved_datafile = os.path.join(datafile_path, moved_filename)
+            os.rename(new_datafile, moved_datafile)
+
+            logging.info("{} already existed, moved to {}".format(
+                new_filename, moved_filename))
+
+        logging.debug("Regridding {}".format(datafile))
+
+        try:
+            cube = iris.load_cube(datafile)
+            cube = self.convert_cube(cube)
+
+            cube_ease = self.sparse_regrid_cube(cube) \
+                if self._sparse_regrid else None
+
+            if cube_ease is None:
+                cube_ease = cube.regrid(self.sic_ease_cube,
+                                        iris.analysis.Linear())
+
+        except iris.exceptions.CoordinateNotFoundError:
+            logging.warning(
+                "{} has no coordinates...".format(datafile_name))
+            if self.delete:
+                logging.debug(
+                    "Deleting failed file {}...".format(datafile_name))
+                os.unlink(datafile)
+            return None
+
+        self.additional_regrid_processing(datafile, cube_ease)
+        return new_datafile, moved_datafile, cube_ease
+
+    def _save_regridded(self, datafile: str, new_datafile: str,
+                        cube_ease: object):
+        """
+
+        :param datafile:
+        :param new_datafile:
+        :param cube_ease:
+        """
+        logging.info("Saving regridded data to {}... ".format(new_datafile))
+        iris.save(cube_ease,
+                  new_datafile,
+                  fill_value=np.nan,
+                  unlimited_dimensions=["time"])
+        DataCatalog.default(new_datafile).record(new_datafile)
+
+        if self.delete:
+            logging.info("Removing {}".format(datafile))
+            os.remove(datafile)
+            DataCatalog.default(datafile).remove([datafile])
+
+    def get_regrid_weights(self, lon: object, lat: object) -> object:
+        """Sparse weights from a lat/lon grid onto the EASE grid
+
+        Weights are computed once per source and target grid pair and
+        persisted under the regrid_weights folder, so they're shared
+        between runs and regrid processes.
+
+        :param lon: 1D longitude dimension coordinate of the source
+        :param lat: 1D latitude dimension coordinate of the source
+        :return: CSR matrix of shape (EASE cells, source cells)
+        """
+        grid = self.sic_ease_cube
+        grid_x = grid.coord(axis="x", dim_coords=True)
+        grid_y = grid.coord(axis="y", dim_coords=True)
+
+        key = hashlib.sha1()
+
+        for item in (lon.points, lat.points, grid_x.points, grid_y.points):
+            key.update(np.ascontiguousarray(item, dtype=np.float64).tobytes())
+        key.update(repr(lat.coord_system).encode())
+        key.update(repr(grid.coord_system()).encode())
+        key = key.hexdigest()
+
+        if key not in self._regrid_weights:
+            weights_path = os.path.join(
+                self.get_data_var_folder("regrid_weights"),
+                "{}.npz".format(key))
+
+            if os.path.exists(weights_path):
+                logging.debug("Loading regrid weights from {}".format(
+                    weights_path))
+                weights = sparse.load_npz(weights_path)
+            else:
+                logging.info("Calculating regrid weights to {}".format(
+                    weights_path))
+                x, y = np.meshgrid(grid_x.points, grid_y.points)
+                src_crs = lat.coord_system.as_cartopy_crs()
+                tgt_points = src_crs.transform_points(
+                    grid.coord_system().as_cartopy_crs(), x, y)
+
+                weights = linear_regrid_weights(
+                    lon.points, lat.points,
+                    tgt_points[..., 0], tgt_points[..., 1],
+                    x_modulus=lon.units.modulus)
+
+                # Written aside and moved, as regrid workers may race
+                temp_path = "{}.{}.npz".format(
+                    os.path.splitext(weights_path)[0], os.getpid())
+                sparse.save_npz(temp_path, weights)
+                os.replace(temp_path, weights_path)
+            self._regrid_weights[key] = weights
+        return self._regrid_weights[key]
+
+    @staticmethod
+    def _sparse_regrid_coords(cube: object) -> object:
+        """
+
+        :param cube:
+        :return: longitude and latitude coordinates, or None if the cube
+            isn't supported by sparse regridding
+        """
+        lat = cube.coord("latitude")
+        lon = cube.coord("longitude")
+
+        if lat.ndim != 1 or lon.ndim != 1 or \
+                lat.coord_system is None or \
+                cube.coord_dims(lat) != (cube.ndim - 2,) or \
+                cube.coord_dims(lon) != (cube.ndim - 1,):
+            return None
+        return lon, lat
+
+    def _init_regrid_weights(self, datafile: str):
+        """Loads or calculates the regrid weights for a file's grid
+
+        :param datafile:
+        """
+        try:
+            coords = self._sparse_regrid_coords(
+                self.convert_cube(iris.load_cube(datafile)))
+        except iris.exceptions.CoordinateNotFoundError:
+            # Left for the workers to handle
+            return
+
+        if coords is not None:
+            self.get_regrid_weights(*coords)
+
+    def sparse_regrid_cube(self, cube: object) -> object:
+        """Regrids a cube onto the EASE grid with cached sparse weights
+
+        Equivalent to regridding with iris.analysis.Linear, but all leading
+        (e.g. time) slices are handled with a single sparse product.
+
+        :param cube: cube with 1D latitude and longitude as trailing dims
+        :return: the regridded cube, or None if the cube isn't supported
+        """
+        coords = self._sparse_regrid_coords(cube)
+
+        if coords is None:
+            logging.debug("Cube grid not supported by sparse regridding, "
+                          "using iris")
+            return None
+
+        lon, lat = coords
+        weights = self.get_regrid_weights(lon, lat)
+        grid = self.sic_ease_cube
+        grid_x = grid.coord(axis="x", dim_coords=True)
+        grid_y = grid.coord(axis="y", dim_coords=True)
+
+        src = cube.data
+        lead_shape = src.shape[:-2]
+        dtype = np.promote_types(src.dtype, np.float32)
+        values = np.ma.getdata(src).reshape(-1, weights.shape[1])
+        src_mask = np.ma.getmaskarray(src).reshape(values.shape)
+
+        if src_mask.any():
+            values = np.where(src_mask, 0, values)
+
+        data = (weights @ values.T).T.astype(dtype).reshape(
+            lead_shape + (len(grid_y.points), len(grid_x.points)))
+
+        if np.ma.isMaskedArray(src):
+            # Mask targets with any contribution from a masked source cell
+            mask = (abs(weights) @ src_mask.T.astype(np.float32)).T > 0
+            data = np.ma.masked_array(data, mask=mask.reshape(data.shape))
+
+        dim_coords = [(coord.copy(), cube.coord_dims(coord)[0])
+                      for coord in cube.dim_coords
+                      if coord.name() not in (lat.name(), lon.name())]
+        dim_coords += [(grid_y.copy(), cube.ndim - 2),
+                       (grid_x.copy(), cube.ndim - 1)]
+        aux_coords = [(coord.copy(), cube.coord_dims(coord))
+                      for coord in cube.aux_coords
+                      if not set(cube.coord_dims(coord)).intersection(
+                          (cube.ndim - 2, cube.ndim - 1))]
+
+        cube_ease = iris.cube.Cube(data,
+                                   dim_coords_and_dims=dim_coords,
+                                   aux_coords_and_dims=aux_coords)
+        cube_ease.metadata = cube.metadata
+        return cube_ease
+
     def convert_cube(self, cube: object):
         """Converts Iris cube to be fit for regrid
 
@@ -631,3 +1018,17 @@ class ClimateDownloader(Downloader):
     @property
     def var_names(self):
         return self._var_names
+
+    @property
+    def wind_angles(self):
+        """Radian angles rotating lat/lon aligned vectors onto the EASE grid
+
+        :return: angles array matching the EASE grid spatial dims
+        """
+        if self._wind_angles is None:
+            angles = gridcell_angles_from_dim_coords(self.sic_ease_cube)
+            invert_gridcell_angles(angles)
+            angles.convert_units("radians")
+            self._wind_angles = np.ma.filled(
+                np.ma.asarray(angles.data, dtype=np.float64), np.nan)
+        return self._wind_angles
@@ -1,9 +1,17 @@
+import concurrent
+import json
 import logging
 import os
+import re
+import threading
+import time
 import warnings
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
+import requests
 import xarray as xr
 
 from icenet.data.interfaces.downloader import ClimateDownloader
@@ -13,6 +21,91 @@ from icenet.data.utils import esgf_search
 
 """
 
+# Avoid the 500MB DAP request limit
+DAP_REQUEST_LIMIT = 499 * 1024 * 1024
+
+
+class ESGFSearchCache:
+    """Persisted cache of ESGF search results, keyed by query
+
+    :param path: JSON file to persist the results to
+    :param ttl: lifetime of results, in seconds, as newer dataset versions
+        can be published
+    """
+
+    def __init__(self, path: str, ttl: int = 7 * 24 * 3600):
+        self._lock = threading.Lock()
+        self._path = path
+        self._results = dict()
+        self._ttl = ttl
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as fh:
+                    self._results = json.load(fh)
+            except ValueError:
+                logging.warning("Ignoring corrupt search cache {}".format(
+                    path))
+
+    @staticmethod
+    def key(query: dict) -> str:
+        return json.dumps(query, sort_keys=True)
+
+    def get(self, query: dict) -> object:
+        """
+
+        :param query:
+        :return: list of result URLs, or None if not cached
+        """
+        with self._lock:
+            entry = self._results.get(self.key(query))
+
+        if entry is None or time.time() - entry["time"] > self._ttl:
+            return None
+        return entry["results"]
+
+    def set(self, query: dict, results: list):
+        """
+
+        :param query:
+        :param results:
+        """
+        with self._lock:
+            self._results[self.key(query)] = dict(results=list(results),
+                                                  time=time.time())
+            tmp_path = "{}.{}.tmp".format(self._path, threading.get_ident())
+
+            with open(tmp_path, "w") as fh:
+                json.dump(self._results, fh)
+            os.replace(tmp_path, self._path)
+
+
+def filter_results_on_dates(results: object, start: object,
+                            end: object) -> list:
+    """Drops result files outside of a date range, going by their names
+
+    CMIP6 file names end with their date range, e.g.
+    tas_day_MRI-ESM2-0_historical_r1i1p1f1_gn_19500101-19991231.nc, so we
+    can avoid opening files that can't hold the dates. Files without a
+    recognisable range are kept.
+
+    :param results: result URLs
+    :param start: first date required
+    :param end: last date required
+    :return: the URLs that may hold dates in the range
+    """
+    start = int(pd.Timestamp(start).strftime("%Y%m%d"))
+    end = int(pd.Timestamp(end).strftime("%Y%m%d"))
+    selected = list()
+
+    for url in results:
+        match = re.search(r"_(\d{8})\d*-(\d{8})\d*\.nc$", url)
+
+        if match is None or \
+                (int(match.group(1)) <= end and int(match.group(2)) >= start):
+            selected.append(url)
+    return selected
+
 
 class CMIP6Downloader(ClimateDownloader):
     """Climate downloader to provide CMIP6 reanalysis data from ESGF APIs
@@ -29,6 +122,10 @@ class CMIP6Downloader(ClimateDownloader):
     :param grid_map:
     :param grid_override:
     :param exclude_nodes:
+    :param dap_workers: number of OPeNDAP files subset concurrently
+    :param probe_width: number of nodes, in order of preference, queried
+        concurrently before moving on to the next set
+    :param search_ttl: lifetime of cached search results, in seconds
 
     "MRI-ESM2-0", "r1i1p1f1", None
     "MRI-ESM2-0", "r2i1p1f1", None
@@ -101,6 +198,9 @@ class CMIP6Downloader(ClimateDownloader):
                  grid_map: object = None,
                  grid_override: object = None,
                  exclude_nodes: object = None,
+                 dap_workers: int = 4,
+                 probe_width: int = 3,
+                 search_ttl: int = 7 * 24 * 3600,
                  **kwargs):
         super().__init__(*args,
                          identifier="cmip6.{}.{}".format(source, member),
@@ -118,6 +218,11 @@ class CMIP6Downloader(ClimateDownloader):
         self._grid_map = grid_map if grid_map else CMIP6Downloader.GRID_MAP
         self._grid_map_override = grid_override
 
+        self._dap_workers = dap_workers
+        self._probe_width = probe_width
+        self._search_cache = ESGFSearchCache(
+            os.path.join(self.base_path, "esgf_search.json"), ttl=search_ttl)
+
     def _single_download(self, var_prefix: str, level: object,
                          req_dates: object):
         """Overridden CMIP implementation for downloading from DAP server
@@ -152,46 +257,135 @@ class CMIP6Downloader(ClimateDownloader):
         logging.info("Querying ESGF")
         results = []
 
-        for experiment_id in self._experiments:
-            query['experiment_id'] = experiment_id
-
-            for data_node in self._nodes:
-                query['data_node'] = data_node
-
-                # FIXME: inefficient, we can strip redundant results files
-                #  based on WCRP data management standards for file naming,
-                #  such as based on date. Refactor/rewrite this impl...
-                node_results = esgf_search(**query)
-
-                if len(node_results):
-                    logging.debug("Query: {}".format(query))
-                    logging.debug("Found {}: {}".format(experiment_id,
-                                                        node_results))
-                    results.extend(node_results)
-                    break
+        with ThreadPoolExecutor(max_workers=len(self._experiments)) \
+                as executor:
+            for experiment_results in executor.map(
+                    lambda experiment_id: self._search_nodes(
+                        dict(query, experiment_id=experiment_id)),
+                    self._experiments):
+                results.extend(experiment_results)
 
         logging.info("Found {} {} results from ESGF search".format(
             len(results), var_prefix))
 
+        results = filter_results_on_dates(results, req_dates[0],
+                                          req_dates[-1])
+        logging.info("{} results may hold dates {} to {}".format(
+            len(results), req_dates[0], req_dates[-1]))
+
         try:
-            # http://xarray.pydata.org/en/stable/user-guide/io.html?highlight=opendap#opendap
-            # Avoid 500MB DAP request limit
-            cmip6_da = xr.open_mfdataset(results,
-                                         combine='by_coords',
-                                         chunks={'time': '499MB'})[var_prefix]
+            subsets = list()
 
-            cmip6_da = cmip6_da.sel(time=slice(req_dates[0], req_dates[-1]))
+            with ThreadPoolExecutor(
+                    max_workers=max(1, min(len(results),
+                                           self._dap_workers))) as executor:
+                futures = [
+                    executor.submit(self._subset_result, url, var_prefix,
+                                    level, req_dates) for url in results
+                ]
 
-            # TODO: possibly other attributes, especially with ocean vars
-            if level:
-                cmip6_da = cmip6_da.sel(plev=int(level) * 100)
+                for future in concurrent.futures.as_completed(futures):
+                    subset = future.result()
 
-            cmip6_da = cmip6_da.sel(
-                lat=slice(self.hemisphere_loc[2], self.hemisphere_loc[0]))
+                    if subset is not None:
+                        subsets.append(subset)
+
+            if not len(subsets):
+                logging.warning("No {} data found for {} to {}".format(
+                    var, req_dates[0], req_dates[-1]))
+                return
+
+            cmip6_da = xr.concat(subsets, dim="time").sortby("time")
             self.save_temporal_files(var, cmip6_da)
         except OSError as e:
             logging.exception("Error encountered: {}".format(e), exc_info=False)
 
+    def _search_nodes(self, query: dict) -> list:
+        """Finds results from the most preferred node that has any
+
+        Nodes are probed concurrently, probe_width at a time in order of
+        preference, so further nodes are only queried if nearer ones have
+        nothing. Non-empty results are cached per query.
+
+        :param query:
+        :return: list of result URLs
+        """
+        for idx in range(0, len(self._nodes), self._probe_width):
+            nodes = self._nodes[idx:idx + self._probe_width]
+
+            with ThreadPoolExecutor(max_workers=len(nodes)) as executor:
+                node_results = list(executor.map(
+                    lambda data_node: self._search(
+                        dict(query, data_node=data_node)), nodes))
+
+            for data_node, results in zip(nodes, node_results):
+                if len(results):
+                    logging.debug("Query: {}".format(
+                        dict(query, data_node=data_node)))
+                    logging.debug("Found {}: {}".format(
+                        query['experiment_id'], results))
+                    return results
+        return []
+
+    def _search(self, query: dict) -> list:
+        """
+
+        :param query:
+        :return: list of result URLs
+        """
+        results = self._search_cache.get(query)
+
+        if results is None:
+            try:
+                results = esgf_search(**query)
+            except requests.exceptions.RequestException as e:
+                logging.warning("ESGF search failed for {}: {}".format(
+                    query['data_node'], e))
+                return []
+
+            # Nodes often have nothing for a while before publishing, so
+            # only results are cached rather than their absence
+            if len(results):
+                self._search_cache.set(query, results)
+        return results
+
+    def _subset_result(self, url: str, var_prefix: str, level: object,
+                       req_dates: object) -> object:
+        """Loads the required subset of a single result
+
+        Selections are made on the lazily opened dataset, so only the
+        required time, level and latitude ranges are requested from the
+        server, in blocks of time below the DAP request limit.
+
+        :param url:
+        :param var_prefix:
+        :param level:
+        :param req_dates:
+        :return: the subset DataArray, or None if it's empty
+        """
+        logging.debug("Subsetting {}".format(url))
+
+        with xr.open_dataset(url) as ds:
+            da = ds[var_prefix].sel(time=slice(req_dates[0], req_dates[-1]))
+
+            # TODO: possibly other attributes, especially with ocean vars
+            if level:
+                da = da.sel(plev=int(level) * 100)
+
+            da = da.sel(
+                lat=slice(self.hemisphere_loc[2], self.hemisphere_loc[0]))
+
+            if not da.time.size:
+                return None
+
+            step_size = da.dtype.itemsize * da.size // da.time.size
+            block = max(1, DAP_REQUEST_LIMIT // max(1, step_size))
+
+            return xr.concat([
+                da.isel(time=slice(start, start + block)).load()
+                for start in range(0, da.time.size, block)
+            ], dim="time")
+
     def additional_regrid_processing(self, datafile: str, cube_ease: object):
         """
 
@@ -243,7 +437,10 @@ def main():
                               dict(default=[], nargs="*")),
                              (("-o", "--override"), dict(required=None,
                                                          type=str)),
+                             (("-dw", "--dap-workers"), dict(default=4,
+                                                             type=int)),
                          ],
+                         regrid=True,
                          workers=True)
 
     logging.info("CMIP6 Data Downloading")
@@ -262,7 +459,11 @@ def main():
         north=args.hemisphere == "north",
         south=args.hemisphere == "south",
         max_threads=args.workers,
+        regrid_batch_size=args.regrid_batch_size,
+        regrid_processes=args.regrid_processes,
+        sparse_regrid=args.sparse_regrid,
         exclude_nodes=args.exclude_server,
+        dap_workers=args.dap_workers,
     )
     logging.info("CMIP downloading: {} {}".format(args.source, args.member))
     downloader.download()
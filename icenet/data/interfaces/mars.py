@@ -1,8 +1,12 @@
+import concurrent
+import contextlib
 import datetime
 import logging
 import os
 import sys
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
 from itertools import product
 
 import ecmwfapi
@@ -11,7 +15,10 @@ import xarray as xr
 
 from icenet.data.cli import download_args
 from icenet.data.interfaces.downloader import ClimateDownloader
-from icenet.data.interfaces.utils import batch_requested_dates
+from icenet.data.interfaces.utils import batch_requested_dates, \
+    iter_daily_means
+from icenet.data.catalog import DataCatalog
+from icenet.data.utils import append_netcdf_time
 """
 
 """
@@ -20,7 +27,12 @@ from icenet.data.interfaces.utils import batch_requested_dates
 class HRESDownloader(ClimateDownloader):
     """Climate downloader to provide CMIP6 reanalysis data from ESGF APIs
 
+    Targets are retrieved in turn, each being processed by a pool of
+    max_threads workers while the following targets are retrieved.
+
     :param identifier: how to identify this dataset
+    :param server: MARS service to execute requests with, defaulting to
+        ecmwfapi.ECMWFService("mars")
 
     """
 
@@ -82,10 +94,17 @@ retrieve,
   format=netcdf
     """
 
-    def __init__(self, *args, identifier: str = "mars.hres", **kwargs):
+    def __init__(self,
+                 *args,
+                 identifier: str = "mars.hres",
+                 server: object = None,
+                 **kwargs):
         super().__init__(*args, identifier=identifier, **kwargs)
 
-        self._server = ecmwfapi.ECMWFService("mars")
+        self._path_locks = dict()
+        self._save_lock = threading.Lock()
+        self._server = server if server is not None else \
+            ecmwfapi.ECMWFService("mars")
 
     def _single_download(self, var_names: object, pressures: object,
                          req_dates: object):
@@ -100,7 +119,7 @@ retrieve,
         for dt in req_dates:
             assert dt.year == req_dates[0].year
 
-        downloads = []
+        requests = []
         levtype = "plev" if pressures else "sfc"
 
         for req_batch in batch_requested_dates(req_dates, attribute="month"):
@@ -138,23 +157,93 @@ retrieve,
                 step=0,
             )
 
-            if not os.path.exists(request_target):
-                logging.debug("MARS REQUEST: \n{}\n".format(request))
+            requests.append((request, request_target))
+
+        self._pipeline(requests, self._process_hres_target, var_names,
+                       pressures)
+
+    def _process_hres_target(self, target: str, var_names: object,
+                             pressures: object):
+        """Daily means of every variable and level in a retrieved target
+
+        :param target:
+        :param var_names:
+        :param pressures:
+        """
+        with xr.open_dataset(target) as ds:
+            var_das = list()
+
+            for var, da in self._split_variables(ds, var_names, pressures):
+                days = list(iter_daily_means(da))
+
+                if len(days):
+                    var_das.append((var, xr.concat(days, dim="time")))
+            self._save_split(var_das)
+
+    def _pipeline(self, requests: object, process: callable, var_names: object,
+                  pressures: object):
+        """Retrieves targets in turn, processing each as soon as it arrives
+
+        :param requests: list of (MARS request, target) tuples
+        :param process: callable taking a target, var_names and pressures
+        :param var_names:
+        :param pressures:
+        """
+        with ThreadPoolExecutor(max_workers=max(1, self._max_threads)) \
+                as executor:
+            futures = dict()
+
+            for request, target in requests:
+                if self._retrieve(request, target):
+                    logging.info("Processing {}".format(target))
+                    future = executor.submit(process, target, var_names,
+                                             pressures)
+                    futures[future] = target
+
+            for future in concurrent.futures.as_completed(futures):
+                target = futures[future]
 
                 try:
-                    self._server.execute(request, request_target)
-                except ecmwfapi.api.APIException:
-                    logging.exception("Could not complete ECMWF request: {}")
-                else:
-                    downloads.append(request_target)
-            else:
-                logging.debug("Already have {}".format(request_target))
-                downloads.append(request_target)
+                    future.result()
+                except Exception as e:
+                    logging.exception("Failed to process {}: {}".format(
+                        target, e))
+                    continue
 
-        logging.debug("Files downloaded: {}".format(downloads))
+                if self.delete and os.path.exists(target):
+                    logging.info("Removing {}".format(target))
+                    os.unlink(target)
 
-        ds = xr.open_mfdataset(downloads)
-        ds = ds.resample(time='1D', keep_attrs=True).mean(keep_attrs=True)
+    def _retrieve(self, request: str, target: str) -> bool:
+        """
+
+        :param request:
+        :param target:
+        :return: whether the target is available
+        """
+        if os.path.exists(target):
+            logging.debug("Already have {}".format(target))
+            return True
+
+        logging.debug("MARS REQUEST: \n{}\n".format(request))
+
+        try:
+            self._server.execute(request, target)
+        except ecmwfapi.api.APIException:
+            logging.exception("Could not complete ECMWF request: {}")
+            return False
+        return True
+
+    def _split_variables(self, ds: object, var_names: object,
+                         pressures: object) -> list:
+        """
+
+        :param ds:
+        :param var_names:
+        :param pressures:
+        :return: list of (icenet variable name, DataArray) tuples
+        """
+        var_das = list()
 
         for var_name, pressure in product(
                 var_names,
@@ -167,15 +256,66 @@ retrieve,
             if pressure:
                 da = da.sel(level=int(pressure))
 
-            self.save_temporal_files(var, da)
+            var_das.append((var, da))
+        return var_das
 
-        ds.close()
+    def _path_lock(self, path: str) -> object:
+        """Lock serialising writes to a single output file
+
+        :param path:
+        :return: threading.Lock for path
+        """
+        with self._save_lock:
+            return self._path_locks.setdefault(path, threading.Lock())
 
-        if self.delete:
-            for downloaded_file in downloads:
-                if os.path.exists(downloaded_file):
-                    logging.info("Removing {}".format(downloaded_file))
-                    os.unlink(downloaded_file)
+    def _save_split(self, var_das: object, date_format: str = None):
+        """Saves variables split from a single target
+
+        New files are written together with save_mfdataset, whereas data
+        for existing files (e.g. further months of a year) is appended.
+        Means are computed before any locks are taken, so only writes to the
+        same files wait on each other.
+
+        :param var_das: list of (icenet variable name, DataArray) tuples
+        :param date_format:
+        """
+        targets = dict()
+
+        for var, da in var_das:
+            var_folder = self.get_data_var_folder(var)
+            latlon_path, regridded_name = \
+                self.get_req_filenames(var_folder,
+                                       pd.to_datetime(da.time.values[0]),
+                                       date_format=date_format)
+            targets[latlon_path] = (da.load(), regridded_name)
+
+        datasets, paths = list(), list()
+
+        with contextlib.ExitStack() as stack:
+            # Sorted, so concurrent saves always take locks in the same order
+            for latlon_path in sorted(targets):
+                da, _ = targets[latlon_path]
+                stack.enter_context(self._path_lock(latlon_path))
+
+                if os.path.exists(latlon_path):
+                    logging.info("Appending to {}".format(latlon_path))
+                    append_netcdf_time(latlon_path, da, overwrite=True)
+                else:
+                    logging.info("Saving {}".format(latlon_path))
+                    datasets.append(da.to_dataset())
+                    paths.append(latlon_path)
+
+            if len(datasets):
+                xr.save_mfdataset(datasets, paths, unlimited_dims=["time"])
+
+                for path in paths:
+                    DataCatalog.default(path).record(path)
+
+        with self._save_lock:
+            for latlon_path, (_, regridded_name) in targets.items():
+                if not os.path.exists(regridded_name) and \
+                        latlon_path not in self._files_downloaded:
+                    self._files_downloaded.append(latlon_path)
 
     def download(self):
         """
@@ -296,7 +436,7 @@ retrieve,
         for dt in req_dates:
             assert dt.year == req_dates[0].year
 
-        downloads = []
+        requests = []
         levtype = "plev" if pressures else "sfc"
 
         for req_date in req_dates:
@@ -322,46 +462,23 @@ retrieve,
                 target=request_target,
             )
 
-            if not os.path.exists(request_target):
-                logging.debug("MARS REQUEST: \n{}\n".format(request))
+            requests.append((request, request_target))
 
-                try:
-                    self._server.execute(request, request_target)
-                except ecmwfapi.api.APIException:
-                    logging.exception("Could not complete ECMWF request: {}")
-                else:
-                    downloads.append(request_target)
-            else:
-                logging.debug("Already have {}".format(request_target))
-                downloads.append(request_target)
+        self._pipeline(requests, self._process_seas_target, var_names,
+                       pressures)
 
-        logging.debug("Files downloaded: {}".format(downloads))
+    def _process_seas_target(self, target: str, var_names: object,
+                             pressures: object):
+        """Ensemble means of every variable and level in a retrieved target
 
-        for download_filename in downloads:
-            logging.info("Processing {}".format(download_filename))
-            ds = xr.open_dataset(download_filename)
+        :param target:
+        :param var_names:
+        :param pressures:
+        """
+        with xr.open_dataset(target) as ds:
             ds = ds.mean("number")
-
-            for var_name, pressure in product(
-                    var_names,
-                    pressures.split('/') if pressures else [None]):
-                var = var_name if not pressure else \
-                    "{}{}".format(var_name, pressure)
-
-                da = getattr(ds, self.params[var_name][1])
-
-                if pressure:
-                    da = da.sel(level=int(pressure))
-
-                self.save_temporal_files(var, da, date_format="%Y%m%d")
-
-            ds.close()
-
-        if self.delete:
-            for downloaded_file in downloads:
-                if os.path.exists(downloaded_file):
-                    logging.info("Removing {}".format(downloaded_file))
-                    os.unlink(downloaded_file)
+            self._save_split(self._split_variables(ds, var_names, pressures),
+                             date_format="%Y%m%d")
 
     def save_temporal_files(self, var, da, date_format=None, freq=None):
         """
@@ -371,24 +488,11 @@ retrieve,
         :param date_format:
         :param freq:
         """
-        var_folder = self.get_data_var_folder(var)
-
-        req_date = pd.to_datetime(da.time.values[0])
-        latlon_path, regridded_name = \
-            self.get_req_filenames(var_folder,
-                                   req_date,
-                                   date_format=date_format)
-
-        logging.info("Retrieving and saving {}".format(latlon_path))
-        da.compute()
-        da.to_netcdf(latlon_path)
-
-        if not os.path.exists(regridded_name):
-            self._files_downloaded.append(latlon_path)
+        self._save_split([(var, da)], date_format=date_format)
 
 
 def main(identifier, extra_kwargs=None):
-    args = download_args()
+    args = download_args(regrid=True, workers=True)
 
     logging.info("ECMWF {} Data Downloading".format(identifier))
     cls = getattr(sys.modules[__name__], "{}Downloader".format(identifier))
@@ -405,6 +509,10 @@ def main(identifier, extra_kwargs=None):
         ],
         delete_tempfiles=args.delete,
         levels=args.levels,
+        max_threads=args.workers,
+        regrid_batch_size=args.regrid_batch_size,
+        regrid_processes=args.regrid_processes,
+        sparse_regrid=args.sparse_regrid,
         north=args.hemisphere == "north",
         south=args.hemisphere == "south",
         **extra_kwargs)
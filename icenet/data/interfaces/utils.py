@@ -1,12 +1,26 @@
 import argparse
 import collections
+import concurrent.futures
+import functools
 import glob
+import json
 import logging
+import multiprocessing
 import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
 
+from concurrent.futures import ProcessPoolExecutor
+
+import dask
+import numpy as np
 import pandas as pd
 import xarray as xr
 
+from icenet.data.utils import append_netcdf_time
 from icenet.utils import setup_logging
 
 
@@ -44,12 +58,497 @@ def batch_requested_dates(dates: object, attribute: str = "month") -> object:
     return batched_dates
 
 
+class RequestJournal:
+    """Persisted record of completed download requests
+
+    Each completed request is recorded against the file it produced, and
+    written out straight away, so that an interrupted download can skip
+    requests that finished, provided their files still exist.
+
+    :param path: JSON file to persist the journal to
+    """
+
+    def __init__(self, path: str):
+        self._entries = dict()
+        self._lock = threading.Lock()
+        self._path = path
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as fh:
+                    self._entries = json.load(fh)
+            except ValueError:
+                logging.warning("Ignoring corrupt request journal {}".format(
+                    path))
+
+    def completed(self, key: str) -> object:
+        """
+
+        :param key:
+        :return: the file the request produced, or None if not complete
+        """
+        with self._lock:
+            output = self._entries.get(key)
+
+        if output is not None and not os.path.exists(output):
+            return None
+        return output
+
+    def record(self, key: str, output: str):
+        """
+
+        :param key:
+        :param output:
+        """
+        with self._lock:
+            self._entries[key] = output
+            self._save()
+
+    def remove(self, keys: object):
+        """
+
+        :param keys:
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            self._save()
+
+    def _save(self):
+        tmp_path = "{}.{}.tmp".format(self._path, threading.get_ident())
+
+        with open(tmp_path, "w") as fh:
+            json.dump(self._entries, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, self._path)
+
+
+def iter_daily_means(da: object,
+                     block_size: int = 24,
+                     min_samples: int = None,
+                     preprocess: callable = None) -> object:
+    """Yields daily means of sub-daily data, reading a block at a time
+
+    Time steps are consumed in time order, in blocks of block_size, so only
+    a block and the running totals for the current day are held in memory.
+    Each day is yielded as soon as it's complete. Pass a lazily loaded
+    array (e.g. from xr.open_dataset) to keep it that way. Missing values
+    are skipped, as in resample(time="1D").mean().
+
+    :param da: the sub-daily data, with a time dimension
+    :param block_size: number of time steps read at once
+    :param min_samples: if set, stop at the first day with fewer samples
+    :param preprocess: callable applied to each block once it's loaded
+    :return: generator of single day DataArrays, labelled at midnight
+    """
+    times = pd.DatetimeIndex(da.time.values)
+    order = np.argsort(times.values, kind="stable")
+    ordered = bool((np.diff(order) == 1).all())
+
+    if not ordered:
+        logging.warning("Time steps are unordered, reading in time order")
+
+    days = times[order].floor("D")
+    day, total, count, samples, template = None, None, None, 0, None
+
+    def _daily():
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+
+        return template.copy(data=mean.astype(template.dtype)).\
+            expand_dims(time=[day])
+
+    for start in range(0, len(order), block_size):
+        block = da.isel(time=slice(start, start + block_size)
+                        if ordered else order[start:start + block_size])
+        block = block.drop_vars([
+            name for name in block.coords
+            if name != "time" and "time" in block[name].dims
+        ])
+        block = preprocess(block) if preprocess else block
+        block = block.transpose("time", ...).load()
+
+        values = block.values
+        block_days = days[start:start + block_size]
+
+        # Blocks are in time order, so each day is a slice rather than a copy
+        day_starts = np.flatnonzero(np.r_[True, block_days[1:] !=
+                                          block_days[:-1]])
+
+        for day_start, day_end in zip(day_starts,
+                                      np.r_[day_starts[1:], len(block_days)]):
+            block_day = block_days[day_start]
+
+            if block_day != day:
+                if day is not None:
+                    if min_samples and samples < min_samples:
+                        logging.warning("{} has {} samples, stopping at this "
+                                        "incomplete day".format(day, samples))
+                        return
+                    yield _daily()
+
+                dtype = values.dtype \
+                    if np.issubdtype(values.dtype, np.floating) \
+                    else np.float64
+                day, samples = block_day, 0
+                total = np.zeros(values.shape[1:], dtype=np.float64)
+                count = np.zeros(values.shape[1:], dtype=np.int64)
+                template = block.isel(time=0, drop=True).astype(dtype)
+
+            day_values = values[day_start:day_end]
+            samples += len(day_values)
+            day_total = day_values.sum(axis=0, dtype=np.float64)
+
+            # Summing first avoids a mask of the values when nothing's missing
+            if np.issubdtype(day_values.dtype, np.floating) and \
+                    np.isnan(day_total).any():
+                valid = ~np.isnan(day_values)
+                total += np.where(valid, day_values, 0).sum(axis=0)
+                count += valid.sum(axis=0)
+            else:
+                total += day_total
+                count += len(day_values)
+
+    if day is not None:
+        if min_samples and samples < min_samples:
+            logging.warning("{} has {} samples, stopping at this "
+                            "incomplete day".format(day, samples))
+            return
+        yield _daily()
+
+
+def stream_daily_mean(da: object,
+                      destination: str,
+                      block_size: int = 24,
+                      flush_days: int = 8,
+                      min_samples: int = None,
+                      preprocess: callable = None) -> int:
+    """Writes daily means of sub-daily data, as days complete
+
+    See iter_daily_means, completed days are appended to the destination
+    (which will have an unlimited time dimension) flush_days at a time, so
+    memory use is bounded by block_size and flush_days rather than the
+    length of the input.
+
+    :param da: the sub-daily data, with a time dimension
+    :param destination: netCDF file to create
+    :param block_size: number of time steps read at once
+    :param flush_days: number of completed days written at once
+    :param min_samples: if set, stop at the first day with fewer samples
+    :param preprocess: callable applied to each block once it's loaded
+    :return: the number of days written
+    """
+    days = list()
+    written = 0
+
+    def _flush():
+        daily = xr.concat(days, dim="time")
+
+        if not written:
+            daily.to_netcdf(destination, unlimited_dims=["time"])
+        else:
+            append_netcdf_time(destination, daily)
+        days.clear()
+        return len(daily.time)
+
+    for daily in iter_daily_means(da,
+                                  block_size=block_size,
+                                  min_samples=min_samples,
+                                  preprocess=preprocess):
+        days.append(daily)
+
+        if len(days) >= flush_days:
+            written += _flush()
+
+    if len(days):
+        written += _flush()
+
+    logging.info("{} daily means written to {}".format(written, destination))
+    return written
+
+
+def _write_hourly(path: str, hours: int, shape: tuple):
+    """Writes a synthetic hourly file a day at a time
+
+    :param path:
+    :param hours:
+    :param shape: (lat, lon) shape of each time step
+    """
+    rng = np.random.default_rng(42)
+    times = pd.date_range("2000-01-01", periods=hours, freq="h")
+
+    for start in range(0, hours, 24):
+        da = xr.DataArray(
+            rng.random((len(times[start:start + 24]),) + tuple(shape),
+                       dtype=np.float32),
+            dims=("time", "latitude", "longitude"),
+            coords=dict(time=times[start:start + 24]),
+            name="t2m")
+
+        if not start:
+            da.to_netcdf(path, unlimited_dims=["time"])
+        else:
+            append_netcdf_time(path, da)
+
+
+def benchmark_daily_means(hours: int = 24 * 31,
+                          shape: tuple = (181, 720),
+                          block_sizes: tuple = (24, 96),
+                          flush_days: int = 8) -> list:
+    """Compares streamed daily means against resampling the whole file
+
+    A synthetic hourly file is written to a temporary directory, then
+    reduced to daily means with resample(time="1D").mean() over the whole
+    file, as downloads used to be, and with stream_daily_mean for each
+    block size. Peak memory is traced with tracemalloc, so covers numpy's
+    allocations but not the netCDF library's.
+
+    :param hours: number of hourly time steps
+    :param shape: (lat, lon) shape of each time step
+    :param block_sizes: stream_daily_mean block sizes to compare
+    :param flush_days: number of completed days written at once
+    :return: list of dicts of the method, block size, peak memory, duration
+        and throughput of each reduction
+    """
+    tmp_dir = tempfile.mkdtemp()
+    source = os.path.join(tmp_dir, "hourly.nc")
+    results = list()
+
+    def _measure(method, block_size, reduce):
+        destination = os.path.join(tmp_dir, "{}_{}.nc".format(
+            method, block_size))
+        tracemalloc.start()
+        start = time.perf_counter()
+
+        with xr.open_dataarray(source) as da:
+            reduce(da, destination)
+
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append(dict(method=method,
+                            block_size=block_size,
+                            peak_mb=peak / 2**20,
+                            duration_s=duration,
+                            hours_per_s=hours / duration))
+
+    try:
+        _write_hourly(source, hours, shape)
+        _measure("resample", hours,
+                 lambda da, destination: da.resample(time="1D").mean().
+                 to_netcdf(destination))
+
+        for block_size in block_sizes:
+            _measure("stream", block_size,
+                     lambda da, destination: stream_daily_mean(
+                         da, destination,
+                         block_size=block_size,
+                         flush_days=flush_days))
+    finally:
+        shutil.rmtree(tmp_dir)
+    return results
+
+
+# Encoding settings carried over from the source into the daily files, others
+# (chunk sizes, contiguity, source details) don't apply to a single day
+DAILY_ENCODING_KEYS = ("dtype", "_FillValue", "scale_factor", "add_offset",
+                       "zlib", "complevel", "shuffle", "units", "calendar")
+
+# The source last opened by this (worker) process, kept open across the
+# blocks of days it's handed, as (source key, dataset)
+_SPLIT_SOURCE = (None, None)
+
+
+def daily_encoding(ds: object) -> dict:
+    """Encoding template for writing single days of a dataset
+
+    :param ds: the source dataset, as opened
+    :return: dict of encodings by variable name
+    """
+    return {
+        name: {
+            k: v
+            for k, v in var.encoding.items()
+            if k in DAILY_ENCODING_KEYS
+        } for name, var in ds.variables.items()
+    }
+
+
+def _close_split_source():
+    global _SPLIT_SOURCE
+
+    if _SPLIT_SOURCE[1] is not None:
+        _SPLIT_SOURCE[1].close()
+    _SPLIT_SOURCE = (None, None)
+
+
+def _split_worker(key: int, open_source: callable, days: list,
+                  encoding: dict) -> list:
+    """Writes a block of days from a source, loaded in one read
+
+    :param key: identifies the source, which stays open until another is
+        handed to this process
+    :param open_source:
+    :param days: list of (time index, output path) tuples
+    :param encoding:
+    :return: the paths written
+    """
+    global _SPLIT_SOURCE
+
+    # Workers are the unit of parallelism, so each computes in process
+    with dask.config.set(scheduler="synchronous"):
+        if _SPLIT_SOURCE[0] != key:
+            _close_split_source()
+            _SPLIT_SOURCE = (key, open_source())
+
+        block = _SPLIT_SOURCE[1].isel(time=[idx for idx, _ in days]).load()
+
+    for i, (_, output_path) in enumerate(days):
+        tmp_path = "{}.tmp".format(output_path)
+        block.isel(time=slice(i, i + 1)).to_netcdf(tmp_path, encoding=encoding)
+        os.replace(tmp_path, output_path)
+    return [output_path for _, output_path in days]
+
+
+def split_daily_files(sources: list,
+                      workers: int = 4,
+                      block_size: int = 31,
+                      skip_existing: bool = True,
+                      dry: bool = False) -> list:
+    """Splits sources into one netCDF file per day, across a process pool
+
+    Days are handed out in blocks, each loaded in a single read and written
+    with an encoding template taken once from its source. Existing outputs
+    are found with one scan per output directory. Workers are spawned, as
+    HDF5 isn't fork safe once files have been opened, so a single pool
+    serves all the sources.
+
+    :param sources: list of (open_source, path_for_date) tuples, where
+        open_source is a picklable callable returning the (lazily opened)
+        source dataset and path_for_date gives the output path for a
+        Timestamp
+    :param workers: processes to write with, or 1 to write in this one
+    :param block_size: number of days handed to a worker at once
+    :param skip_existing: skip days already written, rather than raising
+    :param dry: only report what would be written
+    :return: the paths written
+    """
+    tasks = list()
+
+    for key, (open_source, path_for_date) in enumerate(sources):
+        with open_source() as ds:
+            encoding = daily_encoding(ds)
+            outputs = [(idx, path_for_date(pd.Timestamp(date)))
+                       for idx, date in enumerate(ds.time.values)]
+
+        tasks.append((key, open_source, outputs, encoding))
+
+    existing = set()
+
+    for directory in set(
+            os.path.dirname(path) for task in tasks for _, path in task[2]):
+        if os.path.isdir(directory):
+            existing.update(
+                os.path.join(directory, entry.name)
+                for entry in os.scandir(directory))
+
+    blocks = list()
+
+    for key, open_source, outputs, encoding in tasks:
+        days = [(idx, path) for idx, path in outputs if path not in existing]
+
+        if len(days) < len(outputs):
+            if not skip_existing:
+                raise RuntimeError("Already exists: {}".format(", ".join(
+                    sorted(path for _, path in outputs if path in existing))))
+            logging.info("Skipping {} days already written".format(
+                len(outputs) - len(days)))
+
+        blocks.extend([(key, open_source, days[i:i + block_size], encoding)
+                       for i in range(0, len(days), block_size)])
+
+    if dry:
+        for block in blocks:
+            for _, path in block[2]:
+                logging.info("Would write {}".format(path))
+        return list()
+
+    for directory in set(
+            os.path.dirname(path) for block in blocks for _, path in block[2]):
+        os.makedirs(directory, exist_ok=True)
+
+    written = list()
+
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(
+                max_workers=min(workers, len(blocks)),
+                mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_split_worker, *block) for block in blocks
+            ]
+
+            for future in concurrent.futures.as_completed(futures):
+                written.extend(future.result())
+    else:
+        try:
+            for block in blocks:
+                written.extend(_split_worker(*block))
+        finally:
+            _close_split_source()
+
+    logging.info("Wrote {} daily files".format(len(written)))
+    return sorted(written)
+
+
+def _daily_path(destination: str, date_format: str, date: object) -> str:
+    return os.path.join(destination, date.strftime(date_format))
+
+
+def _open_renamed(file: str, var_name: str) -> object:
+    """Opens a monthly file, renaming its data variables to var_name
+
+    :param file:
+    :param var_name:
+    :return:
+    """
+    ds = xr.open_dataset(file)
+
+    var_names = set([
+        name for name in list(ds.data_vars.keys())
+        if not name.startswith("lambert_")
+    ])
+    logging.debug("Files have var names {} which will be renamed to {}".format(
+        ", ".join(var_names), var_name))
+
+    return ds.rename({k: var_name for k in var_names})[[var_name]]
+
+
+def _open_year_files(year_files: list) -> object:
+    """Opens a year of files missing their time dimension
+
+    :param year_files:
+    :return:
+    """
+    ds = xr.open_mfdataset(year_files,
+                           combine="nested",
+                           concat_dim="time",
+                           parallel=True)
+
+    if "siconca" in year_files[0]:
+        ds = ds.rename_vars({"siconca": "ice_conc"})
+        ds = ds.sortby("time")
+        ds['time'] = [
+            pd.Timestamp(el) for el in ds.indexes['time'].normalize()
+        ]
+    return ds
+
+
 def reprocess_monthlies(source: str,
                         hemisphere: str,
                         identifier: str,
                         output_base: str,
                         dry: bool = False,
-                        var_names: object = None):
+                        var_names: object = None,
+                        workers: int = 4):
     """
 
     :param source:
@@ -58,10 +557,13 @@ def reprocess_monthlies(source: str,
     :param output_base:
     :param dry:
     :param var_names:
+    :param workers: processes splitting the files into days
     """
     if not var_names:
         var_names = []
 
+    sources = list()
+
     for var_name in var_names:
         var_path = os.path.join(source, hemisphere, var_name)
         files = glob.glob("{}/{}_*.nc".format(var_path, var_name))
@@ -89,40 +591,19 @@ def reprocess_monthlies(source: str,
             logging.info("Processing {} from {} to {}".format(
                 var_name, year, destination))
 
-            ds = xr.open_dataset(file)
-
-            var_names = [
-                name for name in list(ds.data_vars.keys())
-                if not name.startswith("lambert_")
-            ]
-
-            var_names = set(var_names)
-            logging.debug(
-                "Files have var names {} which will be renamed to {}".format(
-                    ", ".join(var_names), var_name))
+            sources.append((functools.partial(_open_renamed, file, var_name),
+                            functools.partial(_daily_path, destination,
+                                              "%Y_%m_%d.nc")))
 
-            ds = ds.rename({k: var_name for k in var_names})
-            da = getattr(ds, var_name)
-
-            for date in da.time.values:
-                date = pd.Timestamp(date)
-                fname = '{:04d}_{:02d}_{:02d}.nc'. \
-                    format(date.year, date.month, date.day)
-                daily = da.sel(time=slice(date, date))
-
-                output_path = os.path.join(destination, fname)
-
-                if dry or os.path.exists(output_path):
-                    continue
-                else:
-                    daily.to_netcdf(output_path)
+    split_daily_files(sources, workers=workers, dry=dry)
 
 
 def add_time_dim(source: str,
                  hemisphere: str,
                  identifier: str,
                  dry: bool = False,
-                 var_names: object = []):
+                 var_names: object = [],
+                 workers: int = 4):
     """
 
     :param source:
@@ -130,6 +611,7 @@ def add_time_dim(source: str,
     :param identifier:
     :param dry:
     :param var_names:
+    :param workers: processes splitting the years into days
     """
     files = {}
 
@@ -166,36 +648,19 @@ def add_time_dim(source: str,
 
             files[var_name][year].append(dest)
 
-    for year_files in [files[var][el] for var in files for el in files[var]]:
-        if not dry:
-            ds = xr.open_mfdataset(year_files,
-                                   combine="nested",
-                                   concat_dim="time",
-                                   parallel=True)
-
-            if "siconca" in year_files[0]:
-                ds = ds.rename_vars({"siconca": "ice_conc"})
-                ds = ds.sortby("time")
-                ds['time'] = [
-                    pd.Timestamp(el) for el in ds.indexes['time'].normalize()
-                ]
-
-            for d in ds.time.values:
-                dt = pd.to_datetime(d)
-                date_str = dt.strftime("%Y_%m_%d")
-                fpath = os.path.join(
-                    os.path.split(year_files[0])[0], "{}.nc".format(date_str))
-
-                if not os.path.exists(fpath):
-                    dw = ds.sel(time=slice(dt, dt))
-
-                    logging.info("Writing {}".format(fpath))
-                    dw.to_netcdf(fpath)
-                else:
-                    raise RuntimeError("Already exists: {}".format(fpath))
-
-            ds.close()
+    all_year_files = [files[var][el] for var in files for el in files[var]]
+
+    if not dry:
+        split_daily_files([(functools.partial(_open_year_files, year_files),
+                            functools.partial(_daily_path,
+                                              os.path.split(year_files[0])[0],
+                                              "%Y_%m_%d.nc"))
+                           for year_files in all_year_files],
+                          workers=workers,
+                          skip_existing=False)
 
+    for year_files in all_year_files:
+        if not dry:
             for orig_file in year_files:
                 logging.info("Removing {}".format(orig_file))
                 os.unlink(orig_file)
@@ -213,6 +678,7 @@ def get_args():
     a.add_argument("-d", "--dry", default=False, action="store_true")
     a.add_argument("-o", "--output", default="./data")
     a.add_argument("-v", "--verbose", default=False, action="store_true")
+    a.add_argument("-w", "--workers", default=4, type=int)
     a.add_argument("source")
     a.add_argument("hemisphere", choices=["nh", "sh"])
     a.add_argument("identifier")
@@ -235,7 +701,8 @@ def add_time_dim_main():
                  args.hemisphere,
                  args.identifier,
                  dry=args.dry,
-                 var_names=args.vars)
+                 var_names=args.vars,
+                 workers=args.workers)
 
 
 def reprocess_main():
@@ -248,4 +715,35 @@ def reprocess_main():
                         args.identifier,
                         output_base=args.output,
                         dry=args.dry,
-                        var_names=args.vars)
+                        var_names=args.vars,
+                        workers=args.workers)
+
+
+@setup_logging
+def get_benchmark_args():
+    """
+
+    :return:
+    """
+    a = argparse.ArgumentParser()
+    a.add_argument("-b", "--block-sizes", default=[24, 96], type=int,
+                   nargs="+")
+    a.add_argument("-d", "--days", default=31, type=int)
+    a.add_argument("-f", "--flush-days", default=8, type=int)
+    a.add_argument("-s", "--shape", default=[181, 720], type=int, nargs=2)
+    a.add_argument("-v", "--verbose", default=False, action="store_true")
+    return a.parse_args()
+
+
+def daily_means_benchmark_main():
+    """CLI comparing the memory and throughput of daily mean reductions
+    """
+    args = get_benchmark_args()
+
+    for result in benchmark_daily_means(hours=args.days * 24,
+                                        shape=args.shape,
+                                        block_sizes=args.block_sizes,
+                                        flush_days=args.flush_days):
+        logging.info("{method:>8} block {block_size:4d}: peak "
+                     "{peak_mb:8.1f}MB, {duration_s:.2f}s, "
+                     "{hours_per_s:.0f} hours/s".format(**result))
@@ -8,7 +8,7 @@ from pprint import pformat
 
 import numpy as np
 
-from icenet.data.process import IceNetPreProcessor
+from icenet.data.process import IceNetPreProcessor, expand_dates
 from icenet.data.producers import Generator
 """
 
@@ -95,11 +95,10 @@ class IceNetBaseDataLoader(Generator):
             forecast_dates = sorted(
                 list(
                     set([
-                        dt.datetime.strptime(
-                            s, IceNetPreProcessor.DATE_FORMAT).date()
-                        for identity in self._config["sources"].keys()
-                        for s in self._config["sources"][identity]["dates"]
-                        [dataset]
+                        date for identity in self._config["sources"].keys()
+                        for date in expand_dates(self._config["sources"]
+                                                 [identity]["dates"][dataset]).
+                        astype(object)
                     ])))
 
             logging.info("{} {} dates in total, NOT generating cache "
@@ -13,7 +13,7 @@ import pandas as pd
 import tensorflow as tf
 import xarray as xr
 
-from icenet.data.process import IceNetPreProcessor
+from icenet.data.process import expand_dates
 from icenet.data.loaders.base import IceNetBaseDataLoader
 from icenet.data.loaders.utils import IceNetDataWarning, write_tfrecord
 from icenet.data.sic.mask import Masks
@@ -174,9 +174,9 @@ class DaskMultiWorkerLoader(DaskBaseDataLoader):
             futures = []
 
             forecast_dates = set([
-                dt.datetime.strptime(s, IceNetPreProcessor.DATE_FORMAT).date()
-                for identity in self._config["sources"].keys()
-                for s in self._config["sources"][identity]["dates"][dataset]
+                date for identity in self._config["sources"].keys()
+                for date in expand_dates(self._config["sources"][identity]
+                                         ["dates"][dataset]).astype(object)
             ])
 
             if dates_override:
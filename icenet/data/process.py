@@ -1,9 +1,13 @@
+import concurrent.futures
 import datetime as dt
+import fcntl
 import json
 import logging
 import os
 
 import dask
+import dask.array
+import netCDF4
 import numpy as np
 import pandas as pd
 import xarray as xr
@@ -16,6 +20,95 @@ from icenet.model.models import linear_trend_forecast
 """
 
 
+def _format_days(days: object) -> list:
+    return [day.replace("-", "_") for day in np.datetime_as_string(days)]
+
+
+def _parse_days(dates: object) -> object:
+    return np.array([date.replace("_", "-") for date in dates],
+                    dtype="datetime64[D]")
+
+
+def compact_dates(dates: object, max_gap: int = 3) -> dict:
+    """Compacts dates into ranges, for storing in configurations
+
+    Dates are grouped into runs with a constant step in days. Daily runs
+    separated by up to max_gap missing days are merged, listing the missing
+    days as exclusions, so a period with the odd date missing remains a
+    single range.
+
+    :param dates: iterable of dates, Timestamps or datetime64s
+    :param max_gap: most missing days to bridge with exclusions
+    :return: dict of "ranges", each of "start", "end" and "step" in days,
+        and "exclude" dates, formatted as IceNetPreProcessor.DATE_FORMAT
+    """
+    days = np.unique(
+        pd.DatetimeIndex(list(dates)).values.astype("datetime64[D]"))
+    values = days.astype(np.int64)
+    ranges, exclude = list(), list()
+    i = 0
+
+    while i < len(values):
+        j = i
+
+        if i + 1 < len(values):
+            step = values[i + 1] - values[i]
+            j = i + 1
+
+            while j + 1 < len(values) and values[j + 1] - values[j] == step:
+                j += 1
+
+            # A pair of dates far apart is better as a lone date, leaving the
+            # latter to start the next run
+            if j == i + 1 and step != 1:
+                j = i
+
+        step = int(values[j] - values[j - 1]) if j > i else 1
+
+        if len(ranges) and step == 1 and ranges[-1][2] == 1 and \
+                values[i] - ranges[-1][1] - 1 <= max_gap:
+            exclude.extend(range(ranges[-1][1] + 1, values[i]))
+            ranges[-1][1] = values[j]
+        else:
+            ranges.append([values[i], values[j], step])
+        i = j + 1
+
+    starts = _format_days(np.array([r[0] for r in ranges], "datetime64[D]"))
+    ends = _format_days(np.array([r[1] for r in ranges], "datetime64[D]"))
+
+    return {
+        "ranges": [
+            dict(start=start, end=end, step=int(r[2]))
+            for start, end, r in zip(starts, ends, ranges)
+        ],
+        "exclude": _format_days(np.array(exclude, dtype="datetime64[D]")),
+    }
+
+
+def expand_dates(dates: object) -> object:
+    """Expands dates from a configuration into an array
+
+    Both compacted dates, from compact_dates, and the lists of date strings
+    written by previous versions are accepted.
+
+    :param dates: dict of ranges and exclusions, or list of date strings
+    :return: sorted datetime64[D] array of the dates
+    """
+    if not isinstance(dates, dict):
+        return np.unique(_parse_days(dates))
+
+    days = [
+        np.arange(np.datetime64(r["start"].replace("_", "-"), "D"),
+                  np.datetime64(r["end"].replace("_", "-"), "D") +
+                  np.timedelta64(1, "D"),
+                  np.timedelta64(r["step"], "D"))
+        for r in dates["ranges"]
+    ]
+    days = np.concatenate(days) if len(days) else \
+        np.array([], dtype="datetime64[D]")
+    return np.unique(days[~np.isin(days, _parse_days(dates["exclude"]))])
+
+
 class IceNetPreProcessor(Processor):
     """
 
@@ -26,6 +119,8 @@ class IceNetPreProcessor(Processor):
     :param val_dates:
     :param test_dates:
     :param *args:
+    :param append: only process dates not already in the processed files,
+        appending them using the stored climatology and normalisation
     :param data_shape:
     :param dtype:
     :param exclude_vars:
@@ -43,6 +138,8 @@ class IceNetPreProcessor(Processor):
     :param source_data:
     :param update_key:
     :param update_loader:
+    :param workers:
+    :param workers_memory:
     """
 
     DATE_FORMAT = "%Y_%m_%d"
@@ -60,6 +157,7 @@ class IceNetPreProcessor(Processor):
             val_dates,
             test_dates,
             *args,
+            append=False,
             data_shape=(432, 432),
             dtype=np.float32,
             exclude_vars=(),
@@ -77,6 +175,8 @@ class IceNetPreProcessor(Processor):
             source_data=os.path.join(".", "data"),
             update_key=None,
             update_loader=True,
+            workers=1,
+            workers_memory=None,
             **kwargs):
         super().__init__(identifier,
                          source_data,
@@ -95,6 +195,7 @@ class IceNetPreProcessor(Processor):
 
         self._name = name
 
+        self._append = append
         self._data_shape = data_shape
         self._dtype = dtype
         self._exclude_vars = exclude_vars
@@ -109,6 +210,8 @@ class IceNetPreProcessor(Processor):
         self._update_loader = os.path.join(".",
                                            "loader.{}.json".format(name)) \
             if update_loader else None
+        self._workers = workers
+        self._workers_memory = workers_memory
 
         if type(linear_trend_steps) == int:
             logging.debug(
@@ -124,16 +227,148 @@ class IceNetPreProcessor(Processor):
         """
         var_suffixes = ["abs", "anom"]
         var_lists = [self._abs_vars, self._anom_vars]
+        tasks = []
+
         for var_suffix, var_list in zip(var_suffixes, var_lists):
             for var_name in var_list:
                 if var_name not in self._var_files.keys():
                     logging.warning("{} does not exist".format(var_name))
                     continue
+                tasks.append((var_name, var_suffix))
+
+        if self._workers > 1 and len(tasks) > 1:
+            self._process_concurrently(tasks)
+        else:
+            for var_name, var_suffix in tasks:
                 self._save_variable(var_name, var_suffix)
 
         if self._update_loader:
             self.update_loader_config()
 
+    def _process_concurrently(self, tasks: list):
+        """Run _save_variable for each task in a process pool
+
+        Variables are scheduled in order, but a task is only started if its
+        estimated size fits within the memory budget alongside those already
+        running (one task is always allowed to run.) Tasks for the same
+        variable never run together, so abs is always processed before anom
+        and normalisation parameters are reused exactly as they are serially.
+
+        :param tasks: list of (var_name, var_suffix) tuples
+        """
+        budget = self._get_memory_budget()
+        sizes = [self._estimate_variable_size(var_name)
+                 for var_name, _ in tasks]
+        pending = list(range(len(tasks)))
+        running = dict()
+        results = dict()
+
+        logging.info("Processing {} variables with {} workers{}".format(
+            len(tasks), self._workers,
+            "" if budget is None else
+            ", memory budget {:.1f}GB".format(budget / 1024**3)))
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._workers) as executor:
+            while pending or running:
+                in_use = sum([sizes[idx] for idx in running.values()])
+                busy_vars = set([tasks[idx][0] for idx in running.values()])
+
+                for idx in list(pending):
+                    if len(running) >= self._workers:
+                        break
+
+                    var_name, var_suffix = tasks[idx]
+
+                    if var_name in busy_vars:
+                        continue
+
+                    if running and budget is not None \
+                            and in_use + sizes[idx] > budget:
+                        continue
+
+                    logging.info("Submitting {} {} (~{:.1f}GB)".format(
+                        var_name, var_suffix, sizes[idx] / 1024**3))
+                    future = executor.submit(_save_variable_task, self,
+                                             var_name, var_suffix)
+                    running[future] = idx
+                    pending.remove(idx)
+                    in_use += sizes[idx]
+                    busy_vars.add(var_name)
+
+                done, _ = concurrent.futures.wait(
+                    running.keys(),
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    idx = running.pop(future)
+                    # Let failures propagate, as they would serially
+                    results[idx] = future.result()
+                    logging.info("Finished {} {}".format(*tasks[idx]))
+
+        # Merge in task order so the loader configuration is deterministic
+        for idx in sorted(results.keys()):
+            for var_name, file_paths in results[idx].items():
+                if var_name not in self._processed_files.keys():
+                    self._processed_files[var_name] = list()
+
+                for file_path in file_paths:
+                    if file_path not in self._processed_files[var_name]:
+                        self._processed_files[var_name].append(file_path)
+
+    def _estimate_variable_size(self, var_name: str) -> int:
+        """Estimate the in-memory footprint of a variable from its source files
+
+        Compressed or packed files decode to far more than their size on
+        disk, so the data variables are sized from their shapes and decoded
+        types, as read from the file metadata.
+
+        :param var_name:
+        :return: size in bytes
+        """
+        itemsize = np.dtype(self._dtype).itemsize
+        size = 0
+
+        for df in self._var_files[var_name]:
+            if not os.path.exists(df):
+                continue
+
+            try:
+                with netCDF4.Dataset(df, "r") as nc:
+                    for name, var in nc.variables.items():
+                        if name in nc.dimensions or name in (
+                                "lat", "lon", "lambert_azimuthal_equal_area"):
+                            continue
+
+                        # Packed data decodes to the type of its scale factor
+                        decoded = np.dtype(
+                            getattr(var, "scale_factor", np.zeros(
+                                1, dtype=var.dtype)).dtype)
+                        size += int(np.prod(var.shape)) * \
+                            max(decoded.itemsize, itemsize)
+            except (OSError, TypeError):
+                logging.warning("Unable to read the metadata of {}, using "
+                                "its size on disk".format(df))
+                size += os.path.getsize(df)
+        return size
+
+    def _get_memory_budget(self) -> object:
+        """Memory to share between variables processed concurrently
+
+        :return: memory budget in bytes, or None if it can't be determined
+        """
+        if self._workers_memory is not None:
+            return int(self._workers_memory * 1024**3)
+
+        try:
+            # Default to half of physical memory
+            return os.sysconf("SC_PAGE_SIZE") * \
+                os.sysconf("SC_PHYS_PAGES") // 2
+        except (AttributeError, OSError, ValueError):
+            logging.warning("Unable to determine physical memory, not "
+                            "limiting concurrent variable processing")
+            return None
+
     def pre_normalisation(self, var_name: str, da: object):
         """
 
@@ -176,18 +411,9 @@ class IceNetPreProcessor(Processor):
             "anom": self._anom_vars,
             "abs": self._abs_vars,
             "dates": {
-                "train": [
-                    d.strftime(IceNetPreProcessor.DATE_FORMAT)
-                    for d in self._dates.train
-                ],
-                "val": [
-                    d.strftime(IceNetPreProcessor.DATE_FORMAT)
-                    for d in self._dates.val
-                ],
-                "test": [
-                    d.strftime(IceNetPreProcessor.DATE_FORMAT)
-                    for d in self._dates.test
-                ],
+                "train": compact_dates(self._dates.train),
+                "val": compact_dates(self._dates.val),
+                "test": compact_dates(self._dates.test),
             },
             "linear_trends": self._linear_trends,
             "linear_trend_steps": self._linear_trend_steps,
@@ -200,40 +426,70 @@ class IceNetPreProcessor(Processor):
 
         configuration = {"sources": {}}
 
-        if os.path.exists(self._update_loader):
-            logging.info("Loading configuration {}".format(
-                self._update_loader))
-            with open(self._update_loader, "r") as fh:
-                obj = json.load(fh)
-                configuration.update(obj)
+        # Other processors may be updating the same loader configuration, so
+        # the read-merge-write is done under an exclusive lock and the file is
+        # atomically replaced so that readers never see a partial write
+        with open("{}.lock".format(self._update_loader), "w") as lock_fh:
+            fcntl.flock(lock_fh, fcntl.LOCK_EX)
+
+            if os.path.exists(self._update_loader):
+                logging.info("Loading configuration {}".format(
+                    self._update_loader))
+                with open(self._update_loader, "r") as fh:
+                    obj = json.load(fh)
+                    configuration.update(obj)
+
+            if self._append and \
+                    self._update_key in configuration["sources"]:
+                previous = configuration["sources"][self._update_key]
+
+                for split, split_dates in source["dates"].items():
+                    source["dates"][split] = compact_dates(
+                        np.union1d(
+                            expand_dates(previous["dates"].get(split, [])),
+                            expand_dates(split_dates)))
+
+                var_files = dict(previous["var_files"])
+
+                for var_name, files in source["var_files"].items():
+                    var_files[var_name] = var_files.get(var_name, []) + [
+                        f for f in files
+                        if f not in var_files.get(var_name, [])
+                    ]
+                source["var_files"] = var_files
+
+            configuration["sources"][self._update_key] = source
 
-        configuration["sources"][self._update_key] = source
+            # Ideally should always be in together
+            if "dtype" in configuration:
+                assert configuration["dtype"] == self._dtype.__name__
 
-        # Ideally should always be in together
-        if "dtype" in configuration:
-            assert configuration["dtype"] == self._dtype.__name__
+            if "shape" in configuration:
+                assert configuration["shape"] == list(self._data_shape)
 
-        if "shape" in configuration:
-            assert configuration["shape"] == list(self._data_shape)
+            configuration["dtype"] = self._dtype.__name__
+            configuration["shape"] = list(self._data_shape)
 
-        configuration["dtype"] = self._dtype.__name__
-        configuration["shape"] = list(self._data_shape)
+            if "missing_dates" not in configuration:
+                configuration["missing_dates"] = []
 
-        if "missing_dates" not in configuration:
-            configuration["missing_dates"] = []
+            # Conversion required one way or another, so perhaps more
+            # efficient than a union
+            for d in sorted(self._missing_dates):
+                date_str = d.strftime(IceNetPreProcessor.DATE_FORMAT)
 
-        # Conversion required one way or another, so perhaps more efficient
-        # than a union
-        for d in sorted(self._missing_dates):
-            date_str = d.strftime(IceNetPreProcessor.DATE_FORMAT)
+                if date_str not in configuration["missing_dates"]:
+                    configuration["missing_dates"].append(date_str)
 
-            if date_str not in configuration["missing_dates"]:
-                configuration["missing_dates"].append(date_str)
+            logging.info("Writing configuration to {}".format(
+                self._update_loader))
 
-        logging.info("Writing configuration to {}".format(self._update_loader))
+            # We hold the lock, so a fixed temporary name is safe
+            tmp_path = "{}.tmp".format(self._update_loader)
 
-        with open(self._update_loader, "w") as fh:
-            json.dump(configuration, fh, indent=4, default=_serialize)
+            with open(tmp_path, "w") as fh:
+                json.dump(configuration, fh, indent=4, default=_serialize)
+            os.replace(tmp_path, self._update_loader)
 
     def _save_variable(self, var_name: str, var_suffix: str):
         """
@@ -243,6 +499,38 @@ class IceNetPreProcessor(Processor):
         """
         with dask.config.set(**{'array.slicing.split_large_chunks': True}):
             da = self._open_dataarray_from_files(var_name)
+            processed_path = self.get_processed_path(
+                var_name, "{}_{}.nc".format(var_name, var_suffix))
+            stored_da, history_da, climatology = None, None, None
+
+            if self._append:
+                if os.path.exists(processed_path):
+                    stored_da = xr.open_dataarray(processed_path)
+
+                    if var_name in self._linear_trends and \
+                            var_suffix == "abs":
+                        # Trends look back over the full history, which we
+                        # prepare from the sources just as a full run would
+                        history_da = da
+
+                    da = da.isel(time=np.flatnonzero(
+                        ~da.time.isin(stored_da.time.values).values))
+                    logging.info("{} new dates to append to {}".format(
+                        len(da.time), processed_path))
+                else:
+                    logging.warning("Nothing to append to for {}, processing "
+                                    "in full".format(processed_path))
+
+            if stored_da is not None and not len(da.time):
+                stored_da.close()
+                self._add_processed_file(var_name, processed_path)
+
+                if var_name in self._linear_trends and var_suffix == "abs":
+                    self._add_processed_file(
+                        var_name,
+                        self.get_processed_path(
+                            var_name, "{}_linear_trend.nc".format(var_name)))
+                return
 
             # FIXME: we should ideally store train dates against the
             #  normalisation and climatology, to ensure recalculation on
@@ -259,14 +547,16 @@ class IceNetPreProcessor(Processor):
                         self.get_data_var_folder("params"),
                         "climatology.{}".format(var_name))
 
-                if not os.path.exists(clim_path):
+                if not os.path.exists(clim_path) and stored_da is not None:
+                    raise RuntimeError("Appending to {} requires the stored "
+                                       "climatology {}".format(
+                                           processed_path, clim_path))
+                elif not os.path.exists(clim_path):
                     logging.info("Generating climatology {}".format(clim_path))
 
                     if self._dates.train:
-                        climatology = da.sel(time=self._dates.train).\
-                            groupby('time.month', restore_coord_dims=True).\
-                            mean()
-
+                        climatology = IceNetPreProcessor.monthly_climatology(
+                            da.sel(time=self._dates.train))
                         climatology.to_netcdf(clim_path)
                     else:
                         raise RuntimeError(
@@ -276,26 +566,7 @@ class IceNetPreProcessor(Processor):
                     logging.info("Reusing climatology {}".format(clim_path))
                     climatology = xr.open_dataarray(clim_path)
 
-                if not set(da.groupby("time.month").all().month.values).\
-                        issubset(set(climatology.month.values)):
-                    logging.warning(
-                        "We don't have a full climatology ({}) "
-                        "compared with data ({})".format(
-                            ",".join(
-                                [str(i) for i in climatology.month.values]),
-                            ",".join([
-                                str(i) for i in da.groupby(
-                                    "time.month").all().month.values
-                            ])))
-                    da = da - climatology.mean()
-                else:
-                    da = da.groupby("time.month") - climatology
-
-            # FIXME: this is not the way to reconvert underlying data on
-            #  dask arrays
-            da.data = np.asarray(da.data, dtype=self._dtype)
-
-            da = self.pre_normalisation(var_name, da)
+            da = self._prepare_variable(var_name, da, climatology)
             # We don't do this (https://github.com/tom-andersson/icenet2/blob/
             # 4ca0f1300fbd82335d8bb000c85b1e71855630fa/icenet/utils.py#L520)
             # any more
@@ -313,6 +584,9 @@ class IceNetPreProcessor(Processor):
                     ref_da = xr.open_dataarray(
                         os.path.join(self._refdir, var_name,
                                      "{}_{}.nc".format(var_name, var_suffix)))
+                elif history_da is not None:
+                    ref_da = self._prepare_variable(var_name, history_da,
+                                                    climatology)
 
                 self._build_linear_trend_da(da, var_name, ref_da=ref_da)
 
@@ -330,9 +604,46 @@ class IceNetPreProcessor(Processor):
 
             da = self.post_normalisation(var_name, da)
 
-            self.save_processed_file(
-                var_name, "{}_{}.nc".format(var_name, var_suffix),
-                da.rename("_".join([var_name, var_suffix])))
+            if stored_da is not None:
+                stored_da.close()
+                self.append_processed_file(
+                    var_name, "{}_{}.nc".format(var_name, var_suffix),
+                    da.rename("_".join([var_name, var_suffix])))
+            else:
+                self.save_processed_file(
+                    var_name, "{}_{}.nc".format(var_name, var_suffix),
+                    da.rename("_".join([var_name, var_suffix])))
+
+    def _prepare_variable(self,
+                          var_name: str,
+                          da: object,
+                          climatology: object = None) -> object:
+        """Subtract the climatology, if any, and apply pre-normalisation
+
+        :param var_name:
+        :param da: the data opened from the source files
+        :param climatology: monthly climatology for anomaly variables
+        :return: the data ready for normalisation
+        """
+        if climatology is not None:
+            data_months = np.unique(da["time.month"].values)
+
+            if not set(data_months).issubset(set(climatology.month.values)):
+                logging.warning(
+                    "We don't have a full climatology ({}) "
+                    "compared with data ({})".format(
+                        ",".join([str(i) for i in climatology.month.values]),
+                        ",".join([str(i) for i in data_months])))
+                da = da - climatology.mean()
+            else:
+                da = IceNetPreProcessor.subtract_monthly_climatology(
+                    da, climatology)
+
+        # FIXME: this is not the way to reconvert underlying data on
+        #  dask arrays
+        da.data = np.asarray(da.data, dtype=self._dtype)
+
+        return self.pre_normalisation(var_name, da)
 
     def _open_dataarray_from_files(self, var_name: str):
         """
@@ -422,6 +733,83 @@ class IceNetPreProcessor(Processor):
 
         return mean, std
 
+    @staticmethod
+    def monthly_climatology(da: object):
+        """
+        Compute the mean of each calendar month present in `da`, skipping
+        NaNs. Rather than a groupby, which makes for enormous graphs on dask
+        arrays, each time chunk is reduced to per-month sums and counts with
+        a one-hot matrix product and these are combined across chunks.
+
+        :param da: DataArray with a time dimension
+        :return: DataArray of monthly means with a month dimension
+        """
+        da = da.transpose("time", ...)
+        months = da["time.month"].values
+        clim_months = np.unique(months)
+        onehot = (months[np.newaxis, :] ==
+                  clim_months[:, np.newaxis]).astype(np.float64)
+
+        data = da.data
+        array_lib = np
+
+        if isinstance(data, dask.array.Array):
+            array_lib = dask.array
+            onehot = dask.array.from_array(onehot,
+                                           chunks=(-1, data.chunks[0]))
+
+        valid = ~array_lib.isnan(data)
+        sums = array_lib.tensordot(
+            onehot, array_lib.where(valid, data, 0).astype(np.float64), axes=1)
+        counts = array_lib.tensordot(onehot,
+                                     valid.astype(np.float64),
+                                     axes=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.asarray(sums / counts).astype(da.dtype)
+
+        return xr.DataArray(means,
+                            dims=("month", *da.dims[1:]),
+                            coords=dict(month=clim_months,
+                                        **{
+                                            k: v
+                                            for k, v in da.coords.items()
+                                            if "time" not in v.dims
+                                        }),
+                            name=da.name,
+                            attrs=da.attrs)
+
+    @staticmethod
+    def subtract_monthly_climatology(da: object, climatology: object):
+        """
+        Subtract the climatology for each time step's month from `da`, by
+        gathering the climatology with a precomputed month index, chunk by
+        chunk for dask arrays.
+
+        :param da: DataArray with a time dimension
+        :param climatology: DataArray with a month dimension covering every
+            month in `da`
+        :return: DataArray of anomalies with a month coordinate
+        """
+        dims = da.dims
+        da = da.transpose("time", ...)
+        clim = climatology.transpose("month", *da.dims[1:]).values.\
+            astype(da.dtype)
+        month_idx = np.searchsorted(climatology.month.values,
+                                    da["time.month"].values)
+
+        if isinstance(da.data, dask.array.Array):
+            data = dask.array.map_blocks(_subtract_month_block,
+                                         da.data,
+                                         month_idx=month_idx,
+                                         clim=clim,
+                                         dtype=da.dtype)
+        else:
+            data = da.data - clim[month_idx]
+
+        return da.copy(data=data).\
+            assign_coords(month=da["time.month"]).transpose(*dims)
+
     def _normalise_array_mean(self, var_name: str, da: object):
         """
         Using the *training* data only, compute the mean and
@@ -454,6 +842,9 @@ class IceNetPreProcessor(Processor):
                 self._dtype(el)
                 for el in open(mean_path, "r").read().split(",")
             ])
+        elif self._append:
+            raise RuntimeError("Appending requires the stored normalisation "
+                               "parameters {}".format(mean_path))
         elif self._dates.train:
             logging.debug("Generating norm-average mean-std from {} training "
                           "dates".format(len(self._dates.train)))
@@ -494,6 +885,9 @@ class IceNetPreProcessor(Processor):
                 self._dtype(el)
                 for el in open(scale_path, "r").read().split(",")
             ])
+        elif self._append:
+            raise RuntimeError("Appending requires the stored normalisation "
+                               "parameters {}".format(scale_path))
         elif self._dates.train:
             logging.debug("Generating norm-scaling min-max from {} training "
                           "dates".format(len(self._dates.train)))
@@ -545,6 +939,21 @@ class IceNetPreProcessor(Processor):
                 for d in self._linear_trend_steps
             ])
 
+        # Could use shelve, but more likely we'll run into concurrency issues
+        # pickleshare might be an option but a little over-engineery
+        trend_cache_path = self.get_processed_path(
+            var_name, "{}_linear_trend.nc".format(var_name))
+        stale_dates = set()
+
+        if self._append and os.path.exists(trend_cache_path):
+            # Trends on or after the first appended date were cached without
+            # the new data, so they're recalculated and overwritten
+            with xr.open_dataarray(trend_cache_path) as stored_trend:
+                stale_dates = set(
+                    date for date in pd.to_datetime(stored_trend.time.values)
+                    if date >= data_dates[0])
+            trend_dates = trend_dates.union(stale_dates)
+
         trend_dates = list(sorted(trend_dates))
         logging.info("Generating {} trend dates".format(len(trend_dates)))
 
@@ -558,10 +967,6 @@ class IceNetPreProcessor(Processor):
 
         land_mask = Masks(north=self.north, south=self.south).get_land_mask()
 
-        # Could use shelve, but more likely we'll run into concurrency issues
-        # pickleshare might be an option but a little over-engineery
-        trend_cache_path = os.path.join(self.get_data_var_folder(var_name),
-                                        "{}_linear_trend.nc".format(var_name))
         trend_cache = linear_trend_da.copy()
         trend_cache.data = np.full_like(linear_trend_da.data, np.nan)
 
@@ -580,8 +985,12 @@ class IceNetPreProcessor(Processor):
                 isel(time=slice(0, max_years))
             return date_da
 
+        cached_dates = set(pd.to_datetime(
+            trend_cache.time.values)).difference(stale_dates)
+
         for forecast_date in sorted(trend_dates, reverse=True):
-            if not trend_cache.sel(time=forecast_date).isnull().all():
+            if forecast_date in cached_dates and \
+                    not trend_cache.sel(time=forecast_date).isnull().all():
                 output_map = trend_cache.sel(time=forecast_date)
             else:
                 output_map = linear_trend_forecast(
@@ -598,9 +1007,16 @@ class IceNetPreProcessor(Processor):
         trend_cache.close()
         linear_trend_da = linear_trend_da.rename(
             "{}_linear_trend".format(var_name))
-        self.save_processed_file(var_name,
-                                 "{}_linear_trend.nc".format(var_name),
-                                 linear_trend_da)
+
+        if self._append:
+            self.append_processed_file(var_name,
+                                       "{}_linear_trend.nc".format(var_name),
+                                       linear_trend_da,
+                                       overwrite=True)
+        else:
+            self.save_processed_file(var_name,
+                                     "{}_linear_trend.nc".format(var_name),
+                                     linear_trend_da)
 
         return linear_trend_da
 
@@ -611,3 +1027,40 @@ class IceNetPreProcessor(Processor):
     @missing_dates.setter
     def missing_dates(self, arr):
         self._missing_dates = arr
+
+
+def _subtract_month_block(block: object,
+                          month_idx: object,
+                          clim: object,
+                          block_info: dict = None) -> object:
+    """Subtract the climatology from a time-first block of data
+
+    :param block:
+    :param month_idx: climatology index for every time step in the array
+    :param clim: climatology with month as the first dimension
+    :param block_info: supplied by dask to locate the block
+    :return:
+    """
+    location = block_info[0]["array-location"]
+    time_start, time_end = location[0]
+    return block - clim[(month_idx[time_start:time_end],) +
+                        tuple(slice(*loc) for loc in location[1:])]
+
+
+def _save_variable_task(processor: IceNetPreProcessor, var_name: str,
+                        var_suffix: str) -> dict:
+    """Process pool entry point for IceNetPreProcessor variables
+
+    The processor is a copy in the worker process, so we hand back the files
+    it has written for the parent to merge. The workers are already busy
+    with variables, so the copy works serially within its variable rather
+    than starting pools of its own.
+
+    :param processor:
+    :param var_name:
+    :param var_suffix:
+    :return: the processed files of the worker copy
+    """
+    processor._workers = 1
+    processor._save_variable(var_name, var_suffix)
+    return processor.processed_files
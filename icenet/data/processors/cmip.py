@@ -29,7 +29,7 @@ class IceNetCMIPPreProcessor(IceNetPreProcessor):
         """
         if var_name == "siconca":
             masks = Masks(north=self.north, south=self.south)
-            return sic_interpolate(da, masks)
+            return sic_interpolate(da, masks, workers=self._workers)
 
         return da
 
@@ -50,13 +50,18 @@ def main():
         dates["train"],
         dates["val"],
         dates["test"],
+        append=args.append,
+        compression=args.compression,
         linear_trends=args.trends,
         linear_trend_days=args.trend_lead,
         north=args.hemisphere == "north",
+        output_format=args.output_format,
         parallel_opens=args.parallel_opens,
         ref_procdir=args.ref,
         south=args.hemisphere == "south",
         update_key=args.update_key,
+        workers=args.workers,
+        workers_memory=args.workers_memory,
     )
     cmip.init_source_data(lag_days=args.lag,)
     cmip.process()
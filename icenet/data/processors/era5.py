@@ -28,13 +28,18 @@ def main():
         dates["train"],
         dates["val"],
         dates["test"],
+        append=args.append,
+        compression=args.compression,
         linear_trends=args.trends,
         linear_trend_days=args.trend_lead,
         north=args.hemisphere == "north",
+        output_format=args.output_format,
         parallel_opens=args.parallel_opens,
         ref_procdir=args.ref,
         south=args.hemisphere == "south",
         update_key=args.update_key,
+        workers=args.workers,
+        workers_memory=args.workers_memory,
     )
     era5.init_source_data(lag_days=args.lag,)
     era5.process()
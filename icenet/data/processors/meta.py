@@ -116,5 +116,7 @@ def main():
     args = process_args(dates=False, ref_option=False)
 
     IceNetMetaPreProcessor(args.name,
+                           compression=args.compression,
                            north=args.hemisphere == "north",
+                           output_format=args.output_format,
                            south=args.hemisphere == "south").process()
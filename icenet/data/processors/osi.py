@@ -45,7 +45,7 @@ class IceNetOSIPreProcessor(IceNetPreProcessor):
                                "with siconca, ")
         else:
             masks = Masks(north=self.north, south=self.south)
-            return sic_interpolate(da, masks)
+            return sic_interpolate(da, masks, workers=self._workers)
 
 
 def main():
@@ -58,11 +58,16 @@ def main():
                                 dates["train"],
                                 dates["val"],
                                 dates["test"],
+                                append=args.append,
+                                compression=args.compression,
                                 linear_trends=args.trends,
                                 linear_trend_steps=args.trend_lead,
                                 north=args.hemisphere == "north",
+                                output_format=args.output_format,
                                 parallel_opens=args.parallel_opens,
                                 ref_procdir=args.ref,
-                                south=args.hemisphere == "south")
+                                south=args.hemisphere == "south",
+                                workers=args.workers,
+                                workers_memory=args.workers_memory)
     osi.init_source_data(lag_days=args.lag,)
     osi.process()
@@ -1,123 +1,347 @@
 import argparse
+import concurrent.futures
 import glob
 import logging
 import os
+import shutil
+import tempfile
+import time
 
 import numpy as np
 import pandas as pd
 import xarray as xr
 
 from icenet.utils import Hemisphere
-from icenet.data.producers import DataProducer
+from icenet.data.producers import DataProducer, encode_output
+from icenet.data.catalog import DataCatalog
 
-from scipy import interpolate
+from scipy import sparse, spatial
 from scipy.spatial.qhull import QhullError
 """
 
 """
 
 
-def sic_interpolate(da: object, masks: object) -> object:
+def sic_interpolate(da: object, masks: object, workers: int = 1) -> object:
     """
+    Interpolate over the polar hole and missing regions of each day of SIC.
 
-    :param da:
+    Days sharing the same geometry of cells to interpolate, which polar holes
+    do for long date ranges, share a triangulation. The barycentric weights
+    are computed once per geometry, spread over `workers` processes, and
+    applied to every day with that geometry as a sparse matrix product.
+
+    :param da: time first DataArray, modified in place
     :param masks:
+    :param workers: processes to compute interpolation weights with
     :return:
     """
-    for date in da.time.values:
-        polarhole_mask = masks.get_polarhole_mask(pd.to_datetime(date).date())
+    data = da.data
+    geometries = dict()
+    geometry_days = dict()
 
-        da_day = da.sel(time=date)
-        xx, yy = np.meshgrid(np.arange(432), np.arange(432))
+    polarhole_index = masks.get_polarhole_index(da.time.values)
+    polarholes = masks.get_polarhole_stack() \
+        if (polarhole_index >= 0).any() else None
 
-        # Grid cells outside of polar hole or NaN regions
-        valid = ~np.isnan(da_day.data)
+    for idx, polarhole_idx in enumerate(polarhole_index):
+        # Grid cells inside of polar hole or NaN regions
+        invalid = np.isnan(data[idx])
 
-        # Interpolate polar hole
-        if type(polarhole_mask) is np.ndarray:
-            valid = valid & ~polarhole_mask
+        if polarhole_idx >= 0:
+            invalid = invalid | polarholes[polarhole_idx]
 
         # Interpolate if there is more than one missing grid cell
-        if np.sum(~valid) >= 1:
-            # Find grid cell locations surrounding NaN regions for bilinear
-            # interpolation
-            nan_mask = np.ma.masked_array(np.full((432, 432), 0.))
-            nan_mask[~valid] = np.ma.masked
-
-            nan_neighbour_arrs = {}
-            for order in 'C', 'F':
-                # starts and ends indexes of masked element chunks
-                slice_ends = np.ma.clump_masked(nan_mask.ravel(order=order))
-
-                nan_neighbour_idxs = []
-                nan_neighbour_idxs.extend([s.start for s in slice_ends])
-                nan_neighbour_idxs.extend([s.stop - 1 for s in slice_ends])
-
-                nan_neighbour_arr_i = np.array(np.full((432, 432), False),
-                                               order=order)
-                nan_neighbour_arr_i.ravel(order=order)[nan_neighbour_idxs] \
-                    = True
-                nan_neighbour_arrs[order] = nan_neighbour_arr_i
-
-            nan_neighbour_arr = nan_neighbour_arrs['C'] + \
-                nan_neighbour_arrs['F']
-            # Remove artefacts along edge of the grid
-            nan_neighbour_arr[:, 0] = \
-                nan_neighbour_arr[0, :] = \
-                nan_neighbour_arr[:, -1] = \
-                nan_neighbour_arr[-1, :] = False
-
-            if np.sum(nan_neighbour_arr) == 1:
-                res = np.where(
-                    np.array(nan_neighbour_arr) == True)  # noqa: E712
-                logging.warning(
-                    "Not enough nans for interpolation, extending {}".format(
-                        res))
-                x_idx, y_idx = res[0][0], res[1][0]
-                nan_neighbour_arr[x_idx - 1:x_idx + 2, y_idx] = True
-                nan_neighbour_arr[x_idx, y_idx - 1:y_idx + 2] = True
-                logging.debug(
-                    np.where(np.array(nan_neighbour_arr) == True))  # noqa: E712
-
-            # Perform bilinear interpolation
-            x_valid = xx[nan_neighbour_arr]
-            y_valid = yy[nan_neighbour_arr]
-            values = da_day.data[nan_neighbour_arr]
-
-            x_interp = xx[~valid]
-            y_interp = yy[~valid]
-
-            try:
-                if len(x_valid) or len(y_valid):
-                    interp_vals = interpolate.griddata((x_valid, y_valid),
-                                                       values,
-                                                       (x_interp, y_interp),
-                                                       method='linear')
-                    da.sel(time=date).data[~valid] = interp_vals
-                else:
-                    logging.warning("No valid values to interpolate with on "
-                                    "{}".format(date))
-            except QhullError:
-                logging.exception(
-                    "Geometrical degeneracy from QHull, interpolation failed")
+        if not invalid.any():
+            continue
+
+        key = np.packbits(invalid).tobytes()
+
+        if key not in geometries:
+            geometries[key] = invalid
+            geometry_days[key] = []
+        geometry_days[key].append(idx)
+
+    logging.info("Interpolating {} days with {} distinct geometries".format(
+        sum([len(v) for v in geometry_days.values()]), len(geometries)))
+
+    if workers > 1 and len(geometries) > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers) as executor:
+            weights = dict(
+                zip(geometries.keys(),
+                    executor.map(_interpolation_weights, geometries.values())))
+    else:
+        weights = {
+            key: _interpolation_weights(invalid)
+            for key, invalid in geometries.items()
+        }
+
+    for key, days in geometry_days.items():
+        if weights[key] is None:
+            logging.warning("No interpolation for {} days from {}".format(
+                len(days), pd.to_datetime(da.time.values[days[0]]).date()))
+            continue
+
+        sources, targets, outside, matrix = weights[key]
+
+        for idx in days:
+            day = data[idx].ravel()
+            interp_vals = matrix @ day[sources]
+            interp_vals[outside] = np.nan
+            day[targets] = interp_vals
+            data[idx] = day.reshape(data.shape[1:])
 
     return da
 
 
+def _interpolation_weights(invalid: object) -> object:
+    """
+    Triangulate the cells surrounding the invalid regions and compute the
+    barycentric weights of each invalid cell, as linear griddata would.
+
+    The sparse matrix keeps explicit zero weights so that, as with griddata,
+    a NaN at any vertex of the enclosing simplex results in a NaN.
+
+    :param invalid: 2D boolean array of cells to interpolate
+    :return: tuple of source and target flat indices, a boolean array of
+        targets outside the triangulation and the sparse weights matrix, or
+        None if no interpolation is possible
+    """
+    yy, xx = np.indices(invalid.shape)
+
+    # Find grid cell locations surrounding NaN regions for bilinear
+    # interpolation
+    nan_mask = np.ma.masked_array(np.full(invalid.shape, 0.))
+    nan_mask[invalid] = np.ma.masked
+
+    nan_neighbour_arrs = {}
+    for order in 'C', 'F':
+        # starts and ends indexes of masked element chunks
+        slice_ends = np.ma.clump_masked(nan_mask.ravel(order=order))
+
+        nan_neighbour_idxs = []
+        nan_neighbour_idxs.extend([s.start for s in slice_ends])
+        nan_neighbour_idxs.extend([s.stop - 1 for s in slice_ends])
+
+        nan_neighbour_arr_i = np.array(np.full(invalid.shape, False),
+                                       order=order)
+        nan_neighbour_arr_i.ravel(order=order)[nan_neighbour_idxs] = True
+        nan_neighbour_arrs[order] = nan_neighbour_arr_i
+
+    nan_neighbour_arr = nan_neighbour_arrs['C'] + nan_neighbour_arrs['F']
+    # Remove artefacts along edge of the grid
+    nan_neighbour_arr[:, 0] = \
+        nan_neighbour_arr[0, :] = \
+        nan_neighbour_arr[:, -1] = \
+        nan_neighbour_arr[-1, :] = False
+
+    if np.sum(nan_neighbour_arr) == 1:
+        res = np.where(np.array(nan_neighbour_arr) == True)  # noqa: E712
+        logging.warning(
+            "Not enough nans for interpolation, extending {}".format(res))
+        x_idx, y_idx = res[0][0], res[1][0]
+        nan_neighbour_arr[x_idx - 1:x_idx + 2, y_idx] = True
+        nan_neighbour_arr[x_idx, y_idx - 1:y_idx + 2] = True
+        logging.debug(
+            np.where(np.array(nan_neighbour_arr) == True))  # noqa: E712
+
+    sources = np.flatnonzero(nan_neighbour_arr)
+    targets = np.flatnonzero(invalid)
+
+    if not len(sources):
+        return None
+
+    points = np.column_stack(
+        [xx[nan_neighbour_arr], yy[nan_neighbour_arr]]).astype(np.float64)
+    xi = np.column_stack([xx[invalid], yy[invalid]]).astype(np.float64)
+
+    try:
+        triangulation = spatial.Delaunay(points)
+    except QhullError:
+        logging.exception(
+            "Geometrical degeneracy from QHull, interpolation failed")
+        return None
+
+    simplices = triangulation.find_simplex(xi)
+    inside = simplices >= 0
+
+    transform = triangulation.transform[simplices[inside]]
+    barycentric = np.einsum("ijk,ik->ij", transform[:, :2, :],
+                            xi[inside] - transform[:, 2, :])
+    weights = np.column_stack(
+        [barycentric, 1. - barycentric.sum(axis=1)])
+
+    matrix = sparse.csr_matrix(
+        (weights.ravel(),
+         (np.repeat(np.flatnonzero(inside), weights.shape[1]),
+          triangulation.simplices[simplices[inside]].ravel())),
+        shape=(len(targets), len(sources)))
+    return sources, targets, ~inside, matrix
+
+
 def condense_main():
     ap = argparse.ArgumentParser()
     ap.add_argument("identifier")
     ap.add_argument("hemisphere", choices=("north", "south"))
     ap.add_argument("variable")
 
+    ap.add_argument("-c", "--complevel", type=int, default=4)
+    ap.add_argument("-d", "--dry", action="store_true", default=False)
     ap.add_argument("-n", "--numpy", action="store_true", default=False)
     ap.add_argument("-v", "--verbose", action="store_true", default=False)
+    ap.add_argument("-w", "--workers", type=int, default=4)
     args = ap.parse_args()
     logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
-    condense_data(args.identifier, args.hemisphere, args.variable)
+    condense_data(args.identifier,
+                  args.hemisphere,
+                  args.variable,
+                  workers=args.workers,
+                  complevel=args.complevel,
+                  dry=args.dry)
+
+
+def benchmark_main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path", help="Processed netCDF file of one variable")
 
+    ap.add_argument("-c", "--compression", type=int, nargs="+",
+                    default=[0, 1, 4])
+    ap.add_argument("-f", "--output-formats", nargs="+",
+                    default=["netcdf", "zarr"], choices=("netcdf", "zarr"))
+    ap.add_argument("-s", "--samples", type=int, default=100)
+    ap.add_argument("-v", "--verbose", action="store_true", default=False)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    for result in benchmark_outputs(args.path,
+                                    output_formats=args.output_formats,
+                                    compressions=args.compression,
+                                    samples=args.samples):
+        logging.info("{output_format:>6} compression {compression}: "
+                     "{size_mb:8.1f}MB, write {write_s:.2f}s, "
+                     "read {read_ms:.2f}ms per time step".format(**result))
+
+
+def _store_size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(path)
+               for name in names)
+
+
+def benchmark_outputs(path: str,
+                      output_formats: tuple = ("netcdf", "zarr"),
+                      compressions: tuple = (0, 1, 4),
+                      samples: int = 100) -> list:
+    """Compares the processed output settings for a variable
+
+    The variable is rewritten with each output format and compression
+    level, as Processor.save_processed_file would, into a temporary
+    directory. Time steps are then read back in random order one at a time,
+    as the loaders do.
+
+    :param path: processed netCDF file of one variable
+    :param output_formats: "netcdf" and/or "zarr"
+    :param compressions: compression levels, 0 to disable
+    :param samples: time steps to read back for each output
+    :return: list of dicts of the settings, size on disk, write time and
+        read latency of each output
+    """
+    with xr.open_dataarray(path) as da:
+        da = da.load()
+
+    rng = np.random.default_rng(42)
+    idxs = rng.integers(0, len(da.time), size=samples) \
+        if "time" in da.dims else []
+    results = list()
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        for output_format in output_formats:
+            for compression in compressions:
+                out_path = os.path.join(tmp_dir, "{}_{}.{}".format(
+                    output_format, compression,
+                    "zarr" if output_format == "zarr" else "nc"))
+                data = encode_output(da, output_format, compression)
+
+                start = time.perf_counter()
+                if output_format == "zarr":
+                    data.to_dataset(name=da.name).to_zarr(out_path, mode="w")
+                else:
+                    data.to_netcdf(out_path)
+                write_s = time.perf_counter() - start
+
+                open_fn = xr.open_zarr if output_format == "zarr" \
+                    else xr.open_dataset
+
+                with open_fn(out_path, chunks=dict(time=1)) as ds:
+                    start = time.perf_counter()
+                    for idx in idxs:
+                        ds[da.name].isel(time=idx).values
+                    read_s = time.perf_counter() - start
+
+                results.append(dict(
+                    output_format=output_format,
+                    compression=compression,
+                    size_mb=_store_size(out_path) / 2**20,
+                    write_s=write_s,
+                    read_ms=read_s * 1000 / max(len(idxs), 1)))
+    finally:
+        shutil.rmtree(tmp_dir)
+    return results
+
+
+def _condense_year(year_files: list, year_path: str, complevel: int) -> str:
+    """Condenses a year's daily files into a single yearly file
+
+    Data variables are compressed and chunked a day at a time, which is how
+    they're read back.
+
+    :param year_files:
+    :param year_path:
+    :param complevel: zlib compression level, 0 to disable
+    :return: the year path
+    """
+    logging.info("Loading {}".format(year_path))
 
-def condense_data(identifier: str, hemisphere: str, variable: str):
+    with xr.open_mfdataset(sorted(year_files),
+                           combine="by_coords",
+                           parallel=True) as ds:
+        years = np.unique(ds.time.dt.year.values)
+
+        if len(years) > 1:
+            raise RuntimeError("Too many years in one file {}".format(years))
+
+        encoding = dict()
+
+        for name, var in ds.variables.items():
+            for key in ("chunksizes", "contiguous", "original_shape"):
+                var.encoding.pop(key, None)
+
+            if name in ds.data_vars and "time" in var.dims:
+                encoding[name] = dict(
+                    zlib=complevel > 0,
+                    complevel=complevel,
+                    chunksizes=tuple(1 if dim == "time" else ds.sizes[dim]
+                                     for dim in var.dims))
+
+        logging.info("Saving to {}".format(year_path))
+        tmp_path = "{}.tmp".format(year_path)
+        ds.to_netcdf(tmp_path, encoding=encoding, unlimited_dims=["time"])
+
+    os.replace(tmp_path, year_path)
+    DataCatalog.default(year_path).record(year_path)
+    return year_path
+
+
+def condense_data(identifier: str,
+                  hemisphere: str,
+                  variable: str,
+                  workers: int = 4,
+                  complevel: int = 4,
+                  dry: bool = False):
     """Takes existing daily files and creates yearly files
 
     Previous early versions of the pipeline were storing files day by day, which
@@ -127,6 +351,9 @@ def condense_data(identifier: str, hemisphere: str, variable: str):
     :param identifier:
     :param hemisphere:
     :param variable:
+    :param workers: processes condensing years concurrently
+    :param complevel: zlib compression level for the yearly files
+    :param dry: report the years to condense and the I/O involved only
     """
     logging.info("Condensing data into singular file")
 
@@ -141,35 +368,61 @@ def condense_data(identifier: str, hemisphere: str, variable: str):
     logging.debug("Collecting files from {}".format(data_path))
     dfs = glob.glob(os.path.join(data_path, "**", "*.nc"))
 
-    def year_batch(filenames):
-        df_years = set([
-            os.path.split(os.path.dirname(f_year))[-1] for f_year in filenames
-        ])
+    if not len(dfs):
+        logging.info("No valid files found.")
+        return
+
+    logging.debug("Got {} files, collecting to {}...".format(
+        len(dfs), data_path))
+
+    year_files = dict()
 
-        for year_el in df_years:
-            year_dfs = [
-                el for el in filenames
-                if os.path.split(os.path.dirname(el))[-1] == year_el and
-                not os.path.split(el)[1].startswith("latlon")
+    for df in dfs:
+        if not os.path.basename(df).startswith("latlon"):
+            year_files.setdefault(
+                os.path.basename(os.path.dirname(df)), []).append(df)
+
+    to_condense = dict()
+
+    for year, files in sorted(year_files.items()):
+        logging.debug("{} has {} files".format(year, len(files)))
+        year_path = os.path.join(data_path, "{}.nc".format(year))
+
+        if not os.path.exists(year_path):
+            to_condense[year_path] = files
+
+    if dry:
+        total_read, total_write = 0, 0
+
+        for year_path, files in to_condense.items():
+            read = sum(os.path.getsize(df) for df in files)
+
+            with xr.open_dataset(files[0]) as ds:
+                write = ds.nbytes * len(files)
+
+            logging.info("{}: {} files, {:.1f}MB to read, up to {:.1f}MB "
+                         "uncompressed to write".format(
+                             year_path, len(files), read / 2**20,
+                             write / 2**20))
+            total_read += read
+            total_write += write
+
+        logging.info("{} years to condense, {:.1f}MB to read, up to {:.1f}MB "
+                     "uncompressed to write".format(len(to_condense),
+                                                    total_read / 2**20,
+                                                    total_write / 2**20))
+        return
+
+    if workers > 1 and len(to_condense) > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(workers, len(to_condense))) as executor:
+            futures = [
+                executor.submit(_condense_year, files, year_path, complevel)
+                for year_path, files in to_condense.items()
             ]
-            logging.debug("{} has {} files".format(year_el, len(year_dfs)))
-            yield year_el, year_dfs
-
-    if len(dfs):
-        logging.debug("Got {} files, collecting to {}...".format(
-            len(dfs), data_path))
-
-        for year, year_files in year_batch(dfs):
-            year_path = os.path.join(data_path, "{}.nc".format(year))
-
-            if not os.path.exists(year_path):
-                logging.info("Loading {}".format(year))
-                ds = xr.open_mfdataset(year_files, parallel=True)
-                years, datasets = zip(*ds.groupby("time.year"))
-                if len(years) > 1:
-                    raise RuntimeError(
-                        "Too many years in one file {}".format(years))
-                logging.info("Saving to {}".format(year_path))
-                xr.save_mfdataset(datasets, [year_path])
+
+            for future in concurrent.futures.as_completed(futures):
+                logging.info("Condensed {}".format(future.result()))
     else:
-        logging.info("No valid files found.")
+        for year_path, files in to_condense.items():
+            _condense_year(files, year_path, complevel)
@@ -2,15 +2,77 @@ from abc import abstractmethod, ABCMeta
 
 import collections
 import datetime as dt
-import glob
+import fnmatch
 import logging
 import os
 import re
+import time
 
-import pandas as pd
-
+from icenet.data.catalog import DataCatalog
+from icenet.data.utils import append_netcdf_time, append_zarr_time
 from icenet.utils import Hemisphere, HemisphereMixin
 
+# Module level so that processors remain picklable for process pools
+Dates = collections.namedtuple("Dates", ["train", "val", "test"])
+
+
+def encode_output(data: object, output_format: str = "netcdf",
+                  compression: int = 1) -> object:
+    """Set the chunking and compression encoding for a processed output.
+
+    Outputs are chunked a single time step at a time over the full spatial
+    extent, matching how the loaders read samples. Zarr outputs are Blosc
+    (zstd) compressed and netCDF outputs zlib compressed.
+
+    Args:
+        data: The DataArray to be written.
+        output_format (optional): "netcdf" or "zarr". Defaults to "netcdf".
+        compression (optional): Compression level, 0 to disable.
+            Defaults to 1.
+
+    Returns:
+        A shallow copy of the DataArray with its encoding set.
+    """
+    if not data.dims:
+        return data
+
+    chunks = tuple(1 if dim == "time" else size
+                   for dim, size in zip(data.dims, data.shape))
+    data = data.copy(deep=False)
+
+    if data.chunks is not None:
+        # Dask chunks can't straddle output chunks
+        data = data.chunk({dim: -1 for dim in data.dims if dim != "time"})
+
+    # Drop storage settings inherited from the source files
+    for key in ("chunks", "chunksizes", "compressor", "compressors",
+                "complevel", "contiguous", "preferred_chunks", "zlib"):
+        data.encoding.pop(key, None)
+
+    if output_format == "zarr":
+        # Zarr is only needed for Zarr outputs, and its codecs differ
+        # between the v2 and v3 libraries
+        import zarr
+
+        if int(zarr.__version__.split(".")[0]) >= 3:
+            data.encoding["compressors"] = (zarr.codecs.BloscCodec(
+                cname="zstd", clevel=compression, shuffle="shuffle"),) \
+                if compression > 0 else None
+        else:
+            import numcodecs
+
+            data.encoding["compressor"] = numcodecs.Blosc(
+                cname="zstd",
+                clevel=compression,
+                shuffle=numcodecs.Blosc.SHUFFLE) if compression > 0 else None
+        data.encoding["chunks"] = chunks
+    else:
+        data.encoding.update(chunksizes=chunks, zlib=compression > 0)
+
+        if compression > 0:
+            data.encoding["complevel"] = compression
+    return data
+
 
 class DataCollection(HemisphereMixin, metaclass=ABCMeta):
     """An Abstract base class with common interface for data collection classes.
@@ -176,6 +238,181 @@ class Generator(DataProducer):
             __class__.__name__))
 
 
+class SourceCatalogue:
+    """A persistent catalogue of the source data files for processors.
+
+    Walking a large source data tree is expensive, so the directory listings
+    are persisted in the DataCatalog and checked against each directory's
+    modification time: only directories that have changed since the last
+    refresh get rescanned. Lookups are then served from an in-memory index
+    keyed by (variable, year).
+
+    Attributes:
+        FILE_PATTERN: Pattern that source data files must match.
+    """
+
+    FILE_PATTERN = "[12]*.nc"
+    VERSION = 1
+
+    # Directories changed this recently might still be changing within the
+    # resolution of the filesystem timestamps, so are always rescanned
+    MTIME_SETTLE = 2.
+
+    def __init__(self, source_data: str, catalog: object = None) -> None:
+        """Initialises the SourceCatalogue.
+
+        Args:
+            source_data: The source data directory to catalogue.
+            catalog (optional): The DataCatalog to persist the listings in.
+                Defaults to the configured catalog.
+        """
+        self._catalog = DataCatalog.default(root=source_data) \
+            if catalog is None else catalog
+        self._source_data = source_data
+        self._directories = dict()
+        self._index = dict()
+
+    def refresh(self) -> None:
+        """Brings the catalogue up to date with the source data directory."""
+        cached = self._load()
+        directories = dict()
+        scan_time = time.time()
+
+        rescanned = self._scan(self._source_data, cached, directories,
+                               scan_time)
+
+        # Only listing changes (or newly settled listings) warrant a save
+        changed = set(directories) != set(cached) or any([
+            (entry["subdirs"], entry["files"]) !=
+            (cached[rel_dir]["subdirs"], cached[rel_dir]["files"]) or
+            (cached[rel_dir]["mtime"] is None and entry["mtime"] is not None)
+            for rel_dir, entry in directories.items()
+        ])
+
+        logging.info("Source catalogue has {} directories, {} rescanned".format(
+            len(directories), rescanned))
+
+        self._directories = directories
+        self._build_index()
+
+        if changed:
+            self._save()
+
+    def get_year_files(self, year: int) -> dict:
+        """Returns the yearly files for each variable in the catalogue.
+
+        Args:
+            year: The year to look up.
+
+        Returns:
+            A dict of sorted file paths keyed by variable name.
+        """
+        return {
+            var: self._index[(var, year)]
+            for var in self.variables
+            if (var, year) in self._index
+        }
+
+    @property
+    def variables(self) -> list:
+        """The sorted variable names in the catalogue."""
+        return sorted(set([var for var, _ in self._index.keys()]))
+
+    def get_files(self, var: str, year: int) -> list:
+        """Returns the files for a variable and year.
+
+        Args:
+            var: The variable name.
+            year: The year to look up.
+
+        Returns:
+            A sorted list of file paths.
+        """
+        return self._index.get((var, year), [])
+
+    def _build_index(self) -> None:
+        index = dict()
+
+        for rel_dir, entry in self._directories.items():
+            directory = os.path.normpath(
+                os.path.join(self._source_data, rel_dir))
+
+            for filename, var, year, _ in entry["files"]:
+                # Processors consume the yearly aggregated files, so we only
+                # index those whose name is the year itself
+                if var is None or filename[:-3] != str(year):
+                    continue
+
+                key = (var, year)
+                if key not in index:
+                    index[key] = list()
+                index[key].append(os.path.join(directory, filename))
+
+        self._index = {k: sorted(v) for k, v in index.items()}
+
+    def _load(self) -> dict:
+        return self._catalog.get_listings(self._source_data,
+                                          SourceCatalogue.VERSION)
+
+    def _save(self) -> None:
+        self._catalog.set_listings(self._source_data, SourceCatalogue.VERSION,
+                                   self._directories)
+
+    def _scan(self, directory: str, cached: dict, directories: dict,
+              scan_time: float) -> int:
+        """Recursively catalogues a directory, reusing unchanged listings.
+
+        Returns:
+            The number of directories that were rescanned.
+        """
+        rel_dir = os.path.relpath(directory, self._source_data)
+        mtime = os.stat(directory).st_mtime
+        entry = cached.get(rel_dir)
+        rescanned = 0
+
+        if entry is None or entry["mtime"] != mtime:
+            subdirs, files = [], []
+            path_comps = os.path.normpath(directory).split(os.sep)
+            var = path_comps[-1]
+
+            # The year is in the path, fall back one further
+            if re.match(r'^\d{4}$', var):
+                var = path_comps[-2] if len(path_comps) > 1 else None
+
+            with os.scandir(directory) as it:
+                for dir_entry in it:
+                    if dir_entry.name.startswith("."):
+                        continue
+
+                    if dir_entry.is_dir():
+                        subdirs.append(dir_entry.name)
+                    elif fnmatch.fnmatch(dir_entry.name,
+                                         SourceCatalogue.FILE_PATTERN):
+                        year = dir_entry.name[:4]
+                        files.append([
+                            dir_entry.name, var,
+                            int(year) if year.isdigit() else None,
+                            dir_entry.stat().st_mtime
+                        ])
+
+            entry = dict(
+                mtime=mtime
+                if mtime < scan_time - SourceCatalogue.MTIME_SETTLE else None,
+                subdirs=sorted(subdirs),
+                files=sorted(files, key=lambda f: f[0]))
+            rescanned += 1
+
+        directories[rel_dir] = entry
+
+        for subdir in entry["subdirs"]:
+            sub_path = os.path.join(directory, subdir)
+
+            if os.path.isdir(sub_path):
+                rescanned += self._scan(sub_path, cached, directories,
+                                        scan_time)
+        return rescanned
+
+
 class Processor(DataProducer):
     """An abstract base class for data processing classes.
 
@@ -189,14 +426,20 @@ class Processor(DataProducer):
         _var_files: Dictionary storing variable files organised by variable name.
         _processed_files: Dictionary storing the processed files organised by variable name.
         _dates: Named tuple that stores the dates used for training, validation, and testing.
+        _compression: Compression level for processed outputs, 0 to disable.
+        _output_format: Format of processed outputs, "netcdf" or "zarr".
     """
 
+    OUTPUT_FORMATS = ("netcdf", "zarr")
+
     def __init__(self,
                  identifier: str,
                  source_data: object,
                  *args,
+                 compression: int = 1,
                  file_filters: object = (),
                  lead_time: int = 93,
+                 output_format: str = "netcdf",
                  test_dates: object = (),
                  train_dates: object = (),
                  val_dates: object = (),
@@ -207,10 +450,14 @@ class Processor(DataProducer):
             identifier: The identifier for the processor.
             source_data: The source data directory.
             *args: Additional positional arguments.
+            compression (optional): Compression level for processed outputs,
+                0 to disable. Defaults to 1.
             file_filters (optional): List of file filters to exclude certain files
                 during data processing. Defaults to ().
             lead_time (optional): The forecast/lead time used in the data processing.
                 Defaults to 93.
+            output_format (optional): Format of processed outputs, "netcdf" or
+                "zarr". Defaults to "netcdf".
             test_dates (optional): Dates used for testing. Defaults to ().
             train_dates (optional): Dates used for training. Defaults to ().
             val_dates (optional): Dates used for validation. Defaults to ().
@@ -218,21 +465,26 @@ class Processor(DataProducer):
         """
         super().__init__(*args, identifier=identifier, **kwargs)
 
+        if output_format not in Processor.OUTPUT_FORMATS:
+            raise ValueError("Output format {} is not one of {}".format(
+                output_format, ", ".join(Processor.OUTPUT_FORMATS)))
+
+        self._compression = compression
         self._file_filters = list(file_filters)
         self._lead_time = lead_time
+        self._output_format = output_format
         self._source_data = os.path.join(source_data, identifier,
                                          self.hemisphere_str[0])
         self._var_files = dict()
         self._processed_files = dict()
 
         # TODO: better as a mixin? or maybe a Python data class instead?
-        Dates = collections.namedtuple("Dates", ["train", "val", "test"])
         self._dates = Dates(train=list(train_dates),
                             val=list(val_dates),
                             test=list(test_dates))
 
     def init_source_data(self, lag_days: object = None) -> None:
-        """Initialises source data by globbing the files and organising based on date.
+        """Initialises source data from the source catalogue, organising based on date.
         Adds previous n days of `lag_days` if not already in `self._dates`
             if lag_days>0.
         Adds next n days of `self._lead_time` if not already in `self._dates`
@@ -252,6 +504,9 @@ class Processor(DataProducer):
             raise OSError("Source data directory {} does not exist".format(
                 self.source_data))
 
+        catalogue = SourceCatalogue(self.source_data)
+        catalogue.refresh()
+
         var_files = {}
 
         for date_category in ["train", "val", "test"]:
@@ -265,19 +520,19 @@ class Processor(DataProducer):
                     "No {} dates for this processor".format(date_category))
                 continue
 
-            # TODO: ProcessPool for this (avoid the GIL for globbing)
             # FIXME: needs to deal with a lack of continuity in the date ranges
             if lag_days:
                 logging.info("Including lag of {} days".format(lag_days))
 
-                additional_lag_dates = []
+                date_set = set(dates)
+                additional_lag_dates = set()
 
                 for date in dates:
                     for day in range(lag_days):
                         lag_date = date - dt.timedelta(days=day + 1)
-                        if lag_date not in dates:
-                            additional_lag_dates.append(lag_date)
-                dates += list(set(additional_lag_dates))
+                        if lag_date not in date_set:
+                            additional_lag_dates.add(lag_date)
+                dates += list(additional_lag_dates)
 
             # FIXME: this is conveniently supplied for siconca_abs on
             #  training with OSISAF data, but are we exploiting the
@@ -286,61 +541,37 @@ class Processor(DataProducer):
                 logging.info("Including lead of {} days".format(
                     self._lead_time))
 
-                additional_lead_dates = []
+                date_set = set(dates)
+                additional_lead_dates = set()
 
                 for date in dates:
                     for day in range(self._lead_time):
                         lead_day = date + dt.timedelta(days=day + 1)
-                        if lead_day not in dates:
-                            additional_lead_dates.append(lead_day)
-                dates += list(set(additional_lead_dates))
-
-            globstr = "{}/**/[12]*.nc".format(self.source_data)
-
-            logging.debug("Globbing {} from {}".format(date_category, globstr))
-            dfs = glob.glob(globstr, recursive=True)
-            logging.debug("Globbed {} files".format(len(dfs)))
-
-            # FIXME: using hyphens broadly no?
-            data_dates = [
-                df.split(os.sep)[-1][:-3].replace("_", "-") for df in dfs
-            ]
-            dt_series = pd.Series(dfs, index=data_dates)
-
-            logging.debug("Create structure of {} files".format(
-                len(dt_series)))
+                        if lead_day not in date_set:
+                            additional_lead_dates.add(lead_day)
+                dates += list(additional_lead_dates)
 
             # Ensure we're ordered, it has repercussions for xarray
-            for date in sorted(dates):
-                try:
-                    match_dfs = dt_series[date.strftime("%Y")]
+            for year in sorted(set([date.year for date in dates])):
+                year_files = catalogue.get_year_files(year)
 
-                    if type(match_dfs) == str:
-                        match_dfs = [match_dfs]
-                except KeyError:
+                if not year_files:
                     logging.info("No data found for {}, outside data boundary "
-                                 "perhaps?".format(date.strftime("%Y-%m-%d")))
-                    match_dfs = []
-
-                for df in match_dfs:
-                    if any([
-                            flt in os.path.split(df)[1]
-                            for flt in self._file_filters
-                    ]):
-                        continue
-
-                    path_comps = str(os.path.split(df)[0]).split(os.sep)
-                    var = path_comps[-1]
+                                 "perhaps?".format(year))
 
-                    # The year is in the path, fall back one further
-                    if re.match(r'^\d{4}$', var):
-                        var = path_comps[-2]
+                for var, match_dfs in year_files.items():
+                    for df in match_dfs:
+                        if any([
+                                flt in os.path.split(df)[1]
+                                for flt in self._file_filters
+                        ]):
+                            continue
 
-                    if var not in var_files.keys():
-                        var_files[var] = list()
+                        if var not in var_files.keys():
+                            var_files[var] = list()
 
-                    if df not in var_files[var]:
-                        var_files[var].append(df)
+                        if df not in var_files[var]:
+                            var_files[var].append(df)
 
         # TODO: allow option to ditch dates from train/val/test for missing
         #  var files
@@ -358,9 +589,28 @@ class Processor(DataProducer):
         raise NotImplementedError("{}.process is abstract".format(
             __class__.__name__))
 
+    def get_processed_path(self, var_name: str, name: str, **kwargs) -> str:
+        """Get the path of a processed file in the configured output format.
+
+        Args:
+            var_name: The name of the variable.
+            name: The name of the file, with a netCDF extension.
+            **kwargs: Additional keyword arguments to be passed to the
+                `get_data_var_folder` method.
+
+        Returns:
+            The path of the processed file.
+        """
+        if self._output_format == "zarr":
+            name = "{}.zarr".format(os.path.splitext(name)[0])
+        return os.path.join(self.get_data_var_folder(var_name, **kwargs), name)
+
     def save_processed_file(self, var_name: str, name: str, data: object,
                             **kwargs) -> str:
-        """Save processed data to netCDF file.
+        """Save processed data to netCDF file or Zarr store.
+
+        Outputs are chunked a single time step at a time over the full spatial
+        extent, matching how the loaders read samples, and compressed.
 
         Args:
             var_name: The name of the variable.
@@ -370,12 +620,81 @@ class Processor(DataProducer):
                 `get_data_var_folder` method.
 
         Returns:
-            The path of the saved netCDF file.
+            The path of the saved file.
         """
-        file_path = os.path.join(self.get_data_var_folder(var_name, **kwargs),
-                                 name)
-        data.to_netcdf(file_path)
+        file_path = self.get_processed_path(var_name, name, **kwargs)
+        data = self._encode_output(data)
+
+        if self._output_format == "zarr":
+            data.to_dataset(name=data.name if data.name is not None else
+                            "__xarray_dataarray_variable__").\
+                to_zarr(file_path, mode="w")
+        else:
+            # An unlimited time dimension lets later runs append cheaply
+            data.to_netcdf(
+                file_path,
+                unlimited_dims=["time"] if "time" in data.dims else None)
+        DataCatalog.default(file_path).record(
+            file_path,
+            dates=data.time.values if "time" in data.dims else [],
+            producer=self.identifier,
+            variable=var_name)
+        self._add_processed_file(var_name, file_path)
+        return file_path
+
+    def append_processed_file(self, var_name: str, name: str, data: object,
+                              overwrite: bool = False, **kwargs) -> str:
+        """Append processed data to an existing netCDF file or Zarr store.
 
+        Only time steps not already present in the file are written, unless
+        overwriting. If the file doesn't exist yet this is equivalent to
+        `save_processed_file`.
+
+        Args:
+            var_name: The name of the variable.
+            name: The name of the file.
+            data: The data to be appended, with a time dimension.
+            overwrite (optional): Replace time steps already in the file.
+                Defaults to False.
+            **kwargs: Additional keyword arguments to be passed to the
+                `get_data_var_folder` method.
+
+        Returns:
+            The path of the processed file.
+        """
+        file_path = self.get_processed_path(var_name, name, **kwargs)
+
+        if not os.path.exists(file_path):
+            return self.save_processed_file(var_name, name, data, **kwargs)
+
+        data = self._encode_output(data)
+
+        if self._output_format == "zarr":
+            written = append_zarr_time(file_path, data, overwrite=overwrite)
+        else:
+            written = append_netcdf_time(file_path, data, overwrite=overwrite)
+        logging.info("Appended {} time steps to {}".format(written, file_path))
+        self._add_processed_file(var_name, file_path)
+        return file_path
+
+    def _encode_output(self, data: object) -> object:
+        """Set the chunking and compression encoding for a processed output.
+
+        Args:
+            data: The DataArray to be written.
+
+        Returns:
+            A shallow copy of the DataArray with its encoding set.
+        """
+        return encode_output(data, self._output_format, self._compression)
+
+    def _add_processed_file(self, var_name: str, file_path: str):
+        """Record a processed file against its variable.
+
+        Args:
+            var_name: The name of the variable.
+            file_path: The path of the processed file.
+        """
         if var_name not in self._processed_files.keys():
             self._processed_files[var_name] = list()
 
@@ -385,7 +704,6 @@ class Processor(DataProducer):
         else:
             logging.warning("{} already exists in {} processed list".format(
                 file_path, var_name))
-        return file_path
 
     @property
     def dates(self) -> object:
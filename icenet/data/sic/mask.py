@@ -2,6 +2,7 @@ import datetime as dt
 import logging
 import os
 import shutil
+import threading
 
 import numpy as np
 import pandas as pd
@@ -15,6 +16,11 @@ from icenet.data.sic.utils import SIC_HEMI_STR
 
 """
 
+# Masks are fixed once generated, so are loaded once per process and shared
+# between Masks instances, keyed by path
+_MASK_STORE = dict()
+_MASK_STORE_LOCK = threading.Lock()
+
 
 class Masks(Generator):
     """Masking of regions to include/omit in dataset.
@@ -58,7 +64,9 @@ class Masks(Generator):
         self.latitudes = latitudes
         self._region = (slice(None, None), slice(None, None))
         self._region_geo_mask = None
+        self._region_masks = dict()
 
+        self._masks_folder = self.get_data_var_folder("masks")
         self.init_params()
 
     def init_params(self):
@@ -204,6 +212,86 @@ class Masks(Generator):
                 logging.info("Saving polarhole {}".format(polarhole_path))
                 np.save(polarhole_path, polarhole)
 
+        self.clear_mask_store()
+
+    def clear_mask_store(self):
+        """Drops this instance's masks from the process-wide mask store.
+
+        Subsequent calls will reload the masks from disk.
+        """
+        with _MASK_STORE_LOCK:
+            for key in [
+                    k for k in _MASK_STORE.keys()
+                    if os.path.dirname(k) == self._masks_folder
+            ]:
+                del _MASK_STORE[key]
+        self._region_masks = dict()
+
+    def _load_mask(self, filename: str) -> object:
+        """Loads a mask via the process-wide mask store.
+
+        Args:
+            filename: Mask filename within the masks folder.
+
+        Returns:
+            A read-only numpy array, or None if the mask has not been
+                generated.
+        """
+        mask_path = os.path.join(self._masks_folder, filename)
+
+        with _MASK_STORE_LOCK:
+            if mask_path not in _MASK_STORE:
+                if not os.path.exists(mask_path):
+                    return None
+
+                logging.debug("Loading mask {}".format(mask_path))
+                data = np.load(mask_path)
+                data.flags.writeable = False
+                _MASK_STORE[mask_path] = data
+            return _MASK_STORE[mask_path]
+
+    def _get_region_mask(self, name: str, data: object) -> object:
+        """Applies the current region to a stored mask, caching the result
+        until the region changes.
+
+        Args:
+            name: Cache key for the mask.
+            data: Stored mask, to which the region is applied.
+
+        Returns:
+            The mask for the pre-defined `self._region`.
+        """
+        if name not in self._region_masks:
+            self._region_masks[name] = self.get_region_data(data)
+        return self._region_masks[name]
+
+    def _get_active_cell_stack(self) -> object:
+        """Gets the active grid cell masks for all twelve months.
+
+        Returns:
+            Array of masks for the pre-defined `self._region`, stacked with
+                January first.
+
+        Raises:
+            RuntimeError: If the active grid cell masks do not exist.
+        """
+        if "active_grid_cell" not in self._region_masks:
+            masks = [
+                self._load_mask(
+                    "active_grid_cell_mask_{:02d}.npy".format(month))
+                for month in range(1, 13)
+            ]
+
+            if any([mask is None for mask in masks]):
+                raise RuntimeError("Active cell masks have not been "
+                                   "generated, this is not done automatically "
+                                   "so you might want to address this!")
+
+            stack = np.stack([self.get_region_data(mask) for mask in masks])
+            stack.flags.writeable = False
+            self._region_masks["active_grid_cell"] = stack
+        return self._region_masks["active_grid_cell"]
+
     def get_region_data(self, data):
         """
         Get either a lat/lon region or a pixel bounded region via slicing.
@@ -248,18 +336,7 @@ class Masks(Generator):
         Raises:
             RuntimeError: If the mask file for the input month does not exist.
         """
-        mask_path = os.path.join(
-            self.get_data_var_folder("masks"),
-            "active_grid_cell_mask_{:02d}.npy".format(month))
-
-        if not os.path.exists(mask_path):
-            raise RuntimeError("Active cell masks have not been generated, "
-                               "this is not done automatically so you might "
-                               "want to address this!")
-        # logging.debug("Loading active cell mask {}".format(mask_path))
-        data = np.load(mask_path)
-
-        return self.get_region_data(data)
+        return self._get_active_cell_stack()[month - 1]
 
 
     def get_active_cell_da(self, src_da: object) -> object:
@@ -274,10 +351,10 @@ class Masks(Generator):
             An xarray.DataArray containing active cell masks for each time
                 in source DataArray.
         """
-        active_cell_mask = [
-                self.get_active_cell_mask(pd.to_datetime(date).month)
-                for date in src_da.time.values
-            ]
+        months = pd.DatetimeIndex(src_da.time.values).month.values
+        active_cell_mask = np.take(self._get_active_cell_stack(),
+                                   months - 1,
+                                   axis=0)
 
         active_cell_mask_da = xr.DataArray(
             active_cell_mask,
@@ -303,17 +380,13 @@ class Masks(Generator):
             An numpy array of land mask flag(s) for corresponding month and
                 pre-defined `self._region`.
         """
-        mask_path = os.path.join(self.get_data_var_folder("masks"),
-                                 land_mask_filename)
+        data = self._load_mask(land_mask_filename)
 
-        if not os.path.exists(mask_path):
+        if data is None:
             raise RuntimeError("Land mask has not been generated, this is "
                                "not done automatically so you might want to "
                                "address this!")
-
-        # logging.debug("Loading land mask {}".format(mask_path))
-        data = np.load(mask_path)
-        return self.get_region_data(data)
+        return self._get_region_mask(land_mask_filename, data)
 
     def get_polarhole_mask(self, date: object) -> object:
         """Get mask of polar hole region.
@@ -327,14 +400,67 @@ class Masks(Generator):
 
         for i, r in enumerate(self._polarhole_radii):
             if date <= self._polarhole_dates[i]:
-                polarhole_path = os.path.join(
-                    self.get_data_var_folder("masks"),
-                    "polarhole{}_mask.npy".format(i + 1))
-                # logging.debug("Loading polarhole {}".format(polarhole_path))
-                data = np.load(polarhole_path)
-                return self.get_region_data(data)
+                polarhole_filename = "polarhole{}_mask.npy".format(i + 1)
+                data = self._load_mask(polarhole_filename)
+
+                if data is None:
+                    raise RuntimeError("Polar hole mask {} has not been "
+                                       "generated".format(polarhole_filename))
+                return self._get_region_mask(polarhole_filename, data)
         return None
 
+    def get_polarhole_index(self, dates: object) -> object:
+        """Get the polar hole mask applicable to each of a set of dates.
+
+        Equivalent to calling `get_polarhole_mask` for each date, but
+        vectorised over a whole time coordinate.
+
+        Args:
+            dates: Array-like of dates, e.g. a time coordinate.
+
+        Returns:
+            A numpy array of indexes into `get_polarhole_stack` for each date,
+                -1 where there is no polar hole.
+        """
+        times = pd.DatetimeIndex(pd.to_datetime(np.asarray(dates))).normalize()
+        index = np.full(len(times), -1, dtype=int)
+
+        if self.south:
+            return index
+
+        # The first polar hole date the date falls before applies
+        for i in reversed(range(len(self._polarhole_radii))):
+            index[times <= pd.Timestamp(self._polarhole_dates[i])] = i
+        return index
+
+    def get_polarhole_stack(self) -> object:
+        """Get all polar hole masks.
+
+        Returns:
+            Array of polar hole masks for the pre-defined `self._region`,
+                stacked in the order of the polar hole dates, or None for
+                the southern hemisphere.
+
+        Raises:
+            RuntimeError: If the polar hole masks do not exist.
+        """
+        if self.south:
+            return None
+
+        if "polarholes" not in self._region_masks:
+            masks = [
+                self._load_mask("polarhole{}_mask.npy".format(i + 1))
+                for i in range(len(self._polarhole_radii))
+            ]
+
+            if any([mask is None for mask in masks]):
+                raise RuntimeError("Polar hole masks have not been generated")
+
+            stack = np.stack([self.get_region_data(mask) for mask in masks])
+            stack.flags.writeable = False
+            self._region_masks["polarholes"] = stack
+        return self._region_masks["polarholes"]
+
     def get_blank_mask(self) -> object:
         """Returns an empty mask.
 
@@ -366,6 +492,7 @@ class Masks(Generator):
         self.longitudes = lon
         self.latitudes = lat
         self.region_geographic = region
+        self._region_masks = dict()
 
         lon_min, lat_min, lon_max, lat_max = region
 
@@ -397,6 +524,7 @@ class Masks(Generator):
         """
         logging.info("Mask region set to: {}".format(item))
         self._region = item
+        self._region_masks = dict()
         return self
 
     def reset_region(self):
@@ -404,6 +532,7 @@ class Masks(Generator):
         logging.info("Mask region reset, whole mask will be returned")
         self._region = (slice(None, None), slice(None, None))
         self._region_geo_mask = None
+        self._region_masks = dict()
 
 
 def main():
@@ -1,22 +1,33 @@
+import calendar
+import concurrent.futures
+import contextlib
 import copy
 import csv
 import fnmatch
 import ftplib
+import json
 import logging
 import os
+import queue
+import random
+import threading
+import time
 
 import datetime as dt
 from ftplib import FTP
 
 import dask
+import dask.array
 from distributed import Client, LocalCluster
 import numpy as np
 import pandas as pd
 import xarray as xr
 
+from icenet.data.catalog import DataCatalog
 from icenet.data.cli import download_args
 from icenet.data.producers import Downloader
 from icenet.data.sic.mask import Masks
+from icenet.data.utils import append_netcdf_time
 from icenet.utils import Hemisphere, run_command
 from icenet.data.sic.utils import SIC_HEMI_STR
 """
@@ -275,6 +286,9 @@ invalid_sic_days = {
     ]
 }
 
+OSI430B_START = dt.date(2016, 1, 1)
+OSI430A_START = dt.date(2021, 1, 1)
+
 var_remove_list = [
     'time_bnds', 'raw_ice_conc_values', 'total_standard_error',
     'smearing_standard_error', 'algorithm_standard_error', 'status_flag',
@@ -282,6 +296,260 @@ var_remove_list = [
 ]
 
 
+class FTPConnectionPool:
+    """A bounded pool of logged in FTP connections shared between threads
+
+    Connections are opened lazily, up to `size` of them, and reused once
+    returned. A connection that raised whilst in use is discarded rather
+    than returned, as its state is unknown.
+
+    :param host:
+    :param size: maximum number of concurrent connections
+    :param timeout: socket timeout for each connection, in seconds
+    :param port:
+    """
+
+    def __init__(self,
+                 host: str,
+                 size: int = 4,
+                 timeout: int = 60,
+                 port: int = 21):
+        self._host = host
+        self._idle = queue.LifoQueue()
+        self._port = port
+        self._slots = threading.BoundedSemaphore(size)
+        self._timeout = timeout
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a connection, blocking until one is available
+
+        :return: context manager yielding a logged in ftplib.FTP
+        """
+        self._slots.acquire()
+        ftp = None
+
+        try:
+            try:
+                ftp = self._idle.get_nowait()
+            except queue.Empty:
+                logging.debug("FTP opening {}".format(self._host))
+                ftp = FTP(timeout=self._timeout)
+                ftp.connect(self._host, self._port)
+                ftp.login()
+
+            yield ftp
+            self._idle.put(ftp)
+        except BaseException:
+            if ftp is not None:
+                ftp.close()
+            raise
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                ftp = self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                ftp.quit()
+            except (ftplib.Error, OSError, EOFError):
+                ftp.close()
+
+
+class FTPListingCache:
+    """Persisted cache of FTP directory listings
+
+    Directories for months that ended more than `settle_days` ago are no
+    longer being populated, so their listings are kept indefinitely. Other
+    listings, for the current month or one that has only just ended and may
+    still receive late files, expire after `ttl` seconds.
+
+    :param path: JSON file to persist the listings to
+    :param ttl: lifetime of listings for unsettled months, in seconds
+    :param settle_days: days after the end of a month for which late files
+        may still appear
+    """
+
+    def __init__(self, path: str, ttl: int = 3600, settle_days: int = 7):
+        self._changed = False
+        self._listings = dict()
+        self._lock = threading.Lock()
+        self._path = path
+        self._settle_days = settle_days
+        self._ttl = ttl
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as fh:
+                    self._listings = json.load(fh)
+            except ValueError:
+                logging.warning("Ignoring corrupt listing cache {}".format(
+                    path))
+
+    def get(self, directory: str) -> object:
+        """
+
+        :param directory:
+        :return: list of filenames or None if not cached
+        """
+        with self._lock:
+            listing = self._listings.get(directory)
+
+        # Listings cached before settling was introduced lack the flag, and
+        # may have been kept for months that were still receiving files
+        if listing is None or \
+                (not listing.get("settled", False) and
+                 time.time() - listing["time"] > self._ttl):
+            return None
+        return listing["files"]
+
+    def set(self, directory: str, month: object, files: list):
+        """
+
+        :param directory:
+        :param month: date within the month the directory holds
+        :param files:
+        """
+        month_end = dt.date(month.year, month.month,
+                            calendar.monthrange(month.year, month.month)[1])
+        settled = dt.date.today() > \
+            month_end + dt.timedelta(days=self._settle_days)
+
+        with self._lock:
+            self._listings[directory] = dict(files=list(files),
+                                             settled=settled,
+                                             time=time.time())
+            self._changed = True
+
+    def save(self):
+        """Write the listings out, if they've changed"""
+        with self._lock:
+            if not self._changed:
+                return
+
+            tmp_path = "{}.tmp".format(self._path)
+
+            with open(tmp_path, "w") as fh:
+                json.dump(self._listings, fh)
+            os.replace(tmp_path, self._path)
+            self._changed = False
+
+
+def fetch_ftp_file(pool: object,
+                   listing_cache: object,
+                   directory: str,
+                   month: object,
+                   pattern: str,
+                   destination: str,
+                   retries: int = 3,
+                   backoff: float = 2.) -> str:
+    """Download the single file matching a pattern, retrying transient failures
+
+    The directory listing is taken from the cache where possible. If no file
+    matches a cached listing, the directory is listed again once before the
+    file is considered unavailable, so late additions are picked up.
+
+    Data is written to a .part file first so that a retry, or a later run,
+    resumes from where the previous attempt stopped.
+
+    :param pool: FTPConnectionPool to borrow connections from
+    :param listing_cache: FTPListingCache for the directory listings
+    :param directory: remote directory, with a trailing slash
+    :param month: date within the month the directory holds
+    :param pattern: fnmatch pattern for the filename
+    :param destination: local path to download to
+    :param retries: number of retries after the first attempt
+    :param backoff: base delay in seconds between retries, doubling on each
+    :return: one of "downloaded", "unavailable", "zero" or "failed"
+    """
+    part_path = "{}.part".format(destination)
+
+    for attempt in range(retries + 1):
+        try:
+            with pool.connection() as ftp:
+                listing = listing_cache.get(directory)
+                cached = listing is not None
+
+                while True:
+                    if listing is None:
+                        ftp.cwd(directory)
+                        listing = ftp.nlst()
+                        listing_cache.set(directory, month, listing)
+
+                    ftp_files = [
+                        fname for fname in listing
+                        if fnmatch.fnmatch(fname, pattern)
+                    ]
+
+                    if not len(ftp_files) and cached:
+                        logging.debug("{} not in cached listing of {}, "
+                                      "listing again".format(
+                                          pattern, directory))
+                        listing, cached = None, False
+                        continue
+                    break
+
+                if len(ftp_files) > 1:
+                    raise ValueError(
+                        "More than a single file found: {}".format(ftp_files))
+                elif not len(ftp_files):
+                    logging.warning(
+                        "File is not available: {}".format(pattern))
+                    return "unavailable"
+
+                remote_path = "{}{}".format(directory, ftp_files[0])
+
+                # SIZE isn't reliably supported in ASCII mode
+                ftp.voidcmd("TYPE I")
+                file_size = ftp.size(remote_path)
+
+                # Check if remote file size is too small, if so, render
+                # date invalid
+                if file_size < 100:
+                    return "zero"
+
+                offset = os.path.getsize(part_path) \
+                    if os.path.exists(part_path) else 0
+
+                if offset > file_size:
+                    offset = 0
+                elif offset:
+                    logging.info("Resuming {} from {} bytes".format(
+                        remote_path, offset))
+
+                with open(part_path, "ab" if offset else "wb") as fh:
+                    ftp.retrbinary("RETR {}".format(remote_path),
+                                   fh.write,
+                                   rest=offset if offset else None)
+
+                if os.path.getsize(part_path) != file_size:
+                    raise EOFError("Incomplete download of {}".format(
+                        remote_path))
+
+            os.replace(part_path, destination)
+            return "downloaded"
+        except ftplib.error_perm:
+            logging.warning("FTP error, possibly missing directory "
+                            "{}".format(directory))
+            return "unavailable"
+        except (ftplib.error_temp, ftplib.error_reply, EOFError,
+                OSError) as e:
+            if attempt == retries:
+                logging.error("Failed to download {} after {} attempts: "
+                              "{}".format(pattern, attempt + 1, e))
+                return "failed"
+
+            delay = backoff * 2 ** attempt * (1 + random.random())
+            logging.warning("FTP error for {}, retrying in {:.1f}s: "
+                            "{}".format(pattern, delay, e))
+            time.sleep(delay)
+
+
 # This is adapted from the data/loaders implementations
 class DaskWrapper:
     """
@@ -349,6 +617,14 @@ class SICDownloader(Downloader):
     :param delete_tempfiles:
     :param download:
     :param dtype:
+    :param ftp_backoff: base delay in seconds between FTP retries, doubling
+        on each attempt
+    :param ftp_connections: number of concurrent FTP connections
+    :param ftp_retries: number of retries for each file
+    :param listing_settle_days: days after a month ends for which its FTP
+        listing is still refreshed, as late files may appear
+    :param listing_ttl: seconds to cache unsettled FTP listings for
+    :param parallel_opens:
     """
 
     def __init__(self,
@@ -359,6 +635,11 @@ class SICDownloader(Downloader):
                  delete_tempfiles: bool = True,
                  download: bool = True,
                  dtype: object = np.float32,
+                 ftp_backoff: float = 2.,
+                 ftp_connections: int = 4,
+                 ftp_retries: int = 3,
+                 listing_settle_days: int = 7,
+                 listing_ttl: int = 3600,
                  parallel_opens: bool = True,
                  **kwargs):
         super().__init__(*args, identifier="osisaf", **kwargs)
@@ -368,6 +649,11 @@ class SICDownloader(Downloader):
         self._delete = delete_tempfiles
         self._download = download
         self._dtype = dtype
+        self._ftp_backoff = ftp_backoff
+        self._ftp_connections = ftp_connections
+        self._ftp_retries = ftp_retries
+        self._listing_settle_days = listing_settle_days
+        self._listing_ttl = listing_ttl
         self._parallel_opens = parallel_opens
         self._invalid_dates = invalid_sic_days[self.hemisphere] + \
             list(additional_invalid_dates)
@@ -402,21 +688,19 @@ class SICDownloader(Downloader):
         """
         hs = SIC_HEMI_STR[self.hemisphere_str[0]]
         data_files = []
-        ftp = None
+        fetches = []
         var = "siconca"
 
         logging.info("Not downloading SIC files, (re)processing NC files in "
                      "existence already" if not self._download else
                      "Downloading SIC datafiles to .temp intermediates...")
 
-        cache = {}
-        osi430b_start = dt.date(2016, 1, 1)
-        osi430a_start = dt.date(2021, 1, 1)
-
         dt_arr = list(reversed(sorted(copy.copy(self._dates))))
 
-        # Filtering dates based on existing data
+        # Filtering dates based on existing data, as recorded in the
+        # catalog rather than opening every yearly file
         filter_years = sorted(set([d.year for d in dt_arr]))
+        catalog = DataCatalog.default(self.get_data_var_folder(var))
         extant_paths = [
             os.path.join(self.get_data_var_folder(var),
                          "{}.nc".format(filter_ds))
@@ -425,9 +709,9 @@ class SICDownloader(Downloader):
         extant_paths = [df for df in extant_paths if os.path.exists(df)]
 
         if len(extant_paths) > 0:
-            extant_ds = xr.open_mfdataset(extant_paths)
             exclude_dates = [
-                pd.to_datetime(date).date() for date in extant_ds.time.values
+                date.date() for path in extant_paths
+                for date in catalog.dates(path)
             ]
 
             # Do not exclude dates that previously had a file size of 0
@@ -439,9 +723,6 @@ class SICDownloader(Downloader):
             dt_arr = sorted(list(set(dt_arr).difference(exclude_dates)))
             dt_arr.reverse()
 
-            # We won't hold onto an active dataset during network I/O
-            extant_ds.close()
-
         # End filtering
 
         while len(dt_arr):
@@ -486,151 +767,173 @@ class SICDownloader(Downloader):
                         data_files.append(temp_path)
                     continue
 
-                if not ftp:
-                    logging.info("FTP opening")
-                    ftp = FTP('osisaf.met.no')
-                    ftp.login()
+                fetches.append((el, temp_path))
 
-                chdir_path = self._ftp_osi450 \
-                    if el < osi430b_start else self._ftp_osi430b \
-                    if el < osi430a_start else self._ftp_osi430a
+        if len(fetches):
+            data_files += self._fetch_files(fetches, hs)
+            # Daily files are named by date, so keep them in time order
+            data_files = sorted(data_files, key=os.path.basename)
 
-                chdir_path = chdir_path.format(el.year, el.month)
+        self._zero_dates = set(self._zero_dates)
+        self.zero_dates()
 
-                try:
-                    ftp.cwd(chdir_path)
+        logging.debug("Files being processed: {}".format(data_files))
 
-                    if chdir_path not in cache:
-                        cache[chdir_path] = ftp.nlst()
+        # Daily files are aggregated a year at a time to bound memory
+        year_files = dict()
 
-                    cache_match = "ice_conc_{}_ease*_{:04d}{:02d}{:02d}*.nc".\
-                        format(hs, el.year, el.month, el.day)
-                    ftp_files = [
-                        el for el in cache[chdir_path]
-                        if fnmatch.fnmatch(el, cache_match)
-                    ]
+        for data_file in data_files:
+            year = int(os.path.basename(data_file)[:4])
+            year_files.setdefault(year, []).append(data_file)
 
-                    if len(ftp_files) > 1:
-                        raise ValueError(
-                            "More than a single file found: {}".format(
-                                ftp_files))
-                    elif not len(ftp_files):
-                        logging.warning(
-                            "File is not available: {}".format(cache_match))
-                        continue
-                except ftplib.error_perm:
-                    logging.warning("FTP error, possibly missing month chdir "
-                                    "for {}".format(date_str))
-                    continue
+        for year, files in sorted(year_files.items()):
+            self._aggregate_year(year, files, hs)
 
-                # Check if remote file size is too small, if so, render date invalid
-                # and continue.
-                file_size = ftp.size(ftp_files[0])
+        self.missing_dates()
 
-                # Check remote file size in bytes
-                if file_size < 100:
-                    logging.warning(
-                        f"Date {el} is in invalid list, as file size too small")
-                    self._zero_dates.append(el)
-                    self._invalid_dates.append(el)
-                    continue
-                else:
-                    # Removing missing date file if it was created for a file with zero size before
-                    if el in self._zero_dates:
-                        self._zero_dates.remove(el)
-                        fpath = os.path.join(
-                            self.get_data_var_folder(
-                                "siconca",
-                                append=[str(pd.to_datetime(el).year)]),
-                            "missing.{}.nc".format(date_str))
-                        if os.path.exists(fpath):
-                            os.unlink(fpath)
-
-                    with open(temp_path, "wb") as fh:
-                        ftp.retrbinary("RETR {}".format(ftp_files[0]), fh.write)
-
-                logging.debug("Downloaded {}".format(temp_path))
-                data_files.append(temp_path)
+        if self._delete:
+            for fpath in data_files:
+                os.unlink(fpath)
 
-        self._zero_dates = set(self._zero_dates)
-        self.zero_dates()
+    def _aggregate_year(self, year: int, files: list, hs: str):
+        """Process a year's daily files into the year's file
 
-        if ftp:
-            ftp.quit()
+        Days not already in the year's file are appended to it, rather than
+        rewriting the whole year.
 
-        logging.debug("Files being processed: {}".format(data_files))
+        :param year:
+        :param files: daily files for the year
+        :param hs: hemisphere string
+        """
+        var = "siconca"
 
-        if len(data_files):
-            ds = xr.open_mfdataset(data_files,
-                                   combine="nested",
-                                   concat_dim="time",
-                                   data_vars=["ice_conc"],
-                                   drop_variables=var_remove_list,
-                                   engine="netcdf4",
-                                   chunks=dict(time=self._chunk_size,),
-                                   parallel=self._parallel_opens)
-
-            logging.debug("Processing out extraneous data")
-
-            ds = ds.drop_vars(var_remove_list, errors="ignore")
-            da = ds.resample(time="1D").mean().ice_conc
-
-            da = da.where(da < 9.9e+36, 0.)  # Missing values
-            da /= 100.  # Convert from SIC % to fraction
-
-            for coord in ['lat', 'lon']:
-                if coord not in da.coords:
-                    logging.warning("Adding {} vals to coords, as missing in "
-                                    "this the combined dataset".format(coord))
-                    da.coords[coord] = self._get_missing_coordinates(
-                        var, hs, coord)
-
-            # In experimenting, I don't think this is actually required
-            for month, mask in self._mask_dict.items():
-                da.loc[dict(
-                    time=(da['time.month'] == month))].values[:, ~mask] = 0.
-
-            for date in da.time.values:
-                day_da = da.sel(time=slice(date, date))
-
-                if np.sum(np.isnan(day_da.data)) > 0:
-                    logging.warning("NaNs detected, adding to invalid "
-                                    "list: {}".format(date))
-                    self._invalid_dates.append(pd.to_datetime(date))
-
-            var_folder = self.get_data_var_folder(var)
-            group_by = "time.year"
-
-            for year, year_da in da.groupby(group_by):
-                req_date = pd.to_datetime(year_da.time.values[0])
-
-                year_path = os.path.join(
-                    var_folder, "{}.nc".format(getattr(req_date, "year")))
-                old_year_path = os.path.join(
-                    var_folder, "old.{}.nc".format(getattr(req_date, "year")))
-
-                if os.path.exists(year_path):
-                    logging.info(
-                        "Existing file needs concatenating: {} -> {}".format(
-                            year_path, old_year_path))
-                    os.rename(year_path, old_year_path)
-                    old_da = xr.open_dataarray(old_year_path)
-                    year_da = year_da.drop_sel(time=old_da.time,
-                                               errors="ignore")
-                    year_da = xr.concat([old_da, year_da],
-                                        dim="time").sortby("time")
-                    old_da.close()
-                    os.unlink(old_year_path)
-
-                logging.info("Saving {}".format(year_path))
-                year_da.compute()
-                year_da.to_netcdf(year_path)
+        logging.debug("Processing {} files for {}".format(len(files), year))
+        ds = xr.open_mfdataset(files,
+                               combine="nested",
+                               concat_dim="time",
+                               data_vars=["ice_conc"],
+                               drop_variables=var_remove_list,
+                               engine="netcdf4",
+                               chunks=dict(time=self._chunk_size,),
+                               parallel=self._parallel_opens)
 
-        self.missing_dates()
+        logging.debug("Processing out extraneous data")
 
-        if self._delete:
-            for fpath in data_files:
-                os.unlink(fpath)
+        ds = ds.drop_vars(var_remove_list, errors="ignore")
+        da = ds.resample(time="1D").mean().ice_conc
+
+        da = da.where(da < 9.9e+36, 0.)  # Missing values
+        da /= 100.  # Convert from SIC % to fraction
+
+        for coord in ['lat', 'lon']:
+            if coord not in da.coords:
+                logging.warning("Adding {} vals to coords, as missing in "
+                                "this the combined dataset".format(coord))
+                da.coords[coord] = self._get_missing_coordinates(
+                    var, hs, coord)
+
+        nan_days = da.isnull().any(dim=[d for d in da.dims if d != "time"]).\
+            compute()
+
+        for date in da.time.values[nan_days.values]:
+            logging.warning("NaNs detected, adding to invalid "
+                            "list: {}".format(date))
+            self._invalid_dates.append(pd.to_datetime(date))
+
+        year_path = os.path.join(self.get_data_var_folder(var),
+                                 "{}.nc".format(year))
+
+        if os.path.exists(year_path):
+            # Days already in the year's file take precedence
+            logging.info("Appending to {}".format(year_path))
+            append_netcdf_time(year_path, da)
+        else:
+            logging.info("Saving {}".format(year_path))
+            da.to_netcdf(year_path, unlimited_dims=["time"])
+            DataCatalog.default(year_path).record(year_path)
+        ds.close()
+
+    def _fetch_files(self, fetches: list, hs: str) -> list:
+        """Download daily files concurrently over a pool of FTP connections
+
+        :param fetches: list of (date, temp_path) tuples to download
+        :param hs: hemisphere string for the filenames
+        :return: list of downloaded temp_paths, in date order
+        """
+        listing_cache = FTPListingCache(
+            os.path.join(self.get_data_var_folder("siconca"),
+                         "ftp_listing.json"),
+            ttl=self._listing_ttl,
+            settle_days=self._listing_settle_days)
+        pool = FTPConnectionPool("osisaf.met.no", size=self._ftp_connections)
+        downloaded = []
+
+        logging.info("Downloading {} files over {} FTP connections".format(
+            len(fetches), self._ftp_connections))
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._ftp_connections) as executor:
+                futures = [
+                    executor.submit(self._fetch_file, pool, listing_cache, el,
+                                    temp_path, hs)
+                    for el, temp_path in fetches
+                ]
+
+                for (el, temp_path), future in zip(fetches, futures):
+                    status = future.result()
+
+                    if status == "zero":
+                        logging.warning("Date {} is in invalid list, as file "
+                                        "size too small".format(el))
+                        self._zero_dates.append(el)
+                        self._invalid_dates.append(el)
+                    elif status == "downloaded":
+                        # Removing missing date file if it was created for a
+                        # file with zero size before
+                        if el in self._zero_dates:
+                            self._zero_dates.remove(el)
+                            fpath = os.path.join(
+                                self.get_data_var_folder(
+                                    "siconca", append=[str(el.year)]),
+                                "missing.{}.nc".format(
+                                    el.strftime("%Y_%m_%d")))
+                            if os.path.exists(fpath):
+                                os.unlink(fpath)
+
+                        logging.debug("Downloaded {}".format(temp_path))
+                        downloaded.append(temp_path)
+        finally:
+            listing_cache.save()
+            pool.close()
+
+        return downloaded
+
+    def _fetch_file(self, pool: object, listing_cache: object, el: object,
+                    temp_path: str, hs: str) -> str:
+        """Download a single daily file, see fetch_ftp_file
+
+        :param pool:
+        :param listing_cache:
+        :param el: date of the file
+        :param temp_path: destination path
+        :param hs: hemisphere string for the filename
+        :return: one of "downloaded", "unavailable", "zero" or "failed"
+        """
+        chdir_path = self._ftp_osi450 \
+            if el < OSI430B_START else self._ftp_osi430b \
+            if el < OSI430A_START else self._ftp_osi430a
+
+        return fetch_ftp_file(
+            pool,
+            listing_cache,
+            chdir_path.format(el.year, el.month),
+            el,
+            "ice_conc_{}_ease*_{:04d}{:02d}{:02d}*.nc".format(
+                hs, el.year, el.month, el.day),
+            temp_path,
+            retries=self._ftp_retries,
+            backoff=self._ftp_backoff)
 
     def zero_dates(self):
         """
@@ -680,7 +983,7 @@ class SICDownloader(Downloader):
             da = xr.concat([da, da_1979_01_01], dim='time')
             da = da.sortby('time')
 
-        dates_obs = [pd.to_datetime(date).date() for date in da.time.values]
+        dates_obs = set([pd.to_datetime(date).date() for date in da.time.values])
         dates_all = [
             pd.to_datetime(date).date()
             for date in pd.date_range(min(self._dates), max(self._dates))
@@ -688,7 +991,8 @@ class SICDownloader(Downloader):
 
         # Weirdly, we were getting future warnings for timestamps, but unsure
         # where from
-        invalid_dates = [pd.to_datetime(d).date() for d in self._invalid_dates]
+        invalid_dates = set(
+            [pd.to_datetime(d).date() for d in self._invalid_dates])
         missing_dates = [
             date for date in dates_all
             if date not in dates_obs or date in invalid_dates
@@ -705,19 +1009,31 @@ class SICDownloader(Downloader):
                     # FIXME: slightly unusual format for Ymd dates
                     fh.write(date.strftime("%Y,%m,%d\n"))
 
-            logging.debug("Interpolating {} missing dates".format(
-                len(missing_dates)))
+            # A single reindex and linear interpolation along time for all
+            # the absent dates, rather than interpolating them one by one
+            present = da.get_index("time")
+            absent = pd.DatetimeIndex(
+                [pd.Timestamp(date) for date in missing_dates]).\
+                difference(present)
 
-            for date in missing_dates:
-                if pd.Timestamp(date) not in da.time.values:
-                    logging.info("Interpolating {}".format(date))
-                    da = xr.concat([da, da.interp(time=pd.to_datetime(date))],
-                                   dim='time')
+            if len(absent):
+                logging.info("Interpolating {} missing dates".format(
+                    len(absent)))
+                da = da.reindex(time=present.union(absent))
 
-            logging.debug("Finished interpolation")
+                if da.chunks is not None:
+                    da = da.chunk(dict(time=-1, yc="auto", xc="auto"))
 
-            da = da.sortby('time')
-            da.data = np.array(da.data, dtype=self._dtype)
+                # Only the absent dates are filled, as before
+                da = da.where(da.time.isin(present),
+                              da.interpolate_na(dim="time", method="linear"))
+
+                logging.debug("Finished interpolation")
+
+            da = da.astype(self._dtype)
+
+            write_dates = []
+            write_paths = []
 
             for date in missing_dates:
                 date_str = pd.to_datetime(date).strftime("%Y_%m_%d")
@@ -727,13 +1043,31 @@ class SICDownloader(Downloader):
                     "missing.{}.nc".format(date_str))
 
                 if not os.path.exists(fpath):
-                    day_da = da.sel(time=slice(date, date))
-                    mask = self._mask_dict[pd.to_datetime(date).month]
-
-                    day_da.data[0][~mask] = 0.
-
-                    logging.info("Writing missing date file {}".format(fpath))
-                    day_da.to_netcdf(fpath)
+                    write_dates.append(pd.Timestamp(date))
+                    write_paths.append(fpath)
+
+            if len(write_dates):
+                # Inactive cells are zeroed for the written days, in the
+                # returned data too
+                month_masks = xr.DataArray(
+                    dask.array.from_array(
+                        np.stack([
+                            self._mask_dict[month] for month in range(1, 13)
+                        ])),
+                    dims=("month", "yc", "xc"),
+                    coords=dict(month=range(1, 13)))
+                active = month_masks.sel(month=da["time.month"]).\
+                    drop_vars("month")
+                da = da.where(~da.time.isin(write_dates) | active, 0.).\
+                    astype(self._dtype)
+                write_da = da.sel(time=write_dates)
+
+                logging.info("Writing {} missing date files".format(
+                    len(write_paths)))
+                xr.save_mfdataset([
+                    write_da.isel(time=[idx]).to_dataset()
+                    for idx in range(len(write_dates))
+                ], write_paths)
 
         return da
 
@@ -784,6 +1118,10 @@ def main():
                                       dict(action="store_true", default=False)),
                                      (("-c", "--sic-chunking-size"),
                                       dict(type=int, default=10)),
+                                     (("-fc", "--ftp-connections"),
+                                      dict(type=int, default=4)),
+                                     (("-ls", "--listing-settle-days"),
+                                      dict(type=int, default=7)),
                                      (("-dt", "--dask-timeouts"),
                                       dict(type=int, default=120)),
                                      (("-dp", "--dask-port"),
@@ -797,6 +1135,8 @@ def main():
             for date in pd.date_range(args.start_date, args.end_date, freq="D")
         ],
         delete_tempfiles=args.delete,
+        ftp_connections=args.ftp_connections,
+        listing_settle_days=args.listing_settle_days,
         north=args.hemisphere == "north",
         south=args.hemisphere == "south",
         parallel_opens=args.parallel_opens,
@@ -1,10 +1,19 @@
 import logging
+import os
 import requests
+import shutil
 
 import cartopy.crs as ccrs
 import cf_units
 import iris
+import netCDF4
 import numpy as np
+import pandas as pd
+import xarray as xr
+
+from scipy import sparse
+
+from icenet.data.catalog import DataCatalog
 
 
 def assign_lat_lon_coord_system(cube: object):
@@ -67,6 +76,26 @@ def rotate_grid_vectors(u_cube: object, v_cube: object, angles: object):
     return u_r_all.merge_cube(), v_r_all.merge_cube()
 
 
+def rotate_vector_arrays(u: object, v: object, angles: object):
+    """Rotates vector component arrays by grid cell angles
+
+    NumPy equivalent of :func:`~iris.analysis.cartography.rotate_grid_vectors`
+    applied to whole arrays, with the spatial angles broadcast over any
+    leading (e.g. time) dimensions rather than iterating over slices.
+
+    :param u: x components, with spatial dims trailing
+    :param v: y components, with spatial dims trailing
+    :param angles: rotation angles in radians, matching the spatial dims
+    :return: the rotated, masked, u and v components
+    """
+    cos, sin = np.cos(angles), np.sin(angles)
+    u_data, v_data = np.ma.getdata(u), np.ma.getdata(v)
+
+    mask = np.isnan(angles) | np.ma.getmaskarray(u) | np.ma.getmaskarray(v)
+    return np.ma.masked_array(u_data * cos - v_data * sin, mask=mask), \
+        np.ma.masked_array(u_data * sin + v_data * cos, mask=mask)
+
+
 def gridcell_angles_from_dim_coords(cube: object):
     """
     Author: Tony Phillips (BAS)
@@ -154,6 +183,74 @@ def invert_gridcell_angles(angles: object):
         angles.rename(names[1 - names.index(name)])
 
 
+def _linear_axis_weights(coords: object, points: object,
+                         modulus: float = None):
+    """Bracketing indices and fractional offsets of points along an axis
+
+    Points outside the coordinate range are bracketed by the edge cells,
+    yielding fractions outside [0, 1] and so linear extrapolation.
+
+    :param coords: 1D source coordinate points, in any order
+    :param points: target points along the same axis
+    :param modulus: coordinate period (e.g. 360 for longitude), if any
+    :return: lower indices, upper indices and fractions
+    """
+    order = np.argsort(coords)
+    ordered = coords[order]
+    points = np.asarray(points, dtype=np.float64)
+
+    if modulus:
+        points = ordered[0] + np.mod(points - ordered[0], modulus)
+        step = np.median(np.diff(ordered)) if len(ordered) > 1 else 0.
+
+        # Wrap around when the coordinate covers the whole period
+        if np.isclose(ordered[-1] - ordered[0] + step, modulus):
+            ordered = np.append(ordered, ordered[0] + modulus)
+            order = np.append(order, order[0])
+
+    idx = np.clip(np.searchsorted(ordered, points, side="right") - 1,
+                  0, len(ordered) - 2)
+    lower, upper = ordered[idx], ordered[idx + 1]
+
+    return order[idx], order[idx + 1], (points - lower) / (upper - lower)
+
+
+def linear_regrid_weights(src_x: object,
+                          src_y: object,
+                          tgt_x: object,
+                          tgt_y: object,
+                          x_modulus: float = None) -> object:
+    """Sparse bilinear interpolation weights between rectilinear grids
+
+    Builds the matrix equivalent of iris.analysis.Linear, for target points
+    already expressed in the coordinate system of the source grid. Source
+    fields flattened in (y, x) order are regridded by a single product with
+    the returned matrix.
+
+    :param src_x: 1D source x (longitude) coordinate points
+    :param src_y: 1D source y (latitude) coordinate points
+    :param tgt_x: target point x coordinates, in source coordinates
+    :param tgt_y: target point y coordinates, in source coordinates
+    :param x_modulus: period of the x coordinate, if circular
+    :return: CSR matrix of shape (number of targets, len(src_y) * len(src_x))
+    """
+    tgt_x = np.ravel(tgt_x)
+    tgt_y = np.ravel(tgt_y)
+    nx = len(src_x)
+
+    x0, x1, fx = _linear_axis_weights(np.asarray(src_x), tgt_x, x_modulus)
+    y0, y1, fy = _linear_axis_weights(np.asarray(src_y), tgt_y)
+
+    rows = np.tile(np.arange(len(tgt_x)), 4)
+    cols = np.concatenate([y0 * nx + x0, y0 * nx + x1,
+                           y1 * nx + x0, y1 * nx + x1])
+    weights = np.concatenate([(1 - fx) * (1 - fy), fx * (1 - fy),
+                              (1 - fx) * fy, fx * fy])
+
+    return sparse.csr_matrix((weights, (rows, cols)),
+                             shape=(len(tgt_x), len(src_y) * nx))
+
+
 def esgf_search(server: str = "https://esgf-node.llnl.gov/esg-search/search",
                 files_type: str = "OPENDAP",
                 local_node: bool = False,
@@ -226,3 +323,203 @@ def esgf_search(server: str = "https://esgf-node.llnl.gov/esg-search/search",
                 if sp[-1] == files_type:
                     all_files.append(sp[0].split(".html")[0])
     return sorted(all_files)
+
+
+def append_netcdf_time(path: str, da: object, overwrite: bool = False) -> int:
+    """Append a DataArray along the time dimension of an existing netCDF file
+
+    Time steps later than those already in the file are written in place
+    when time is an unlimited dimension, so the cost is that of the new data
+    alone. Anything else (earlier time steps, a fixed time dimension or other
+    time dependent variables we can't extend) falls back to rewriting the
+    file once, sorted by time and with an unlimited time dimension, so that
+    subsequent appends are cheap.
+
+    :param path: the existing netCDF file
+    :param da: the data, named as the variable in the file
+    :param overwrite: replace existing time steps with those from da
+    :return: the number of time steps written
+    """
+    written = _append_netcdf_time(path, da, overwrite)
+    DataCatalog.default(path).record(path)
+    return written
+
+
+def _append_netcdf_time(path: str, da: object, overwrite: bool) -> int:
+    da = da.sortby("time")
+    new_times = pd.DatetimeIndex(da.time.values)
+
+    with netCDF4.Dataset(path, "a") as nc:
+        if da.name not in nc.variables:
+            raise ValueError("{} is not a variable in {}".format(da.name, path))
+
+        time_var = nc.variables["time"]
+        calendar = getattr(time_var, "calendar", "standard")
+        existing = pd.DatetimeIndex(
+            netCDF4.num2date(time_var[:],
+                             time_var.units,
+                             calendar=calendar,
+                             only_use_cftime_datetimes=False,
+                             only_use_python_datetimes=True)
+        ) if len(time_var) else pd.DatetimeIndex([])
+
+        var = nc.variables[da.name]
+        time_axis = var.dimensions.index("time")
+
+        def _write(data_da, indexer):
+            values = data_da.transpose(*var.dimensions).values
+
+            if np.issubdtype(values.dtype, np.floating):
+                values = np.ma.masked_invalid(values)
+
+            key = [slice(None)] * len(var.dimensions)
+            key[time_axis] = indexer
+            var[tuple(key)] = values
+
+        duplicated = new_times.isin(existing)
+        written = 0
+
+        if overwrite and duplicated.any():
+            # In place updates are fine regardless of the time dimension
+            for idx in np.flatnonzero(duplicated):
+                _write(da.isel(time=slice(idx, idx + 1)),
+                       slice(existing.get_loc(new_times[idx]),
+                             existing.get_loc(new_times[idx]) + 1))
+                written += 1
+
+        da = da.isel(time=np.flatnonzero(~duplicated))
+        new_times = new_times[~duplicated]
+
+        if not len(new_times):
+            return written
+
+        other_time_vars = [
+            name for name, v in nc.variables.items()
+            if "time" in v.dimensions and name not in ("time", da.name) and
+            name not in da.coords
+        ]
+
+        if other_time_vars:
+            # e.g. time_bnds, which we've nothing to extend with
+            logging.warning("No values for {} in the time steps added to {}, "
+                            "these will be missing".format(
+                                ", ".join(other_time_vars), path))
+
+        appendable = nc.dimensions["time"].isunlimited() and \
+            (not len(existing) or new_times[0] > existing[-1])
+
+        if appendable:
+            start = len(time_var)
+            time_var[start:start + len(new_times)] = netCDF4.date2num(
+                new_times.to_pydatetime(), time_var.units, calendar=calendar)
+
+            for name in da.coords:
+                if name != "time" and name in nc.variables and \
+                        "time" in da[name].dims:
+                    nc.variables[name][start:start + len(new_times)] = \
+                        da[name].values
+            _write(da, slice(start, start + len(new_times)))
+
+            logging.debug("Appended {} time steps to {}".format(
+                len(new_times), path))
+            return written + len(new_times)
+
+    logging.info("Unable to append in place to {}, rewriting".format(path))
+
+    with xr.open_dataset(path) as ds:
+        old_ds = ds.load()
+
+    # Other time dependent variables are carried through, missing for the
+    # new time steps
+    new_ds = xr.concat([old_ds, da.to_dataset()],
+                       dim="time",
+                       data_vars="minimal",
+                       coords="minimal",
+                       compat="override").sortby("time")
+
+    for v in new_ds.variables.values():
+        # Unlimited dimensions require chunked storage
+        v.encoding.pop("contiguous", None)
+
+    tmp_path = "{}.tmp".format(path)
+    new_ds.to_netcdf(tmp_path, unlimited_dims=["time"])
+    os.replace(tmp_path, path)
+    return written + len(new_times)
+
+
+def append_zarr_time(path: str, da: object, overwrite: bool = False) -> int:
+    """Append a DataArray along the time dimension of an existing Zarr store
+
+    Equivalent to :func:`append_netcdf_time` for Zarr stores: time steps later
+    than those in the store are appended, anything else rewrites the store.
+
+    :param path: the existing Zarr store
+    :param da: the data, named as the variable in the store
+    :param overwrite: replace existing time steps with those from da
+    :return: the number of time steps written
+    """
+    written = _append_zarr_time(path, da, overwrite)
+    DataCatalog.default(path).record(path)
+    return written
+
+
+def _append_zarr_time(path: str, da: object, overwrite: bool) -> int:
+    da = da.sortby("time")
+
+    with xr.open_zarr(path) as ds:
+        existing = pd.DatetimeIndex(ds.time.values)
+
+    duplicated = pd.DatetimeIndex(da.time.values).isin(existing)
+    written = 0
+
+    if overwrite and duplicated.any():
+        # Existing time steps are replaced in place, a run at a time
+        dup_da = da.isel(time=np.flatnonzero(duplicated))
+        dup_da = dup_da.drop_vars([
+            name for name in dup_da.coords if "time" not in dup_da[name].dims
+        ])
+        dup_da.encoding = dict()
+        locs = existing.get_indexer(dup_da.time.values)
+
+        for run in np.split(np.arange(len(locs)),
+                            np.flatnonzero(np.diff(locs) != 1) + 1):
+            dup_da.isel(time=run).to_dataset().to_zarr(
+                path,
+                region=dict(time=slice(locs[run[0]], locs[run[-1]] + 1)))
+        written = len(locs)
+
+    da = da.isel(time=np.flatnonzero(~duplicated))
+
+    if not len(da.time):
+        return written
+
+    if not len(existing) or da.time.values[0] > existing.values[-1]:
+        da.to_dataset().to_zarr(path, append_dim="time")
+        logging.debug("Appended {} time steps to {}".format(
+            len(da.time), path))
+        return written + len(da.time)
+
+    logging.info("Unable to append in place to {}, rewriting".format(path))
+
+    with xr.open_zarr(path) as ds:
+        old_ds = ds.load()
+
+    new_ds = xr.concat([old_ds, da.to_dataset()],
+                       dim="time",
+                       data_vars="minimal",
+                       coords="minimal",
+                       compat="override").sortby("time")
+
+    # Written aside and swapped in, keeping the old store until the new one
+    # is in place
+    tmp_path = "{}.tmp".format(path)
+    old_path = "{}.old".format(path)
+    new_ds.to_zarr(tmp_path, mode="w")
+
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+    os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path)
+    return written + len(da.time)
@@ -12,6 +12,7 @@ import icenet.model.models as models
 
 from icenet.data.loader import save_sample
 from icenet.data.dataset import IceNetDataSet
+from icenet.data.process import expand_dates
 from icenet.utils import setup_logging
 """
 
@@ -96,12 +97,9 @@ def predict_forecast(
         _, _, test_inputs = ds.get_split_datasets()
 
         source_key = [k for k in dl.config['sources'].keys() if k != "meta"][0]
-        # FIXME: should be using date format from class
-        test_dates = [
-            dt.date(*[int(v)
-                      for v in d.split("_")])
-            for d in dl.config["sources"][source_key]["dates"]["test"]
-        ]
+        test_dates = list(
+            expand_dates(dl.config["sources"][source_key]["dates"]["test"]).
+            astype(object))
 
         if len(test_dates) == 0:
             raise RuntimeError("No processed files were produced for the test "
@@ -0,0 +1,34 @@
+"""Fixtures shared by the icenet tests."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+
+@pytest.fixture(autouse=True)
+def data_catalog(tmp_path, monkeypatch):
+    """Keeps each test's data catalog in its own temporary directory"""
+    monkeypatch.setenv("ICENET_CATALOG", str(tmp_path / "catalog.db"))
+
+
+@pytest.fixture
+def random_da():
+    """Factory of reproducible random DataArrays with a leading time dim"""
+
+    def _random_da(periods: int,
+                   shape: tuple = (4, 5),
+                   dims: tuple = ("yc", "xc"),
+                   start: str = "2000-01-01",
+                   freq: str = "D",
+                   name: str = "siconca") -> object:
+        rng = np.random.default_rng(42)
+        coords = {dim: np.arange(size) for dim, size in zip(dims, shape)}
+        coords["time"] = pd.date_range(start, periods=periods, freq=freq)
+        return xr.DataArray(rng.random((periods,) + tuple(shape),
+                                       dtype=np.float32),
+                            dims=("time",) + tuple(dims),
+                            coords=coords,
+                            name=name)
+
+    return _random_da
@@ -0,0 +1,102 @@
+"""Tests for the location, journaling and failure handling of the catalog."""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+catalog = pytest.importorskip("icenet.data.catalog")
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    folder = tmp_path / "data" / "osisaf" / "north" / "siconca"
+    folder.mkdir(parents=True)
+    path = str(folder / "2020.nc")
+    xr.DataArray(np.zeros((2, 2, 2), dtype=np.float32),
+                 dims=("time", "yc", "xc"),
+                 coords=dict(time=pd.date_range("2020-01-01", periods=2)),
+                 name="siconca").to_netcdf(path)
+    return path
+
+
+@pytest.fixture
+def no_catalog_env(monkeypatch):
+    monkeypatch.delenv(catalog.CATALOG_ENV, raising=False)
+    monkeypatch.delenv(catalog.CATALOG_JOURNAL_ENV, raising=False)
+
+
+def test_data_root(tmp_path):
+    assert catalog.data_root(
+        str(tmp_path / "data" / "osisaf" / "north" / "siconca" / "2020.nc")
+    ) == str(tmp_path / "data")
+    assert catalog.data_root(str(tmp_path / "file.nc")) is None
+
+
+def test_default_anchored_to_data_root(tmp_path, monkeypatch, data_file,
+                                       no_catalog_env):
+    other = tmp_path / "elsewhere"
+    other.mkdir()
+    monkeypatch.chdir(other)
+
+    data_catalog = catalog.DataCatalog.default(data_file)
+    data_catalog.record(data_file)
+
+    assert data_catalog.path == str(tmp_path / "data" / "catalog.db")
+    assert catalog.DataCatalog.default(root=str(tmp_path / "data")) is \
+        data_catalog
+    assert not (other / "data").exists()
+
+
+def test_default_from_environment(tmp_path, monkeypatch, data_file):
+    monkeypatch.setenv(catalog.CATALOG_ENV, str(tmp_path / "env.db"))
+
+    assert catalog.DataCatalog.default(data_file).path == \
+        str(tmp_path / "env.db")
+
+
+@pytest.mark.parametrize("journal_mode", [None, "wal", "delete"])
+def test_journal_mode(tmp_path, monkeypatch, data_file, journal_mode):
+    if journal_mode is None:
+        monkeypatch.delenv(catalog.CATALOG_JOURNAL_ENV, raising=False)
+    else:
+        monkeypatch.setenv(catalog.CATALOG_JOURNAL_ENV, journal_mode)
+
+    data_catalog = catalog.DataCatalog(str(tmp_path / "catalog.db"))
+    data_catalog.record(data_file)
+    mode = data_catalog._connection().execute(
+        "PRAGMA journal_mode").fetchone()[0]
+
+    assert mode.upper() == (journal_mode or "delete").upper()
+
+
+def test_unsupported_journal_mode_falls_back(tmp_path, data_file, caplog):
+    data_catalog = catalog.DataCatalog(str(tmp_path / "catalog.db"),
+                                       journal_mode="unsupported")
+
+    with caplog.at_level(logging.WARNING):
+        data_catalog.record(data_file)
+
+    assert "DELETE" in caplog.text
+    assert data_catalog._connection().execute(
+        "PRAGMA journal_mode").fetchone()[0].upper() == "DELETE"
+
+
+def test_failure_warns(tmp_path, data_file, caplog):
+    # A database inside a regular file can never be created
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    data_catalog = catalog.DataCatalog(str(blocker / "catalog.db"))
+
+    with caplog.at_level(logging.WARNING):
+        dates = data_catalog.record(data_file)
+        data_catalog.remove([data_file])
+
+    assert len(dates) == 2
+    assert "unavailable" in caplog.text
+    # Lookups fall back to reading the file
+    assert len(data_catalog.dates(data_file)) == 2
+    assert os.path.exists(data_file)
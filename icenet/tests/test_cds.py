@@ -0,0 +1,77 @@
+"""Tests for the planning and combining of ERA5 requests."""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+cds = pytest.importorskip("icenet.data.interfaces.cds")
+
+
+def requested_dates(plan):
+    dates = set()
+
+    for request in plan:
+        for year, month, day in itertools.product(request["year"],
+                                                  request["month"],
+                                                  request["day"]):
+            # The CDS skips days that don't exist in a month
+            try:
+                dates.add(pd.Timestamp(int(year), int(month), int(day)))
+            except ValueError:
+                pass
+    return dates
+
+
+@pytest.mark.parametrize("dates", [
+    pd.date_range("2000-01-01", "2001-12-31"),
+    pd.date_range("2000-01-15", "2000-04-10"),
+    pd.date_range("2000-01-01", "2003-12-31", freq="7D"),
+    pd.DatetimeIndex(["2000-02-29", "2001-03-01", "2004-02-29"]),
+])
+def test_plan_covers_dates(dates):
+    assert requested_dates(cds.plan_era5_requests(dates)) == set(dates)
+
+
+def test_plan_combines_complete_months():
+    plan = cds.plan_era5_requests(pd.date_range("2000-01-01", "2002-12-31"))
+
+    assert plan == [{
+        "year": ["2000", "2001", "2002"],
+        "month": ["{:02d}".format(month) for month in range(1, 13)],
+        "day": ["{:02d}".format(day) for day in range(1, 32)],
+    }]
+
+
+def test_plan_splits_large_requests():
+    dates = pd.date_range("2000-01-01", "2000-12-31")
+    plan = cds.plan_era5_requests(dates, max_fields=31 * 24 * 5)
+
+    assert [len(request["month"]) for request in plan] == [5, 5, 2]
+    assert requested_dates(plan) == set(dates)
+
+
+def test_plan_no_dates():
+    assert cds.plan_era5_requests([]) == []
+
+
+def test_combine_parts(tmp_path):
+    times = pd.date_range("2000-01-01", periods=48, freq="h")
+    ds = xr.Dataset(
+        dict(t2m=(("valid_time", "latitude", "longitude"),
+                  np.arange(48 * 2 * 3, dtype=np.float32).reshape(48, 2, 3))),
+        coords=dict(valid_time=times,
+                    latitude=[10., 0.],
+                    longitude=[0., 1., 2.]))
+    part_paths = [str(tmp_path / "part_{}.nc".format(idx)) for idx in range(2)]
+
+    # Parts come back in whatever order the requests complete
+    ds.isel(valid_time=slice(24, None)).to_netcdf(part_paths[0])
+    ds.isel(valid_time=slice(None, 24)).to_netcdf(part_paths[1])
+
+    download_path = str(tmp_path / "combined.nc")
+    cds.combine_era5_parts(part_paths, download_path)
+
+    xr.testing.assert_identical(xr.load_dataset(download_path), ds)
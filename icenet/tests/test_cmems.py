@@ -0,0 +1,167 @@
+"""Tests for journaled ORAS5 subsetting, using a shell stub for the toolbox."""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+cmems = pytest.importorskip("icenet.data.interfaces.cmems")
+utils = pytest.importorskip("icenet.utils")
+interface_utils = pytest.importorskip("icenet.data.interfaces.utils")
+
+# Records each call, failing or hanging for the first $FAILURES attempts at a
+# range and always failing the range starting $FAIL_START
+STUB = """
+echo "$3" >> "$CALLS"
+attempts=$(grep -c "^$3\\$" "$CALLS")
+
+if [ "$3" = "$FAIL_START" ] || [ "$attempts" -le "$FAILURES" ]; then
+    [ "$MODE" = hang ] && sleep 30
+    exit 1
+fi
+cp "$SOURCE/$3.nc" "$1/$2.nc"
+"""
+
+DATES = pd.date_range("2000-01-01", "2000-02-29")
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    source = tmp_path / "source"
+    source.mkdir()
+
+    for month in DATES.to_period("M").unique():
+        times = pd.date_range(month.start_time, month.end_time.normalize())
+        xr.DataArray(np.zeros((len(times), 2, 2), dtype=np.float32),
+                     dims=("time", "latitude", "longitude"),
+                     coords=dict(time=times),
+                     name="zos_oras").to_netcdf(
+                         str(source / "{}.nc".format(times[0].date())))
+
+    path = tmp_path / "subset.sh"
+    path.write_text(STUB)
+
+    monkeypatch.setenv("CALLS", str(tmp_path / "calls"))
+    monkeypatch.setenv("FAILURES", "0")
+    monkeypatch.setenv("FAIL_START", "")
+    monkeypatch.setenv("MODE", "fail")
+    monkeypatch.setenv("SOURCE", str(source))
+    monkeypatch.setenv("COPERNICUSMARINE_SERVICE_USERNAME", "user")
+    monkeypatch.setenv("COPERNICUSMARINE_SERVICE_PASSWORD", "password")
+    return "sh {} {{output_dir}} {{output_name}} {{start}}".format(path)
+
+
+def calls(tmp_path):
+    if not (tmp_path / "calls").exists():
+        return []
+    return (tmp_path / "calls").read_text().split()
+
+
+def downloader(tmp_path, stub, **kwargs):
+    return cmems.ORAS5Downloader(var_names=["zos"],
+                                 levels=[None],
+                                 dates=[date.date() for date in DATES],
+                                 north=False,
+                                 south=True,
+                                 path=str(tmp_path / "data"),
+                                 cred_file=str(tmp_path / "missing.creds"),
+                                 backoff=0.,
+                                 subset_command=stub,
+                                 **kwargs)
+
+
+def test_run_command():
+    assert utils.run_command("exit 3").returncode == 3
+    assert utils.run_command("exit 3", timeout=10).returncode == 3
+    assert utils.run_command("exit 3", dry=True) == 0
+
+
+def test_run_command_timeout_kills_children(tmp_path):
+    marker = tmp_path / "marker"
+    tic = time.time()
+
+    ret = utils.run_command("(sleep 1; touch {}) & wait".format(marker),
+                            timeout=0.2)
+
+    assert time.time() - tic < 1
+    assert ret.returncode < 0
+    time.sleep(1.5)
+    assert not marker.exists()
+
+
+def test_request_journal(tmp_path):
+    path = str(tmp_path / "journal.json")
+    output = tmp_path / "output.nc"
+    output.write_text("")
+
+    journal = interface_utils.RequestJournal(path)
+    journal.record("a", str(output))
+    journal.record("b", str(tmp_path / "deleted.nc"))
+
+    restarted = interface_utils.RequestJournal(path)
+    assert restarted.completed("a") == str(output)
+    # Requests whose files have gone have to be made again
+    assert restarted.completed("b") is None
+    assert restarted.completed("c") is None
+
+    restarted.remove(["a", "b"])
+    assert interface_utils.RequestJournal(path).completed("a") is None
+
+
+def test_request_journal_corrupt(tmp_path):
+    path = tmp_path / "journal.json"
+    path.write_text("{")
+
+    assert interface_utils.RequestJournal(str(path)).completed("a") is None
+
+
+@pytest.mark.parametrize("mode, timeout", [("fail", None), ("hang", 1)])
+def test_download_range_retries(tmp_path, stub, monkeypatch, mode, timeout):
+    monkeypatch.setenv("FAILURES", "2")
+    monkeypatch.setenv("MODE", mode)
+    oras5 = downloader(tmp_path, stub, max_failures=3, request_timeout=timeout)
+    tic = time.time()
+
+    output = oras5._download_range("zos", DATES[0], DATES[30])
+
+    # Hung attempts are killed at the timeout, rather than waited on
+    assert time.time() - tic < 10
+    assert calls(tmp_path) == ["2000-01-01"] * 3
+    assert os.path.exists(output)
+    assert oras5._journal.completed(
+        oras5._range_key("zos", DATES[0], DATES[30])) == output
+
+
+def test_download_range_gives_up(tmp_path, stub, monkeypatch):
+    monkeypatch.setenv("FAILURES", "5")
+
+    assert downloader(tmp_path, stub, max_failures=2)._download_range(
+        "zos", DATES[0], DATES[30]) is None
+    assert len(calls(tmp_path)) == 2
+
+
+def test_restart_skips_journaled_ranges(tmp_path, stub, monkeypatch):
+    download_path = str(tmp_path / "zos.nc")
+    monkeypatch.setenv("FAIL_START", "2000-02-01")
+
+    assert not downloader(tmp_path, stub, max_failures=1).\
+        _single_motu_download("zos", None, list(DATES), download_path)
+    assert sorted(calls(tmp_path)) == ["2000-01-01", "2000-02-01"]
+
+    # Only the failed range is requested again
+    monkeypatch.setenv("FAIL_START", "")
+    oras5 = downloader(tmp_path, stub, max_failures=1)
+
+    assert oras5._single_motu_download("zos", None, list(DATES),
+                                       download_path)
+    assert calls(tmp_path)[2:] == ["2000-02-01"]
+
+    with xr.open_dataset(download_path) as ds:
+        assert ds.get_index("time").equals(
+            pd.DatetimeIndex(DATES, name="time"))
+
+    assert oras5._journal.completed(
+        oras5._range_key("zos", DATES[0], DATES[30])) is None
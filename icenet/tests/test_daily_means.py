@@ -0,0 +1,99 @@
+"""Tests for the blockwise daily means of sub-daily data."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+utils = pytest.importorskip("icenet.data.interfaces.utils")
+
+
+@pytest.fixture
+def hourly_da(random_da):
+
+    def _hourly_da(hours=24 * 5):
+        da = random_da(hours,
+                       shape=(2, 3),
+                       dims=("lat", "lon"),
+                       freq="h",
+                       name="tas")
+        # Missing values are skipped, as by resample
+        da[5, 0, 0] = np.nan
+        da[30:40, 1, 2] = np.nan
+        return da
+
+    return _hourly_da
+
+
+def daily_means(da, **kwargs):
+    return xr.concat(list(utils.iter_daily_means(da, **kwargs)), dim="time")
+
+
+# Blocks of 7 and 100 hours straddle the day boundaries
+@pytest.mark.parametrize("block_size", [1, 7, 24, 100])
+def test_daily_means_match_resample(hourly_da, block_size):
+    da = hourly_da()
+
+    xr.testing.assert_allclose(daily_means(da, block_size=block_size),
+                               da.resample(time="1D").mean())
+
+
+def test_daily_means_unordered(hourly_da):
+    da = hourly_da()
+    shuffled = da.isel(time=np.random.default_rng(0).permutation(len(da.time)))
+
+    xr.testing.assert_allclose(daily_means(shuffled, block_size=7),
+                               da.resample(time="1D").mean())
+
+
+def test_daily_means_drops_partial_last_day(hourly_da):
+    da = hourly_da(hours=24 * 3 + 6)
+
+    assert len(daily_means(da, block_size=7, min_samples=24).time) == 3
+    assert len(daily_means(da, block_size=7).time) == 4
+
+
+def test_daily_means_stops_at_partial_day(hourly_da):
+    da = hourly_da()
+    da = da.isel(time=np.flatnonzero(
+        ~((da.time.dt.day == 2) & (da.time.dt.hour >= 12)).values))
+
+    means = daily_means(da, block_size=10, min_samples=24)
+
+    assert means.get_index("time").equals(pd.DatetimeIndex(["2000-01-01"]))
+
+
+def test_daily_means_preprocess(hourly_da):
+    da = hourly_da()
+
+    xr.testing.assert_allclose(
+        daily_means(da, block_size=7, preprocess=lambda block: block * 2),
+        da.resample(time="1D").mean() * 2)
+
+
+@pytest.mark.parametrize("flush_days", [1, 2, 10])
+def test_stream_daily_mean(tmp_path, hourly_da, flush_days):
+    da = hourly_da(hours=24 * 5 + 6)
+    destination = str(tmp_path / "daily.nc")
+
+    assert utils.stream_daily_mean(da,
+                                   destination,
+                                   block_size=7,
+                                   flush_days=flush_days,
+                                   min_samples=24) == 5
+
+    xr.testing.assert_allclose(
+        xr.load_dataarray(destination),
+        da.resample(time="1D").mean().isel(time=slice(0, 5)))
+
+
+def test_benchmark_daily_means():
+    results = utils.benchmark_daily_means(hours=24 * 4,
+                                          shape=(100, 100),
+                                          block_sizes=(7,),
+                                          flush_days=1)
+
+    assert [(result["method"], result["block_size"])
+            for result in results] == [("resample", 96), ("stream", 7)]
+    # Streaming only holds a block and a day at a time
+    assert results[1]["peak_mb"] < results[0]["peak_mb"]
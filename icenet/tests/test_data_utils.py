@@ -0,0 +1,153 @@
+"""Tests for the netCDF append and regridding utilities."""
+
+import os
+
+import netCDF4
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from scipy.interpolate import RegularGridInterpolator
+
+utils = pytest.importorskip("icenet.data.utils")
+
+
+def example_da(start, periods, offset=0.):
+    times = pd.date_range(start, periods=periods)
+    return xr.DataArray(
+        np.arange(periods * 6, dtype=np.float32).reshape(periods, 2, 3) +
+        offset,
+        dims=("time", "yc", "xc"),
+        coords=dict(time=times, yc=[0., 1.], xc=[0., 1., 2.]),
+        name="siconca")
+
+
+def write(path, da, unlimited=True):
+    da.to_netcdf(path, unlimited_dims=["time"] if unlimited else None)
+
+
+def test_append_in_place(tmp_path):
+    path = str(tmp_path / "siconca.nc")
+    write(path, example_da("2000-01-01", 5))
+    inode = os.stat(path).st_ino
+
+    assert utils.append_netcdf_time(path, example_da("2000-01-06", 3)) == 3
+    assert os.stat(path).st_ino == inode
+
+    with xr.open_dataarray(path) as da:
+        assert da.get_index("time").equals(
+            pd.date_range("2000-01-01", periods=8))
+        np.testing.assert_array_equal(
+            da.isel(time=slice(5, None)).values,
+            example_da("2000-01-06", 3).values)
+
+
+def test_append_rewrites_fixed_time(tmp_path):
+    path = str(tmp_path / "siconca.nc")
+    write(path, example_da("2000-01-01", 5), unlimited=False)
+    inode = os.stat(path).st_ino
+
+    assert utils.append_netcdf_time(path, example_da("2000-01-06", 3)) == 3
+    assert os.stat(path).st_ino != inode
+
+    with netCDF4.Dataset(path) as nc:
+        assert nc.dimensions["time"].isunlimited()
+        assert len(nc.dimensions["time"]) == 8
+
+
+def test_append_rewrites_earlier_dates(tmp_path):
+    path = str(tmp_path / "siconca.nc")
+    write(path, example_da("2000-01-04", 3))
+
+    assert utils.append_netcdf_time(path, example_da("2000-01-01", 3)) == 3
+
+    with xr.open_dataarray(path) as da:
+        assert da.get_index("time").equals(
+            pd.date_range("2000-01-01", periods=6))
+
+
+@pytest.mark.parametrize("overwrite", [False, True])
+def test_append_duplicated_dates(tmp_path, overwrite):
+    path = str(tmp_path / "siconca.nc")
+    original = example_da("2000-01-01", 5)
+    write(path, original)
+
+    # Overlaps the last two dates, and adds two more
+    update = example_da("2000-01-04", 4, offset=100.)
+
+    assert utils.append_netcdf_time(path, update, overwrite=overwrite) == \
+        (4 if overwrite else 2)
+
+    with xr.open_dataarray(path) as da:
+        assert len(da.time) == 7
+        np.testing.assert_array_equal(
+            da.sel(time=slice("2000-01-04", "2000-01-05")).values,
+            (update if overwrite else original).sel(
+                time=slice("2000-01-04", "2000-01-05")).values)
+        np.testing.assert_array_equal(
+            da.sel(time=slice("2000-01-06", None)).values,
+            update.sel(time=slice("2000-01-06", None)).values)
+
+
+@pytest.mark.parametrize("unlimited", [True, False])
+def test_append_keeps_other_time_variables(tmp_path, caplog, unlimited):
+    path = str(tmp_path / "siconca.nc")
+    original = example_da("2000-01-01", 5)
+    ds = original.to_dataset()
+    ds["time_bnds"] = (("time", "nv"), np.stack([
+        np.arange(5, dtype=np.float64), np.arange(1, 6, dtype=np.float64)
+    ], axis=1))
+    ds.to_netcdf(path, unlimited_dims=["time"] if unlimited else None)
+    inode = os.stat(path).st_ino
+
+    with caplog.at_level("INFO"):
+        assert utils.append_netcdf_time(path,
+                                        example_da("2000-01-06", 3)) == 3
+
+    assert "time_bnds" in caplog.text
+    # Extended in place where possible, rather than rewritten every time
+    assert (os.stat(path).st_ino == inode) == unlimited
+
+    with xr.open_dataset(path) as ds:
+        assert len(ds.time) == 8
+        np.testing.assert_array_equal(ds.time_bnds.values[:5, 1],
+                                      np.arange(1, 6))
+        assert np.isnan(ds.time_bnds.values[5:]).all()
+
+
+def test_append_unknown_variable(tmp_path):
+    path = str(tmp_path / "siconca.nc")
+    write(path, example_da("2000-01-01", 5))
+
+    with pytest.raises(ValueError):
+        utils.append_netcdf_time(path,
+                                 example_da("2000-01-06", 1).rename("tas"))
+
+
+@pytest.mark.parametrize("descending_y", [False, True])
+def test_linear_regrid_weights(descending_y):
+    rng = np.random.default_rng(42)
+    src_x = np.arange(0., 360., 2.5)
+    src_y = np.arange(-90., 90.1, 2.5)
+
+    if descending_y:
+        src_y = src_y[::-1]
+
+    data = rng.random((len(src_y), len(src_x)))
+    # Targets either side of the longitude seam, and beyond the first period
+    tgt_x = rng.uniform(-180., 540., (20, 30))
+    tgt_y = rng.uniform(-89., 89., (20, 30))
+
+    weights = utils.linear_regrid_weights(src_x, src_y, tgt_x, tgt_y,
+                                          x_modulus=360.)
+
+    # Repeating the first longitude at 360 lets scipy interpolate the seam
+    interpolator = RegularGridInterpolator(
+        (src_y, np.append(src_x, 360.)),
+        np.concatenate([data, data[:, :1]], axis=1))
+    expected = interpolator(np.stack([tgt_y.ravel(),
+                                      np.mod(tgt_x.ravel(), 360.)], axis=-1))
+
+    np.testing.assert_allclose(weights @ data.ravel(), expected,
+                               rtol=0, atol=1e-12)
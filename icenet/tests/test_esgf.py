@@ -0,0 +1,134 @@
+"""Tests for ESGF searches and the subsetting of CMIP6 results."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+esgf = pytest.importorskip("icenet.data.interfaces.esgf")
+
+QUERY = dict(source_id="MRI-ESM2-0", variable_id="tas", data_node="a.org")
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    return esgf.CMIP6Downloader(source="MRI-ESM2-0",
+                                member="r1i1p1f1",
+                                var_names=["tas", "ta"],
+                                levels=[None, [500]],
+                                dates=[pd.Timestamp("2000-01-01").date()],
+                                north=False,
+                                south=True,
+                                path=str(tmp_path / "data"))
+
+
+@pytest.fixture
+def result(tmp_path):
+    """A local file standing in for a DAP URL"""
+    times = pd.date_range("2000-01-01", periods=10)
+    lats = np.arange(-90., 91., 30.)
+    path = str(tmp_path / "ta_day_MRI-ESM2-0_gn_20000101-20000110.nc")
+    xr.Dataset(
+        dict(ta=(("time", "plev", "lat", "lon"),
+                 np.arange(10 * 2 * 7 * 4, dtype=np.float32).reshape(
+                     10, 2, 7, 4))),
+        coords=dict(time=times,
+                    plev=[50000., 85000.],
+                    lat=lats,
+                    lon=np.arange(0., 360., 90.))).to_netcdf(path)
+    return path
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2000-01-01", "2000-12-31", [1, 3]),
+    ("1999-12-31", "2000-01-01", [0, 1, 3]),
+    ("2050-01-01", "2050-01-02", [1, 2, 3]),
+    ("2051-01-01", "2051-01-02", [2, 3]),
+    ("1900-01-01", "1949-12-31", [3]),
+])
+def test_filter_results_on_dates(start, end, expected):
+    results = [
+        "http://a.org/tas_day_MRI-ESM2-0_gn_19500101-19991231.nc",
+        "http://a.org/tas_day_MRI-ESM2-0_gn_2000010112-2050010112.nc",
+        "http://a.org/tas_day_MRI-ESM2-0_gn_20500102-21001231.nc",
+        "http://a.org/tas_fx_MRI-ESM2-0_gn.nc",
+    ]
+
+    assert esgf.filter_results_on_dates(results, start, end) == \
+        [results[idx] for idx in expected]
+
+
+def test_search_cache(tmp_path):
+    path = str(tmp_path / "search.json")
+    cache = esgf.ESGFSearchCache(path)
+
+    assert cache.get(QUERY) is None
+    cache.set(QUERY, ["http://a.org/1.nc"])
+
+    # Keys are independent of the order of the query
+    reordered = dict(reversed(list(QUERY.items())))
+    assert esgf.ESGFSearchCache(path).get(reordered) == ["http://a.org/1.nc"]
+    assert esgf.ESGFSearchCache(path, ttl=-1).get(QUERY) is None
+
+
+def test_search_cache_corrupt(tmp_path):
+    path = tmp_path / "search.json"
+    path.write_text("{")
+
+    assert esgf.ESGFSearchCache(str(path)).get(QUERY) is None
+
+
+def test_search_caches_only_results(downloader, monkeypatch):
+    responses = [[], ["http://a.org/1.nc"]]
+    searches = list()
+
+    def search(**query):
+        searches.append(query)
+        return responses[len(searches) - 1]
+
+    monkeypatch.setattr(esgf, "esgf_search", search)
+
+    # Nothing published yet, so the next run searches again
+    assert downloader._search(QUERY) == []
+    assert downloader._search(QUERY) == ["http://a.org/1.nc"]
+    assert downloader._search(QUERY) == ["http://a.org/1.nc"]
+    assert len(searches) == 2
+
+    with open(downloader._search_cache._path) as fh:
+        assert len(json.load(fh)) == 1
+
+
+@pytest.mark.parametrize("limit_steps", [1, 3, 100])
+def test_subset_result(downloader, result, monkeypatch, limit_steps):
+    step_size = 4 * 4 * 4
+    monkeypatch.setattr(esgf, "DAP_REQUEST_LIMIT", step_size * limit_steps)
+
+    loads = list()
+    load = xr.DataArray.load
+
+    def counting_load(self, **kwargs):
+        loads.append(self.time.size)
+        return load(self, **kwargs)
+
+    monkeypatch.setattr(xr.DataArray, "load", counting_load)
+    req_dates = pd.date_range("2000-01-02", "2000-01-09")
+
+    da = downloader._subset_result(result, "ta", "500", req_dates)
+
+    # Each block of time stays within the request limit
+    assert max(loads) == min(limit_steps, 8)
+    assert sum(loads) == 8
+
+    with xr.open_dataset(result) as ds:
+        xr.testing.assert_identical(
+            da,
+            ds.ta.sel(time=slice(req_dates[0], req_dates[-1]),
+                      plev=50000.,
+                      lat=slice(-90., 0.)).load())
+
+
+def test_subset_result_no_dates(downloader, result):
+    assert downloader._subset_result(
+        result, "ta", "500", pd.date_range("2001-01-01", periods=2)) is None
@@ -0,0 +1,89 @@
+"""Tests for the MARS downloaders, against a fake ECMWF service."""
+
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+pytest.importorskip("ecmwfapi")
+mars = pytest.importorskip("icenet.data.interfaces.mars")
+
+
+class FakeService:
+    """Writes a target of random fields for the dates in each request"""
+
+    def __init__(self):
+        self.requests = list()
+        self._lock = threading.Lock()
+
+    def execute(self, request, target):
+        with self._lock:
+            self.requests.append(request)
+
+        dates = pd.to_datetime(
+            re.search(r"date=([\d/-]+)", request).group(1).split("/"))
+        rng = np.random.default_rng(len(self.requests))
+
+        if "number=" in request:
+            times = pd.date_range(dates[0], periods=3)
+            dims = ("number", "time", "latitude", "longitude")
+            shape = (4, len(times), 2, 3)
+        else:
+            times = dates + pd.Timedelta(hours=12)
+            dims = ("time", "latitude", "longitude")
+            shape = (len(times), 2, 3)
+
+        data_vars = {
+            name: (dims, rng.random(shape, dtype=np.float32))
+            for name in ("t2m", "u10")
+        }
+        xr.Dataset(data_vars, coords=dict(time=times)).to_netcdf(target)
+
+
+def test_hres_download(tmp_path):
+    server = FakeService()
+    dates = [date.date() for date in pd.date_range("2020-01-01", "2020-03-31")]
+    downloader = mars.HRESDownloader(var_names=["tas", "uas"],
+                                     levels=[None, None],
+                                     dates=dates,
+                                     north=False,
+                                     south=True,
+                                     path=str(tmp_path / "data"),
+                                     server=server,
+                                     max_threads=2)
+    downloader.download()
+
+    assert len(server.requests) == 3
+    assert len(downloader._files_downloaded) == 2
+
+    # Months saved by concurrent workers are all appended to the year
+    for path in downloader._files_downloaded:
+        with xr.open_dataarray(path) as da:
+            assert da.get_index("time").equals(
+                pd.DatetimeIndex(dates, name="time"))
+
+
+def test_seas_download_ensemble_mean(tmp_path):
+    server = FakeService()
+    dates = [date.date() for date in pd.date_range("2020-01-01", periods=2)]
+    downloader = mars.SEASDownloader(var_names=["tas"],
+                                     levels=[None],
+                                     dates=dates,
+                                     north=False,
+                                     south=True,
+                                     path=str(tmp_path / "data"),
+                                     server=server,
+                                     group_dates_by="day",
+                                     max_threads=2)
+    downloader.download()
+
+    assert len(server.requests) == 2
+    assert len(downloader._files_downloaded) == 2
+
+    for path in downloader._files_downloaded:
+        with xr.open_dataarray(path) as da:
+            assert "number" not in da.dims
+            assert da.shape == (3, 2, 3)
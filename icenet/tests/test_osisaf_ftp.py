@@ -0,0 +1,224 @@
+"""Tests for OSI-SAF downloads over pooled FTP, against a local FTP server."""
+
+import datetime as dt
+import json
+import os
+import threading
+import time
+import types
+
+import pytest
+
+pytest.importorskip("pyftpdlib")
+osisaf = pytest.importorskip("icenet.data.sic.osisaf")
+
+from pyftpdlib.authorizers import DummyAuthorizer  # noqa: E402
+from pyftpdlib.handlers import FTPHandler  # noqa: E402
+from pyftpdlib.servers import ThreadedFTPServer  # noqa: E402
+
+DIRECTORY = "/conc/2020/01/"
+FILENAME = "ice_conc_nh_ease2-250_cdr-v2p0_202001150000.nc"
+PATTERN = "ice_conc_nh_ease*_20200115*.nc"
+CONTENT = bytes(range(256)) * 8
+
+
+class RecordingHandler(FTPHandler):
+    """Counts connections and transfers, failing the first `failures` RETRs"""
+
+    connections = 0
+    failures = 0
+    listings = 0
+    transfers = list()
+
+    def on_connect(self):
+        type(self).connections += 1
+
+    def ftp_NLST(self, path):
+        type(self).listings += 1
+        return super().ftp_NLST(path)
+
+    def ftp_RETR(self, file):
+        type(self).transfers.append(self._restart_position)
+
+        if type(self).failures > 0:
+            type(self).failures -= 1
+            self.respond("451 Transient failure")
+            return
+        return super().ftp_RETR(file)
+
+
+@pytest.fixture
+def ftp_root(tmp_path):
+    root = tmp_path / "ftp"
+    directory = root / DIRECTORY.strip("/")
+    directory.mkdir(parents=True)
+    (directory / FILENAME).write_bytes(CONTENT)
+    return root
+
+
+@pytest.fixture
+def handler(ftp_root):
+    authorizer = DummyAuthorizer()
+    authorizer.add_anonymous(str(ftp_root))
+    return type("Handler", (RecordingHandler,),
+                dict(authorizer=authorizer, transfers=list()))
+
+
+@pytest.fixture
+def pool(handler):
+    server = ThreadedFTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever,
+                              kwargs=dict(timeout=0.05, handle_exit=False),
+                              daemon=True)
+    thread.start()
+
+    ftp_pool = osisaf.FTPConnectionPool("127.0.0.1",
+                                        size=2,
+                                        timeout=10,
+                                        port=server.address[1])
+    yield ftp_pool
+    ftp_pool.close()
+    server.close_all()
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    sleeps = list()
+    monkeypatch.setattr(osisaf, "random",
+                        types.SimpleNamespace(random=lambda: 0.))
+    monkeypatch.setattr(osisaf, "time",
+                        types.SimpleNamespace(sleep=sleeps.append,
+                                              time=time.time))
+    return sleeps
+
+
+def fetch(pool, cache, destination, **kwargs):
+    return osisaf.fetch_ftp_file(pool, cache, DIRECTORY, dt.date(2020, 1, 15),
+                                 PATTERN, str(destination), **kwargs)
+
+
+def test_pool_bounds_and_reuses_connections(pool, handler):
+    def borrow():
+        with pool.connection() as ftp:
+            ftp.pwd()
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=borrow) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert handler.connections == 2
+
+
+def test_pool_discards_failed_connection(pool, handler):
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("Unknown state")
+
+    with pool.connection() as ftp:
+        ftp.pwd()
+
+    assert handler.connections == 2
+
+
+def test_fetch(pool, tmp_path):
+    cache = osisaf.FTPListingCache(str(tmp_path / "listing.json"))
+    destination = tmp_path / "file.nc"
+
+    assert fetch(pool, cache, destination) == "downloaded"
+    assert destination.read_bytes() == CONTENT
+    assert not os.path.exists("{}.part".format(destination))
+
+
+def test_fetch_retries_with_backoff(pool, handler, tmp_path, delays):
+    handler.failures = 2
+    cache = osisaf.FTPListingCache(str(tmp_path / "listing.json"))
+    destination = tmp_path / "file.nc"
+
+    assert fetch(pool, cache, destination, retries=3, backoff=1.) == \
+        "downloaded"
+    assert destination.read_bytes() == CONTENT
+    assert len(handler.transfers) == 3
+    assert delays == [1., 2.]
+
+
+def test_fetch_gives_up(pool, handler, tmp_path, delays):
+    handler.failures = 10
+    cache = osisaf.FTPListingCache(str(tmp_path / "listing.json"))
+
+    assert fetch(pool, cache, tmp_path / "file.nc", retries=2) == "failed"
+    assert len(handler.transfers) == 3
+    assert not (tmp_path / "file.nc").exists()
+
+
+def test_fetch_resumes_part(pool, handler, tmp_path):
+    cache = osisaf.FTPListingCache(str(tmp_path / "listing.json"))
+    destination = tmp_path / "file.nc"
+    (tmp_path / "file.nc.part").write_bytes(CONTENT[:600])
+
+    assert fetch(pool, cache, destination) == "downloaded"
+    assert handler.transfers == [600]
+    assert destination.read_bytes() == CONTENT
+
+
+def test_fetch_relists_when_missing_from_cache(pool, handler, tmp_path):
+    cache = osisaf.FTPListingCache(str(tmp_path / "listing.json"))
+    # A settled listing taken before the file was published
+    cache.set(DIRECTORY, dt.date(2020, 1, 15), ["other.nc"])
+
+    assert fetch(pool, cache, tmp_path / "file.nc") == "downloaded"
+    assert handler.listings == 1
+    assert FILENAME in cache.get(DIRECTORY)
+
+
+def test_fetch_unavailable(pool, handler, ftp_root, tmp_path):
+    os.unlink(ftp_root / DIRECTORY.strip("/") / FILENAME)
+    cache = osisaf.FTPListingCache(str(tmp_path / "listing.json"))
+    cache.set(DIRECTORY, dt.date(2020, 1, 15), ["other.nc"])
+
+    assert fetch(pool, cache, tmp_path / "file.nc") == "unavailable"
+    # Listed again once, rather than on every attempt
+    assert handler.listings == 1
+
+
+def last_month():
+    return dt.date.today().replace(day=1) - dt.timedelta(days=1)
+
+
+@pytest.mark.parametrize("month, settle_days, settled", [
+    (dt.date.today(), 0, False),
+    (last_month(), 40, False),
+    (last_month(), 0, True),
+    (dt.date(2020, 1, 15), 7, True),
+])
+def test_listing_settles(tmp_path, month, settle_days, settled):
+    cache = osisaf.FTPListingCache(str(tmp_path / "listing.json"),
+                                   ttl=-1,
+                                   settle_days=settle_days)
+    cache.set(DIRECTORY, month, [FILENAME])
+
+    assert (cache.get(DIRECTORY) is not None) == settled
+
+
+def test_listing_persists(tmp_path):
+    path = str(tmp_path / "listing.json")
+    cache = osisaf.FTPListingCache(path)
+    cache.set(DIRECTORY, dt.date(2020, 1, 15), [FILENAME])
+    cache.save()
+
+    assert osisaf.FTPListingCache(path, ttl=-1).get(DIRECTORY) == [FILENAME]
+
+
+def test_legacy_listing_expires(tmp_path):
+    path = str(tmp_path / "listing.json")
+
+    with open(path, "w") as fh:
+        json.dump({DIRECTORY: dict(files=[], permanent=True,
+                                   time=time.time())}, fh)
+
+    assert osisaf.FTPListingCache(path).get(DIRECTORY) == []
+    assert osisaf.FTPListingCache(path, ttl=-1).get(DIRECTORY) is None
@@ -0,0 +1,100 @@
+"""Tests for the chunking and compression of processed outputs."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+producers = pytest.importorskip("icenet.data.producers")
+catalog = pytest.importorskip("icenet.data.catalog")
+
+
+@pytest.fixture
+def da(random_da):
+    return random_da(6, start="2020-01-01")
+
+
+def test_zarr_roundtrip(tmp_path, da):
+    pytest.importorskip("zarr")
+    path = str(tmp_path / "siconca.zarr")
+
+    producers.encode_output(da, "zarr", 3).to_dataset().to_zarr(path,
+                                                                 mode="w")
+
+    with xr.open_zarr(path) as ds:
+        assert ds.siconca.encoding["chunks"] == (1, 4, 5)
+        np.testing.assert_array_equal(ds.siconca.values, da.values)
+
+    assert catalog.DataCatalog.default().record(path).equals(
+        pd.DatetimeIndex(da.time.values))
+
+
+def test_zarr_append(tmp_path, da):
+    pytest.importorskip("zarr")
+    from icenet.data.utils import append_zarr_time
+
+    path = str(tmp_path / "siconca.zarr")
+    producers.encode_output(da.isel(time=slice(0, 4)), "zarr").\
+        to_dataset().to_zarr(path, mode="w")
+
+    assert append_zarr_time(path, da.isel(time=slice(2, None))) == 2
+    assert catalog.DataCatalog.default().dates(path, read=False).equals(
+        pd.DatetimeIndex(da.time.values))
+
+    with xr.open_zarr(path) as ds:
+        np.testing.assert_array_equal(ds.siconca.values, da.values)
+
+
+def test_netcdf_roundtrip(tmp_path, da):
+    path = str(tmp_path / "siconca.nc")
+
+    producers.encode_output(da, "netcdf", 0).to_netcdf(path)
+
+    with xr.open_dataset(path) as ds:
+        assert not ds.siconca.encoding.get("zlib", False)
+        assert ds.siconca.encoding["chunksizes"] == (1, 4, 5)
+        np.testing.assert_array_equal(ds.siconca.values, da.values)
+
+
+@pytest.mark.parametrize("overwrite", [False, True])
+def test_zarr_append_overlap_in_place(tmp_path, da, caplog, overwrite):
+    pytest.importorskip("zarr")
+    from icenet.data.utils import append_zarr_time
+
+    path = str(tmp_path / "siconca.zarr")
+    producers.encode_output(da.isel(time=slice(0, 4)), "zarr").\
+        to_dataset().to_zarr(path, mode="w")
+
+    # Overlaps two stored dates, and adds two more
+    update = da.isel(time=slice(2, None)) + 10
+
+    with caplog.at_level("INFO"):
+        assert append_zarr_time(path, update, overwrite=overwrite) == \
+            (4 if overwrite else 2)
+
+    assert "rewriting" not in caplog.text
+
+    with xr.open_zarr(path) as ds:
+        expected = xr.concat([
+            da.isel(time=slice(0, 2 if overwrite else 4)),
+            update.isel(time=slice(0 if overwrite else 2, None))
+        ], dim="time")
+        np.testing.assert_array_equal(ds.siconca.values, expected.values)
+
+
+def test_zarr_append_earlier_rewrites(tmp_path, da):
+    pytest.importorskip("zarr")
+    from icenet.data.utils import append_zarr_time
+
+    path = str(tmp_path / "siconca.zarr")
+    producers.encode_output(da.isel(time=slice(3, None)), "zarr").\
+        to_dataset().to_zarr(path, mode="w")
+
+    assert append_zarr_time(path, da.isel(time=slice(0, 3))) == 3
+    assert not [name for name in os.listdir(tmp_path)
+                if name.startswith("siconca.zarr.")]
+
+    with xr.open_zarr(path) as ds:
+        np.testing.assert_array_equal(ds.siconca.values, da.values)
@@ -0,0 +1,151 @@
+"""Tests for the preprocessing of variables by IceNetPreProcessor."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+process = pytest.importorskip("icenet.data.process")
+
+SHAPE = (4, 4)
+
+
+class ExamplePreProcessor(process.IceNetPreProcessor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args,
+                         identifier="example",
+                         data_shape=SHAPE,
+                         linear_trends=["siconca"],
+                         linear_trend_steps=3,
+                         no_normalise=[],
+                         north=True,
+                         south=False,
+                         update_loader=False,
+                         **kwargs)
+
+
+class NoLandMasks:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_land_mask(self):
+        return np.zeros(SHAPE, dtype=bool)
+
+
+def write_sources(periods):
+    for year, days in periods.items():
+        rng = np.random.default_rng(year)
+        times = pd.date_range("{}-01-01".format(year), periods=days)
+        folder = os.path.join("data", "example", "north", "siconca")
+        os.makedirs(folder, exist_ok=True)
+        xr.DataArray(
+            rng.random((len(times),) + SHAPE, dtype=np.float32),
+            dims=("time", "yc", "xc"),
+            coords=dict(time=times,
+                        yc=xr.DataArray(np.arange(4.), dims="yc",
+                                        attrs=dict(units="m")),
+                        xc=xr.DataArray(np.arange(4.), dims="xc",
+                                        attrs=dict(units="m"))),
+            name="siconca").to_netcdf(
+                os.path.join(folder, "{}.nc".format(year)))
+
+
+def run(dates, test_dates=(), append=False):
+    processor = ExamplePreProcessor(["siconca"], [], "test",
+                                    [date.date() for date in dates], [],
+                                    [date.date() for date in test_dates],
+                                    append=append)
+    processor.init_source_data()
+    processor.process()
+
+    folder = os.path.join("processed", "test", "example", "north", "siconca")
+    return tuple(
+        xr.load_dataarray(os.path.join(folder, "siconca_{}.nc".format(name)))
+        for name in ("abs", "linear_trend"))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(process, "Masks", NoLandMasks)
+
+
+def test_append_matches_full_run(tmp_path):
+    train = pd.date_range("2000-01-01", periods=90)
+    test = pd.date_range("2001-01-01", periods=90)
+
+    os.makedirs("full")
+    os.chdir("full")
+    write_sources({2000: 90, 2001: 90})
+    full_abs, full_trend = run(train, test)
+
+    # Trends cached for the dates following the first run depend on the
+    # appended data, so must be recalculated
+    os.chdir(tmp_path)
+    os.makedirs("append")
+    os.chdir("append")
+    write_sources({2000: 90, 2001: 60})
+    run(train, test[:60])
+    write_sources({2000: 90, 2001: 90})
+    append_abs, append_trend = run(train, test, append=True)
+
+    xr.testing.assert_allclose(append_abs, full_abs)
+    xr.testing.assert_allclose(append_trend, full_trend)
+
+
+@pytest.mark.parametrize("dates", [
+    pd.date_range("2000-01-01", "2000-12-31"),
+    pd.date_range("2000-01-01", "2000-12-31").delete([10, 11, 100]),
+    pd.date_range("2000-01-01", "2010-12-01", freq="MS"),
+    pd.DatetimeIndex(["2000-01-01", "2000-06-01", "2001-01-03"]),
+    pd.date_range("2000-01-01", "2000-01-10").append(
+        pd.date_range("2000-03-01", "2000-03-10")),
+    pd.DatetimeIndex([]),
+])
+def test_compact_dates_roundtrip(dates):
+    compacted = process.compact_dates(dates)
+
+    np.testing.assert_array_equal(process.expand_dates(compacted),
+                                  dates.values.astype("datetime64[D]"))
+
+
+def test_compact_dates_bridges_gaps():
+    dates = pd.date_range("2000-01-01", "2000-12-31").delete([10, 11, 100])
+    compacted = process.compact_dates(dates)
+
+    assert compacted["ranges"] == [
+        dict(start="2000_01_01", end="2000_12_31", step=1)
+    ]
+    assert compacted["exclude"] == ["2000_01_11", "2000_01_12", "2000_04_10"]
+    assert len(process.compact_dates(dates, max_gap=1)["ranges"]) == 2
+
+
+def test_expand_legacy_dates():
+    dates = ["2000_01_02", "2000_01_01", "2000_01_02", "2000_03_01"]
+
+    np.testing.assert_array_equal(
+        process.expand_dates(dates),
+        np.array(["2000-01-01", "2000-01-02", "2000-03-01"],
+                 dtype="datetime64[D]"))
+
+
+def test_estimate_variable_size():
+    write_sources({2000: 60, 2001: 30})
+    processor = ExamplePreProcessor(["siconca"], [], "test", [], [], [])
+    folder = os.path.join("data", "example", "north", "siconca")
+    processor._var_files = dict(siconca=[
+        os.path.join(folder, "2000.nc"),
+        os.path.join(folder, "2001.nc"),
+    ])
+
+    # Packed to shorts on disk, but float32 once decoded
+    xr.load_dataarray(processor._var_files["siconca"][0]).to_netcdf(
+        processor._var_files["siconca"][0],
+        encoding=dict(siconca=dict(dtype="int16",
+                                   scale_factor=np.float32(1e-4),
+                                   zlib=True)))
+
+    assert processor._estimate_variable_size("siconca") == \
+        (60 + 30) * 4 * 4 * 4
@@ -1,4 +1,6 @@
 import logging
+import os
+import signal
 import subprocess as sp
 
 from dataclasses import dataclass, field
@@ -68,7 +70,9 @@ class HemisphereMixin:
         return self._hemisphere & Hemisphere.BOTH
 
 
-def run_command(command: str, dry: bool = False) -> object:
+def run_command(command: str,
+                dry: bool = False,
+                timeout: float = None) -> object:
     """Run a shell command
 
     A wrapper in case we want some additional handling to go in here
@@ -77,6 +81,8 @@ def run_command(command: str, dry: bool = False) -> object:
         command: Command to run in shell.
         dry (optional): Whether to do a dry run or to run actual command.
             Default is False.
+        timeout (optional): Seconds after which the command, and anything
+            it started, is killed. Default is None, for no timeout.
 
     Returns:
         subprocess.CompletedProcess return of the executed command.
@@ -85,7 +91,21 @@ def run_command(command: str, dry: bool = False) -> object:
         logging.info("Skipping dry command: {}".format(command))
         return 0
 
-    ret = sp.run(command, shell=True)
+    if timeout is None:
+        ret = sp.run(command, shell=True)
+    else:
+        # The shell's children need killing too, hence the process group
+        proc = sp.Popen(command, shell=True, start_new_session=True)
+
+        try:
+            proc.wait(timeout=timeout)
+        except sp.TimeoutExpired:
+            logging.warning("Command timed out after {}s, killing it".format(
+                timeout))
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+        ret = sp.CompletedProcess(command, proc.returncode)
+
     if ret.returncode < 0:
         logging.warning(
             "Child was terminated by signal: {}".format(-ret.returncode))
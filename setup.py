@@ -50,6 +50,8 @@ setup(
             "icenet.data.interfaces.utils:reprocess_main",
             "icenet_data_add_time_dim = "
             "icenet.data.interfaces.utils:add_time_dim_main",
+            "icenet_data_daily_benchmark = "
+            "icenet.data.interfaces.utils:daily_means_benchmark_main",
 
             "icenet_process_cmip = icenet.data.processors.cmip:main",
             "icenet_process_era5 = icenet.data.processors.era5:main",
@@ -61,6 +63,8 @@ setup(
 
             "icenet_process_condense = "
             "icenet.data.processors.utils:condense_main",
+            "icenet_process_benchmark = "
+            "icenet.data.processors.utils:benchmark_main",
 
             "icenet_dataset_check = icenet.data.dataset:check_dataset",
             "icenet_dataset_create = icenet.data.loader:create",